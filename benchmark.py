@@ -0,0 +1,234 @@
+# python benchmark.py --sizes 10 100 1000 5000 --latency 0.2 --tokens-per-second 200 --concurrency 8
+# python benchmark.py --synth-items 10000 100000 --synth-batch-size 1000
+# python benchmark.py --router-routes 10 300 3000
+import os
+import sys
+import re
+import json
+import time
+import random
+import yaml
+import shutil
+import argparse
+import contextlib
+import tempfile
+import tracemalloc
+from typing import Dict, Any, List, Callable
+import spec
+import implement
+import document
+import synth
+from openapi import iter_operations
+from router import Router
+from fake_llm import FakeChatModel
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCES = ['users', 'orders', 'products', 'invoices', 'payments', 'accounts', 'teams', 'projects']
+
+def resource_schema(name: str) -> Dict[str, Any]:
+    return {
+        'type': 'object',
+        'required': ['id', 'name'],
+        'properties': {
+            'id': {'type': 'integer', 'example': 1},
+            'name': {'type': 'string', 'example': f'{name} one'},
+            'status': {'type': 'string', 'enum': ['active', 'archived']},
+            'owner': {'$ref': '#/components/schemas/Owner'},
+            'createdAt': {'type': 'string', 'format': 'date-time'}
+        }
+    }
+
+def synthetic_spec(operations: int) -> Dict[str, Any]:
+    # Five CRUD operations per resource, each referencing shared component schemas
+    schemas = {
+        'Owner': {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'email': {'type': 'string', 'format': 'email'}}},
+        'Error': {'type': 'object', 'properties': {'error': {'type': 'string'}, 'message': {'type': 'string'}}}
+    }
+    paths = {}
+    count = 0
+    index = 0
+    while count < operations:
+        resource = f"{RESOURCES[index % len(RESOURCES)]}{index // len(RESOURCES) or ''}"
+        schema_name = resource.capitalize()
+        schemas[schema_name] = resource_schema(resource)
+        ref = {'$ref': f'#/components/schemas/{schema_name}'}
+        ok = lambda schema: {'description': 'Successful response', 'content': {'application/json': {'schema': schema}}}
+        not_found = {'description': 'Not found', 'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Error'}}}}
+        id_parameter = [{'name': 'id', 'in': 'path', 'required': True, 'schema': {'type': 'integer'}}]
+
+        collection = {
+            'get': {'operationId': f'list_{resource}', 'summary': f'List {resource}', 'tags': [resource],
+                    'parameters': [{'name': 'page', 'in': 'query', 'schema': {'type': 'integer', 'default': 1}}],
+                    'responses': {'200': ok({'type': 'array', 'items': ref})}},
+            'post': {'operationId': f'create_{resource}', 'summary': f'Create {resource}', 'tags': [resource],
+                     'requestBody': {'required': True, 'content': {'application/json': {'schema': ref}}},
+                     'responses': {'201': ok(ref)}}
+        }
+        item = {
+            'get': {'operationId': f'get_{resource}', 'summary': f'Get {resource}', 'tags': [resource],
+                    'parameters': id_parameter, 'responses': {'200': ok(ref), '404': not_found}},
+            'put': {'operationId': f'update_{resource}', 'summary': f'Update {resource}', 'tags': [resource],
+                    'parameters': id_parameter, 'requestBody': {'required': True, 'content': {'application/json': {'schema': ref}}},
+                    'responses': {'200': ok(ref), '404': not_found}},
+            'delete': {'operationId': f'delete_{resource}', 'summary': f'Delete {resource}', 'tags': [resource],
+                       'parameters': id_parameter, 'responses': {'204': {'description': 'Deleted'}, '404': not_found}}
+        }
+
+        for path, methods in ((f'/{resource}', collection), (f'/{resource}/{{id}}', item)):
+            for method, operation in methods.items():
+                if count >= operations:
+                    break
+                paths.setdefault(path, {})[method] = operation
+                count += 1
+        index += 1
+
+    return {
+        'openapi': '3.0.0',
+        'info': {'title': 'Benchmark API', 'version': '1.0.0'},
+        'paths': paths,
+        'components': {'schemas': schemas}
+    }
+
+def measure(stage: str, operations: int, llm: FakeChatModel, fn: Callable[[], Any]) -> Dict[str, Any]:
+    llm.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    # Silence per-handler progress output so it does not skew the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        fn()
+    wall_time = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'stage': stage,
+        'operations': operations,
+        'wall_time': round(wall_time, 4),
+        'llm_calls': llm.calls,
+        'prompt_tokens': llm.prompt_tokens,
+        'completion_tokens': llm.completion_tokens,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2)
+    }
+
+def prepare_workspace(work_dir: str, operations: int):
+    # Stages read and write relative paths, so each run gets its own input/ and deploy/ tree
+    os.makedirs(os.path.join(work_dir, 'input'), exist_ok=True)
+    os.makedirs(os.path.join(work_dir, 'deploy'), exist_ok=True)
+    for name in ('serverless.yml', 'handler.py'):
+        shutil.copy(os.path.join(REPO_DIR, 'input', name), os.path.join(work_dir, 'input', name))
+    with open(os.path.join(work_dir, 'input', 'openapi.yml'), 'w') as file:
+        yaml.safe_dump(synthetic_spec(operations), file, sort_keys=False)
+    open(os.path.join(work_dir, 'deploy', 'deploy.json'), 'w').write('{}')
+
+def run_benchmark(operations: int, llm: FakeChatModel, concurrency: int = 1, engine: str = 'llm', batch_size: int = 1, use_cache: bool = False) -> List[Dict[str, Any]]:
+    work_dir = tempfile.mkdtemp(prefix='mockthis-bench-')
+    previous_dir = os.getcwd()
+    try:
+        prepare_workspace(work_dir, operations)
+        os.chdir(work_dir)
+        return [
+            measure('spec', operations, llm, lambda: spec.generate_serverless_config(
+                'input/openapi.yml', concurrency=concurrency, llm=llm, use_cache=use_cache, batch_size=batch_size)),
+            measure('implement', operations, llm, lambda: implement.generate_handlers(
+                'deploy/api.yml', 'input/openapi.yml', 'input/handler.py', 'deploy/handlers',
+                concurrency=concurrency, llm=llm, use_cache=use_cache, engine=engine)),
+            measure('document', operations, llm, lambda: document.generate_api_documentation(
+                'deploy/api.yml', 'input/openapi.yml', 'deploy/deploy.json', llm=llm,
+                concurrency=concurrency, use_cache=use_cache))
+        ]
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def benchmark_synth(items: int, batch_size: int = synth.BATCH_SIZE) -> Dict[str, Any]:
+    # Payload synthesis for a list endpoint: items with nested $refs, enums and formats
+    document = synthetic_spec(5)
+    run = lambda: sum(len(batch) for batch in synth.iter_batches({'$ref': '#/components/schemas/Users'}, items, document, batch_size=batch_size))
+    started = time.perf_counter()
+    generated = run()
+    wall_time = time.perf_counter() - started
+
+    # tracemalloc slows allocation-heavy code down several times, so memory gets its own pass
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'items': generated,
+        'batch_size': batch_size,
+        'wall_time': round(wall_time, 4),
+        'items_per_second': round(generated / wall_time) if wall_time else 0,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2)
+    }
+
+def template_pattern(template: str) -> "re.Pattern":
+    # What a linear-scan router compiles each path template to
+    pattern = re.sub(r'\\\{(\w+)\\\+\\\}', r'(?P<\1>.+)', re.escape(template))
+    return re.compile('^' + re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', pattern) + '$')
+
+def benchmark_router(operations: int, lookups: int = 100000) -> Dict[str, Any]:
+    # Match latency of the path-template trie against trying every route's regex in turn
+    routes = [(method.upper(), path) for path, method, _ in iter_operations(synthetic_spec(operations))]
+    router = Router()
+    for method, path in routes:
+        router.add(method, path, path)
+    scan = [(method, template_pattern(path), path) for method, path in routes]
+
+    def linear_match(method: str, path: str):
+        for route_method, pattern, template in scan:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return template, match.groupdict()
+        return None, {}
+
+    rng = random.Random(0)
+    requests = [(method, path.replace('{id}', str(rng.randint(1, 1000)))) for method, path in rng.choices(routes, k=lookups)]
+    results = {'routes': len(routes), 'lookups': lookups}
+    for name, match in (('trie', router.match), ('linear', linear_match)):
+        started = time.perf_counter()
+        for method, path in requests:
+            match(method, path)
+        results[f'{name}_us_per_match'] = round((time.perf_counter() - started) / lookups * 1e6, 3)
+    results['speedup'] = round(results['linear_us_per_match'] / results['trie_us_per_match'], 1)
+    return results
+
+def print_report(results: List[Dict[str, Any]]):
+    columns = list(results[0])
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print('  '.join(str(result[column]).rjust(width) for column, width in zip(columns, widths)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline against a fake LLM backend")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help="Number of operations in each synthetic spec")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds of latency per LLM call")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Simulated completion throughput, 0 for instant")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of concurrent LLM calls per stage")
+    parser.add_argument('--batch-size', type=int, default=1, help="Number of operations per serverless configuration call")
+    parser.add_argument('--engine', choices=['template', 'llm'], default='llm', help="Backend used to generate the handlers")
+    parser.add_argument('--cache', action='store_true', help="Use a fresh generation cache inside each run")
+    parser.add_argument('--synth-items', type=int, nargs='+', help="Benchmark payload synthesis at these item counts instead of the pipeline")
+    parser.add_argument('--synth-batch-size', type=int, default=synth.BATCH_SIZE, help="Number of items generated per synthesis batch")
+    parser.add_argument('--router-routes', type=int, nargs='+', help="Benchmark route matching at these operation counts instead of the pipeline")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    if args.router_routes:
+        for operations in args.router_routes:
+            print(f"Matching routes over {operations} operations... ⏱️", file=sys.stderr)
+            results.append(benchmark_router(operations))
+    elif args.synth_items:
+        for items in args.synth_items:
+            print(f"Synthesizing {items} items... ⏱️", file=sys.stderr)
+            results.append(benchmark_synth(items, args.synth_batch_size))
+    else:
+        llm = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+        for size in args.sizes:
+            print(f"Benchmarking {size} operations... ⏱️", file=sys.stderr)
+            results.extend(run_benchmark(size, llm, args.concurrency, args.engine, args.batch_size, args.cache))
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
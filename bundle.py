@@ -0,0 +1,256 @@
+# python bundle.py deploy/api.yml --profile balanced
+import io
+import os
+import sys
+import ast
+import copy
+import json
+import inspect
+import zipfile
+import argparse
+import sysconfig
+import importlib.util
+import importlib.metadata
+from typing import Dict, Any, List, Optional, Set, Tuple
+import yaml
+from openapi import load_yaml
+from validate import RUNTIME_MODULES
+from monolith import DISPATCH_MODULE
+
+# Per-function packaging: each function's zip only holds its handler and the local modules the
+# handler imports, found by walking the import statements, instead of the whole deploy directory.
+# Third-party requirements are pruned to what the handlers import, and the runtime and memory size
+# come from a profile.
+
+REPORT_NAME = "package-report.json"
+# The packaged configuration is derived from the generated one, which later incremental builds reuse
+PACKAGED_SUFFIX = '.packaged'
+REQUIREMENTS_PLUGIN = 'serverless-python-requirements'
+# Directories of the deploy tree that never belong in a function package
+EXCLUDED_DIRS = {'node_modules', '.serverless', '__pycache__', 'shards'}
+
+# Lambda bills and allocates CPU in proportion to memory, so more memory also means a faster cold start
+PROFILES = {
+    'minimal': {'runtime': 'python3.12', 'architecture': 'arm64', 'memorySize': 128, 'timeout': 6},
+    'balanced': {'runtime': 'python3.12', 'architecture': 'arm64', 'memorySize': 256, 'timeout': 10},
+    'performance': {'runtime': 'python3.12', 'architecture': 'arm64', 'memorySize': 1024, 'timeout': 10}
+}
+DEFAULT_PROFILE = 'balanced'
+# Handlers that synthesize payloads or seed tables when they are loaded need room for the data
+DATA_MODULES = {'synth', 'state'}
+DATA_MEMORY_SIZE = 512
+# Runtime helpers the build copies into the deploy directory. They are imported lazily or only by some
+# handlers, so when one was not copied it is unused, never a package to install
+LOCAL_MODULES = {'synth', 'state', 'response_cache', 'router', DISPATCH_MODULE}
+
+def module_imports(source: str) -> Tuple[Set[str], bool]:
+    # Absolute module names imported anywhere in the source, including inside functions, and
+    # whether it also imports modules by name at runtime (importlib.import_module)
+    names, dynamic = set(), False
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.Call) and isinstance(node.func, (ast.Attribute, ast.Name)):
+            dynamic = dynamic or getattr(node.func, 'attr', getattr(node.func, 'id', None)) == 'import_module'
+    return names, dynamic
+
+STDLIB_DIR = os.path.realpath(sysconfig.get_paths()['stdlib'])
+SITE_DIRS = {os.path.realpath(sysconfig.get_paths()[name]) for name in ('purelib', 'platlib')}
+
+def is_stdlib(module_name: str) -> bool:
+    # sys.stdlib_module_names is only available from Python 3.10: a standard library module is built in,
+    # frozen or found under the stdlib directory, outside site-packages
+    if module_name in sys.builtin_module_names:
+        return True
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return False
+    if spec is None or spec.origin is None:
+        return False
+    if spec.origin in ('built-in', 'frozen'):
+        return True
+    origin = os.path.realpath(spec.origin)
+    return origin.startswith(STDLIB_DIR + os.sep) and not any(origin.startswith(site_dir + os.sep) for site_dir in SITE_DIRS)
+
+def module_distributions() -> Dict[str, List[str]]:
+    # Top-level module -> installed distributions providing it, like packages_distributions() of Python 3.10+
+    distributions = {}
+    for distribution in importlib.metadata.distributions():
+        name = distribution.metadata['Name']
+        top_level = (distribution.read_text('top_level.txt') or '').split()
+        if not top_level:
+            for path in distribution.files or []:
+                module_name = path.parts[0] if len(path.parts) > 1 else inspect.getmodulename(str(path))
+                if module_name and '.' not in module_name:
+                    top_level.append(module_name)
+        for module_name in dict.fromkeys(top_level):
+            distributions.setdefault(module_name, []).append(name)
+    return distributions
+
+def packaged_config_path(serverless_yaml_path: str) -> str:
+    # deploy/api.yml -> deploy/api.packaged.yml
+    root, extension = os.path.splitext(serverless_yaml_path)
+    return f"{root}{PACKAGED_SUFFIX}{extension}"
+
+def local_module_path(base_dir: str, module_name: str) -> Optional[str]:
+    # 'synth' -> 'synth.py', 'handlers.users' -> 'handlers/users.py', relative to base_dir
+    relative = module_name.replace('.', '/')
+    for candidate in (f"{relative}.py", f"{relative}/__init__.py"):
+        if os.path.isfile(os.path.join(base_dir, candidate)):
+            return candidate
+    return None
+
+def analyze(base_dir: str, entry: str) -> Tuple[Set[str], Set[str]]:
+    # Files reachable from the entry module through local imports, and the top-level names of the
+    # third-party modules they import
+    files, third_party = set(), set()
+    pending = [entry]
+    while pending:
+        relative = pending.pop()
+        if relative in files:
+            continue
+        files.add(relative)
+        with open(os.path.join(base_dir, relative), 'r') as file:
+            names, dynamic = module_imports(file.read())
+        if dynamic:
+            # Modules imported by name (the monolith dispatcher) can be any handler
+            handlers_dir = os.path.join(base_dir, 'handlers')
+            if os.path.isdir(handlers_dir):
+                pending.extend(f"handlers/{name}" for name in sorted(os.listdir(handlers_dir)) if name.endswith('.py'))
+        for name in names:
+            path = local_module_path(base_dir, name)
+            top_level = name.split('.')[0]
+            if path is not None:
+                pending.append(path)
+            elif local_module_path(base_dir, top_level) is None and not os.path.isdir(os.path.join(base_dir, top_level)) \
+                    and top_level not in RUNTIME_MODULES and top_level not in LOCAL_MODULES and not is_stdlib(top_level):
+                third_party.add(top_level)
+    return files, third_party
+
+def requirement(module_name: str, distributions: Dict[str, List[str]]) -> Optional[str]:
+    # Pin the installed distribution that provides the module; None when no distribution does, a
+    # module name is not necessarily a package name on PyPI
+    for distribution in distributions.get(module_name, []):
+        try:
+            return f"{distribution}=={importlib.metadata.version(distribution)}"
+        except importlib.metadata.PackageNotFoundError:
+            continue
+    return None
+
+def zip_size(base_dir: str, files: List[str]) -> int:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for relative in files:
+            archive.write(os.path.join(base_dir, relative), relative)
+    return len(buffer.getvalue())
+
+def bundle_files(base_dir: str) -> List[str]:
+    # What the default packaging would ship: everything under the service directory
+    files = []
+    for root, dirs, names in os.walk(base_dir):
+        dirs[:] = [name for name in dirs if name not in EXCLUDED_DIRS]
+        files.extend(os.path.relpath(os.path.join(root, name), base_dir) for name in names)
+    return sorted(files)
+
+def write_packaging(serverless_yaml_path: str = 'deploy/api.yml', profile: str = DEFAULT_PROFILE) -> Dict[str, Any]:
+    # Writes the serverless configuration with per-function packages next to serverless_yaml_path, which
+    # is left as generated, and writes and returns the package size report with the packaged config's path
+    base_dir = os.path.dirname(os.path.abspath(serverless_yaml_path))
+    serverless_config = copy.deepcopy(load_yaml(serverless_yaml_path) or {})
+    settings = PROFILES[profile]
+
+    provider = serverless_config.setdefault('provider', {})
+    provider.update(settings)
+    serverless_config['package'] = {'individually': True, 'patterns': ['!**']}
+
+    functions, third_party = [], set()
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        module_name, _, _ = function_config['handler'].rpartition('.')
+        entry = local_module_path(base_dir, module_name.replace('/', '.'))
+        if entry is None:
+            print(f"⚠️ {function_name}: handler module {module_name} not found, packaging it with everything")
+            function_config.pop('package', None)
+            continue
+        files, modules = analyze(base_dir, entry)
+        third_party |= modules
+        function_config['package'] = {'patterns': sorted(files)}
+
+        local_modules = {os.path.splitext(relative)[0] for relative in files}
+        if local_modules & DATA_MODULES and function_config.get('memorySize', settings['memorySize']) < DATA_MEMORY_SIZE:
+            function_config['memorySize'] = DATA_MEMORY_SIZE
+        functions.append({
+            'function': function_name,
+            'files': len(files),
+            'bytes': sum(os.path.getsize(os.path.join(base_dir, relative)) for relative in files),
+            'zip_bytes': zip_size(base_dir, sorted(files)),
+            'memory_mb': function_config.get('memorySize', settings['memorySize'])
+        })
+
+    # Only ship the requirements plugin and its dependencies when a handler imports one
+    plugins = [plugin for plugin in serverless_config.get('plugins') or [] if plugin != REQUIREMENTS_PLUGIN]
+    requirements_path = os.path.join(base_dir, 'requirements.txt')
+    requirements = []
+    if third_party:
+        distributions = module_distributions()
+        for module_name in sorted(third_party):
+            pinned = requirement(module_name, distributions)
+            if pinned is None:
+                print(f"⚠️ No installed distribution provides the imported module {module_name}, it is left out of requirements.txt")
+            elif pinned not in requirements:
+                requirements.append(pinned)
+        requirements.sort()
+    if requirements:
+        with open(requirements_path, 'w') as file:
+            file.write("\n".join(requirements) + "\n")
+        plugins.append(REQUIREMENTS_PLUGIN)
+        serverless_config.setdefault('custom', {})['pythonRequirements'] = {'slim': True, 'noDeploy': sorted(RUNTIME_MODULES)}
+    else:
+        if os.path.exists(requirements_path):
+            os.remove(requirements_path)
+        (serverless_config.get('custom') or {}).pop('pythonRequirements', None)
+        if serverless_config.get('custom') == {}:
+            serverless_config.pop('custom')
+    if plugins:
+        serverless_config['plugins'] = plugins
+    else:
+        serverless_config.pop('plugins', None)
+
+    config_path = packaged_config_path(serverless_yaml_path)
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(serverless_config, file, sort_keys=False, default_flow_style=False)
+
+    report = {
+        'config': config_path,
+        'profile': profile,
+        'requirements': requirements,
+        'full_bundle_zip_bytes': zip_size(base_dir, bundle_files(base_dir)),
+        'functions': sorted(functions, key=lambda function: function['zip_bytes'], reverse=True)
+    }
+    with open(os.path.join(base_dir, REPORT_NAME), 'w') as file:
+        json.dump(report, file, indent=2)
+    return report
+
+def print_report(report: Dict[str, Any], limit: int = 10):
+    functions = report['functions']
+    if not functions:
+        return
+    for function in functions[:limit]:
+        print(f"  {function['function']}: {function['files']} file(s), {function['zip_bytes'] / 1024:.1f} KB zipped, {function['memory_mb']} MB")
+    if len(functions) > limit:
+        print(f"  ... and {len(functions) - limit} more")
+    average = sum(function['zip_bytes'] for function in functions) / len(functions)
+    print(f"{len(functions)} package(s), {average / 1024:.1f} KB on average instead of {report['full_bundle_zip_bytes'] / 1024:.1f} KB "
+          f"for the whole bundle, requirements: {', '.join(report['requirements']) or 'none'} 📦")
+    print(f"Packaged configuration written to {report['config']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Package every function with only the modules its handler imports")
+    parser.add_argument('config', nargs='?', default='deploy/api.yml', help="Path to the generated serverless configuration")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE, help="Runtime, architecture, memory size and timeout of the functions")
+    args = parser.parse_args()
+
+    print_report(write_packaging(args.config, args.profile))
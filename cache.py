@@ -0,0 +1,117 @@
+# python cache.py stats|list|clear|prune [--dir .cache/mockthis] [--max-bytes N]
+import os
+import json
+import hashlib
+import tempfile
+import argparse
+from typing import Any, Dict, List, Optional
+import telemetry
+
+# Relative to the directory a build runs in; sharded builds set it to the parent build's cache
+CACHE_DIR = os.getenv("MOCKTHIS_CACHE_DIR", ".cache/mockthis")
+MAX_CACHE_BYTES = int(os.getenv("MOCKTHIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def cache_key(*parts: Any) -> str:
+    # Content-addressed key: hash of everything that influences the generated output
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def model_name(llm) -> str:
+    return getattr(llm, 'model', None) or getattr(llm, 'model_name', None) or type(llm).__name__
+
+def entry_path(key: str, cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, key[:2], f"{key}.json")
+
+def get(key: str, cache_dir: Optional[str] = None) -> Optional[Any]:
+    path = entry_path(key, cache_dir)
+    try:
+        with open(path, 'r') as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        telemetry.add('cache.misses')
+        return None
+    telemetry.add('cache.hits')
+
+    # Touch the entry so eviction sees it as recently used
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry.get('value')
+
+def put(key: str, value: Any, cache_dir: Optional[str] = None):
+    path = entry_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temporary file first so concurrent readers never see a partial entry; the name is
+    # unique to this write, threads of one process may store the same key at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump({'value': value}, file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def list_entries(cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    entries = []
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return entries
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append({'key': name[:-5], 'path': path, 'size': stat.st_size, 'last_used': stat.st_mtime})
+    return entries
+
+def evict(max_bytes: int = MAX_CACHE_BYTES, cache_dir: Optional[str] = None) -> int:
+    # Drop least recently used entries until the cache fits in max_bytes
+    entries = sorted(list_entries(cache_dir), key=lambda entry: entry['last_used'])
+    total = sum(entry['size'] for entry in entries)
+    removed = 0
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(entry['path'])
+        except OSError:
+            continue
+        total -= entry['size']
+        removed += 1
+    return removed
+
+def clear(cache_dir: Optional[str] = None) -> int:
+    return evict(0, cache_dir)
+
+def stats(cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    entries = list_entries(cache_dir)
+    return {
+        'dir': cache_dir or CACHE_DIR,
+        'entries': len(entries),
+        'bytes': sum(entry['size'] for entry in entries),
+        'max_bytes': MAX_CACHE_BYTES
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the generation cache")
+    parser.add_argument('command', choices=['stats', 'list', 'clear', 'prune'])
+    parser.add_argument('--dir', default=CACHE_DIR, help="Cache directory")
+    parser.add_argument('--max-bytes', type=int, default=MAX_CACHE_BYTES, help="Size limit used by prune")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(stats(args.dir), indent=2))
+    elif args.command == 'list':
+        for entry in sorted(list_entries(args.dir), key=lambda entry: entry['last_used'], reverse=True):
+            print(f"{entry['key']}  {entry['size']:>10}  {entry['last_used']:.0f}")
+    elif args.command == 'clear':
+        print(f"Removed {clear(args.dir)} cache entries")
+    elif args.command == 'prune':
+        print(f"Removed {evict(args.max_bytes, args.dir)} cache entries")
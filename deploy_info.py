@@ -0,0 +1,116 @@
+# python deploy_info.py deploy/deploy.log [deploy/deploy.json]
+import os
+import re
+import sys
+import json
+from typing import Dict, Any, Optional
+
+DEPLOY_INFO_PATH = "deploy/deploy.json"
+
+ANSI_PATTERN = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+# v3 prints 'Deploying api to stage dev (us-east-1)', v4 quotes the service and stage names
+DEPLOY_HEADER_PATTERN = re.compile(r'^Deploying "?([^\s"]+)"? to stage "?([^\s"]+)"? \(([a-z0-9-]+)\)')
+KEY_VALUE_PATTERN = re.compile(r'^(service|stage|region|stack):\s*(\S+)\s*$')
+ENDPOINT_PATTERN = re.compile(r'^(?:endpoint:\s*)?([A-Z]+)\s+-\s+(https?://\S+)')
+FUNCTION_PATTERN = re.compile(r'^([\w-]+):\s+([\w-]+)(?:\s+\(.*\))?\s*$')
+ARN_PATTERN = re.compile(r'arn:aws:lambda:([a-z0-9-]+):(\d+):function:([\w-]+)(?::[\w$]+)?')
+URL_PATTERN = re.compile(r'^(https?://[^/]+/[^/]+)(/.*)?$')
+
+def empty_deploy_info() -> Dict[str, Any]:
+    return {'service': None, 'stage': None, 'region': None, 'stack': None, 'base_url': None, 'endpoints': [], 'functions': {}}
+
+def parse_deploy_log(log_content: str) -> Dict[str, Any]:
+    # The log is appended to on every deploy: each new deploy header starts a fresh record,
+    # so the result always describes the most recent deploy.
+    info = empty_deploy_info()
+    section = None
+    arns = {}
+
+    for raw_line in log_content.splitlines():
+        line = ANSI_PATTERN.sub('', raw_line).strip()
+        if not line:
+            continue
+
+        header = DEPLOY_HEADER_PATTERN.match(line)
+        if header or line == 'Service Information':
+            if info['endpoints'] or info['functions']:
+                info = empty_deploy_info()
+            section = None
+            if header:
+                info['service'], info['stage'], info['region'] = header.groups()
+            continue
+
+        for match in ARN_PATTERN.finditer(line):
+            arns[match.group(3)] = match.group(0)
+
+        key_value = KEY_VALUE_PATTERN.match(line)
+        if key_value:
+            # 'serverless info' output starts with the service line and no deploy header
+            if key_value.group(1) == 'service' and (info['endpoints'] or info['functions']):
+                info = empty_deploy_info()
+            info[key_value.group(1)] = key_value.group(2)
+            section = None
+            continue
+
+        if line in ('endpoints:', 'functions:'):
+            section = line[:-1]
+            continue
+        if line.endswith(':'):
+            section = None
+            continue
+
+        endpoint = ENDPOINT_PATTERN.match(line)
+        if endpoint and section in ('endpoints', None):
+            method, url = endpoint.groups()
+            url_match = URL_PATTERN.match(url)
+            base_url, path = (url_match.group(1), url_match.group(2) or '/') if url_match else (url, '/')
+            info['base_url'] = info['base_url'] or base_url
+            info['endpoints'].append({'method': method, 'path': path, 'url': url})
+            continue
+
+        function = FUNCTION_PATTERN.match(line)
+        if function and section == 'functions':
+            info['functions'][function.group(1)] = {'name': function.group(2), 'arn': None}
+
+    # Attach ARNs (printed as stack outputs with --verbose) to the functions they belong to
+    for function in info['functions'].values():
+        function['arn'] = arns.get(function['name'])
+    if not info['stack'] and info['service'] and info['stage']:
+        info['stack'] = f"{info['service']}-{info['stage']}"
+    return info
+
+def save_deploy_info(info: Dict[str, Any], output_path: str = DEPLOY_INFO_PATH):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as file:
+        json.dump(info, file, indent=2)
+
+def load_deploy_info(path: str = DEPLOY_INFO_PATH) -> Dict[str, Any]:
+    # Accepts the JSON manifest or, for older builds, the raw deploy log
+    try:
+        with open(path, 'r') as file:
+            content = file.read()
+    except OSError:
+        return empty_deploy_info()
+    if path.endswith('.json'):
+        try:
+            return json.loads(content)
+        except ValueError:
+            return empty_deploy_info()
+    return parse_deploy_log(content)
+
+def find_endpoint_url(info: Dict[str, Any], method: str, path: str) -> Optional[str]:
+    for endpoint in info.get('endpoints', []):
+        if endpoint['method'] in (method.upper(), 'ANY') and endpoint['path'] == path:
+            return endpoint['url']
+    return None
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python deploy_info.py <deploy_log> [output_json]")
+    else:
+        with open(sys.argv[1], 'r') as file:
+            parsed = parse_deploy_log(file.read())
+        if len(sys.argv) == 3:
+            save_deploy_info(parsed, sys.argv[2])
+        else:
+            print(json.dumps(parsed, indent=2))
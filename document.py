@@ -1,57 +1,157 @@
 import os
-from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
-
-def generate_api_documentation(serverless_yaml_path: str, openapi_yaml_path: str, deploy_log_path: str) -> str:
-    # Load environment variables and set up API key
-    load_dotenv()
-    os.environ["ANTHROPIC_API_KEY"] = os.getenv("ANTHROPIC_API_KEY")
-
-    # Initialize ChatAnthropic
-    llm = ChatAnthropic(model="claude-3-5-sonnet-20240620")
-
-    # Read the serverless.yml, openapi.yml, and deploy.log files
-    with open(serverless_yaml_path, 'r') as file:
-        serverless_content = file.read()
-    
-    with open(openapi_yaml_path, 'r') as file:
-        openapi_content = file.read()
-    
-    with open(deploy_log_path, 'r') as file:
-        deploy_log_content = file.read()
-
-    prompt = f"""
-    Generate markdown format documentation on how to consume the mock API that was implemented. Use the following information:
-
-    1. Serverless configuration:
-    ```yaml
-    {serverless_content}
-    ```
+import json
+import yaml
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from llm_client import get_llm
+import cache
+from cache import cache_key, model_name
+from filter import build_ref_index, slice_operation
+from openapi import load_yaml, load_openapi, iter_operations
+from deploy_info import load_deploy_info, find_endpoint_url
+from utils import invoke_with_retry
+import telemetry
+
+DEFAULT_BASE_URL = 'https://<api-id>.execute-api.<region>.amazonaws.com/<stage>'
 
-    2. OpenAPI specification:
+INTRO_PROMPT_TEMPLATE = """
+    Generate the opening sections of a markdown documentation on how to consume the mock API that was implemented. Use the following information:
+
+    1. API information and security schemes from the OpenAPI specification:
     ```yaml
-    {openapi_content}
+    {overview}
     ```
 
-    3. Deployment log (contains information about the endpoints):
-    ```
-    {deploy_log_content}
+    2. Deployment of the API (base URL, stage and region):
+    ```json
+    {deployment}
     ```
 
+    3. Endpoint groups documented further down: {groups}
+
     The documentation should include:
-    1. An introduction to the API
-    2. Base URL for the API (extract this from the deployment log)
-    3. Available endpoints with their HTTP methods, descriptions, and example requests/responses
-    3.1 Expand on the description of each endpoint
-    3.2 Add the example request and response for each endpoint, expanding on the example response
-    4. Any authentication requirements
-    5. Error handling and common status codes
-
-    Please provide the documentation in markdown format.
+    1. A level-1 heading with the API name and an introduction to the API
+    2. The base URL for the API
+    3. Any authentication requirements
+    4. Error handling and common status codes
+
+    Do not document individual endpoints, they are documented separately.
+    Please provide only the markdown.
+    """
+
+OPERATION_PROMPT_TEMPLATE = """
+    Generate markdown documentation for a single endpoint of the mock API that was implemented. Use the following OpenAPI specification of the endpoint:
+    ```yaml
+    {operation_spec}
+    ```
+
+    Base URL of the deployed API: {base_url}
+    Deployed URL of this endpoint: {endpoint_url}
+
+    The documentation should:
+    1. Start with the level-3 heading: ### {method} {path}
+    2. Expand on the description of the endpoint
+    3. Describe the path, query and body parameters
+    4. Add an example request (with curl, using the base URL) and the example response, expanding on the example response
+    5. List the status codes the endpoint can return
+
+    Please provide only the markdown for this endpoint.
     """
 
-    response = llm.invoke(prompt, temperature=0)
-    return response.content
+def group_operations(openapi_spec: Dict[str, Any]) -> "OrderedDict[str, List[Tuple[str, str]]]":
+    # One group per tag (first tag wins), untagged operations are grouped by their first path segment
+    groups = OrderedDict()
+    for path, method, details in iter_operations(openapi_spec):
+        tags = details.get('tags') or []
+        group = tags[0] if tags else (path.strip('/').split('/')[0] or 'root')
+        groups.setdefault(group, []).append((path, method))
+    return groups
+
+def generate_section(llm, key: str, prompt: str, use_cache: bool, operation: Optional[str] = None) -> str:
+    with telemetry.span('section', operation=operation):
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        response = invoke_with_retry(llm, prompt, operation=operation, temperature=0)
+        content = response.content.strip()
+        if use_cache and content:
+            cache.put(key, content)
+        return content
+
+def generate_api_documentation(serverless_yaml_path: str, openapi_yaml_path: str, deploy_info_path: str, llm=None, output_path: Optional[str] = None, concurrency: int = 1, use_cache: bool = True) -> str:
+    if llm is None:
+        llm = get_llm()
+
+    # Read the serverless.yml and openapi.yml files and the parsed deploy output
+    serverless_config = load_yaml(serverless_yaml_path) or {}
+    openapi_spec = load_openapi(openapi_yaml_path)
+
+    deployment = load_deploy_info(deploy_info_path)
+    base_url = deployment.get('base_url') or DEFAULT_BASE_URL
+    groups = group_operations(openapi_spec)
+    ref_index = build_ref_index(openapi_spec)
+
+    # Map: a small intro call plus one call per operation, each on its own slice of the spec
+    overview = {
+        'service': serverless_config.get('service'),
+        'region': deployment.get('region') or (serverless_config.get('provider') or {}).get('region'),
+        'info': openapi_spec.get('info', {}),
+        'security': openapi_spec.get('security', []),
+        'securitySchemes': (openapi_spec.get('components') or {}).get('securitySchemes', {})
+    }
+    deployment_summary = {'base_url': base_url, 'stage': deployment.get('stage'), 'region': overview['region']}
+    intro_prompt = INTRO_PROMPT_TEMPLATE.format(
+        overview=yaml.safe_dump(overview, sort_keys=False),
+        deployment=json.dumps(deployment_summary),
+        groups=', '.join(groups) or 'none'
+    )
+    jobs = [(cache_key('doc-intro', model_name(llm), INTRO_PROMPT_TEMPLATE, overview, deployment_summary, list(groups)), intro_prompt, None, 'intro')]
+    for group, operations in groups.items():
+        for index, (path, method) in enumerate(operations):
+            subset = slice_operation(openapi_spec, path, method, ref_index)
+            endpoint_url = find_endpoint_url(deployment, method, path) or f"{base_url}{path}"
+            prompt = OPERATION_PROMPT_TEMPLATE.format(
+                operation_spec=yaml.safe_dump(subset, sort_keys=False),
+                base_url=base_url,
+                endpoint_url=endpoint_url,
+                method=method.upper(),
+                path=path
+            )
+            key = cache_key('doc-operation', model_name(llm), OPERATION_PROMPT_TEMPLATE, subset, base_url, endpoint_url)
+            heading = f"## {group}" if index == 0 else None
+            jobs.append((key, prompt, heading, f"{method.upper()} {path}"))
+
+    # Reduce: stitch the sections in spec order, streaming each one to disk as soon as
+    # every section before it is done
+    output_file = None
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        output_file = open(output_path, 'w')
+
+    sections = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(telemetry.in_context(generate_section), llm, key, prompt, use_cache, operation) for key, prompt, _, operation in jobs]
+            for (_, _, heading, _), future in zip(jobs, futures):
+                section = future.result()
+                if heading:
+                    section = f"{heading}\n\n{section}"
+                sections.append(section)
+                if output_file:
+                    output_file.write(section + "\n\n")
+                    output_file.flush()
+    finally:
+        if output_file:
+            output_file.close()
+
+    if use_cache:
+        cache.evict()
+
+    if output_path:
+        print(f"API documentation has been generated and saved to {output_path}")
+    return "\n\n".join(sections) + "\n"
 
 def save_documentation(documentation: str, output_path: str):
     """
@@ -67,14 +167,12 @@ def save_documentation(documentation: str, output_path: str):
     print(f"API documentation has been generated and saved to {output_path}")
 
 if __name__ == "__main__":
-    # Generate API documentation
+    # Generate API documentation, streaming each section to the file as it completes
     print("Generating API documentation... 📝")
-    documentation = generate_api_documentation(
+    generate_api_documentation(
         serverless_yaml_path='deploy/api.yml',
         openapi_yaml_path='input/openapi.yml',
-        deploy_log_path='deploy/deploy.log'
+        deploy_info_path='deploy/deploy.json',
+        output_path='deploy/API_DOCUMENTATION.md'
     )
-    
-    # Use the new function to save the documentation
-    save_documentation(documentation, 'deploy/API_DOCUMENTATION.md')
-    print("API documentation generated. 📚")
\ No newline at end of file
+    print("API documentation generated. 📚")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Stand-in for the serverless CLI: SERVERLESS_BIN="python /abs/path/fake_serverless.py" python main.py --input ...
+import os
+import sys
+import time
+import yaml
+import argparse
+
+def endpoint_lines(serverless_config, base_url):
+    for function_config in (serverless_config.get('functions') or {}).values():
+        for event in function_config.get('events', []):
+            http_event = event.get('http') if isinstance(event, dict) else None
+            if isinstance(http_event, dict):
+                yield f"  {http_event.get('method', 'any').upper()} - {base_url}/{http_event.get('path', '').lstrip('/')}"
+
+def print_service(serverless_config, stage, region, with_header):
+    service = serverless_config.get('service', 'api-service')
+    base_url = f"https://fake000000.execute-api.{region}.amazonaws.com/{stage}"
+    if with_header:
+        print(f"Deploying {service} to stage {stage} ({region})")
+        print()
+        print(f"✔ Service deployed to stack {service}-{stage} (1s)")
+        print()
+    else:
+        print(f"service: {service}")
+        print(f"stage: {stage}")
+        print(f"region: {region}")
+        print(f"stack: {service}-{stage}")
+    print("endpoints:")
+    for line in endpoint_lines(serverless_config, base_url):
+        print(line)
+    print("functions:")
+    for function_name in serverless_config.get('functions') or {}:
+        print(f"  {function_name}: {service}-{stage}-{function_name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake serverless CLI for local runs and tests")
+    parser.add_argument('command', choices=['deploy', 'info', 'remove'])
+    parser.add_argument('--config', default='serverless.yml')
+    parser.add_argument('--stage', default='dev')
+    args, _ = parser.parse_known_args()
+
+    with open(args.config, 'r') as file:
+        config = yaml.safe_load(file) or {}
+    region = (config.get('provider') or {}).get('region', 'us-east-1')
+
+    # FAKE_SERVERLESS_DELAY simulates deploy time, FAKE_SERVERLESS_EXIT a failing deploy
+    time.sleep(float(os.getenv('FAKE_SERVERLESS_DELAY', '0')))
+    if args.command == 'deploy':
+        print_service(config, args.stage, region, with_header=True)
+    elif args.command == 'info':
+        print_service(config, args.stage, region, with_header=False)
+    else:
+        print(f"Removing {config.get('service')} from stage {args.stage} ({region})")
+    sys.exit(int(os.getenv('FAKE_SERVERLESS_EXIT', '0')))
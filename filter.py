@@ -1,75 +1,179 @@
 # python filter.py input_openapi.yaml output_openapi.yaml repos
 import yaml
-import copy
 import sys
+from openapi import HTTP_METHODS, load_openapi
+
+class NoAliasDumper(yaml.SafeDumper):
+    # The filtered document shares nodes with the original, never emit anchors for them
+    def ignore_aliases(self, data):
+        return True
 
 def filter_endpoints_by_tag(openapi_data, tag):
+    # The operations carrying the tag, the components they need are collected from the result
     filtered_paths = {}
-    used_schemas = set()
 
     for path, methods in openapi_data['paths'].items():
         filtered_methods = {}
         for method, details in methods.items():
-            if 'tags' in details and tag in details['tags']:
+            if method in HTTP_METHODS and tag in details.get('tags', []):
                 filtered_methods[method] = details
-                
-                # Collect schemas used in this endpoint
-                collect_used_schemas(details, used_schemas)
-        
+
         if filtered_methods:
+            # Path-level parameters apply to every operation under the path
+            if 'parameters' in methods:
+                filtered_methods['parameters'] = methods['parameters']
             filtered_paths[path] = filtered_methods
-    
-    return filtered_paths, used_schemas
-
-def collect_used_schemas(endpoint_details, used_schemas):
-    if 'requestBody' in endpoint_details:
-        collect_schemas_from_content(endpoint_details['requestBody'], used_schemas)
-    if 'responses' in endpoint_details:
-        for response in endpoint_details['responses'].values():
-            collect_schemas_from_content(response, used_schemas)
-    if 'parameters' in endpoint_details:
-        for parameter in endpoint_details['parameters']:
-            if 'schema' in parameter:
-                used_schemas.add(parameter['schema'].get('$ref', '').split('/')[-1])
-
-def collect_schemas_from_content(content, used_schemas):
-    if 'content' in content:
-        for media_type in content['content'].values():
-            if 'schema' in media_type:
-                ref = media_type['schema'].get('$ref', '')
-                if ref:
-                    used_schemas.add(ref.split('/')[-1])
-                elif 'properties' in media_type['schema']:
-                    for prop in media_type['schema']['properties'].values():
-                        ref = prop.get('$ref', '')
-                        if ref:
-                            used_schemas.add(ref.split('/')[-1])
-
-def filter_schemas(openapi_data, used_schemas):
-    filtered_schemas = {}
-    for schema_name, schema_details in openapi_data['components']['schemas'].items():
-        if schema_name in used_schemas:
-            filtered_schemas[schema_name] = schema_details
-    return filtered_schemas
 
-def main(input_file, output_file, tag):
-    with open(input_file, 'r') as file:
-        openapi_data = yaml.safe_load(file)
+    return filtered_paths
+
+def collect_refs(node, refs):
+    # Walk any part of the document and collect every $ref it contains
+    if isinstance(node, dict):
+        ref = node.get('$ref')
+        if isinstance(ref, str):
+            refs.add(ref)
+        for value in node.values():
+            collect_refs(value, refs)
+    elif isinstance(node, list):
+        for item in node:
+            collect_refs(item, refs)
+    return refs
+
+def component_ref(section, name):
+    return f"#/components/{section}/{name.replace('~', '~0').replace('/', '~1')}"
+
+def split_component_ref(ref):
+    _, _, section, name = ref.split('/', 3)
+    return section, name.replace('~1', '/').replace('~0', '~')
+
+def build_ref_index(openapi_data):
+    # One pass over components: map each component to the components it references directly
+    index = {}
+    for section, entries in (openapi_data.get('components') or {}).items():
+        if not isinstance(entries, dict):
+            continue
+        for name, details in entries.items():
+            index[component_ref(section, name)] = collect_refs(details, set())
+    return index
+
+def ref_closure(index, roots):
+    # Every component reachable from the roots, following references transitively
+    reachable = set()
+    pending = [ref for ref in roots if ref in index]
+    while pending:
+        ref = pending.pop()
+        if ref in reachable:
+            continue
+        reachable.add(ref)
+        pending.extend(child for child in index.get(ref, ()) if child in index and child not in reachable)
+    return reachable
+
+def resolve_ref(openapi_data, ref):
+    # Only local references ('#/components/...') are supported
+    node = openapi_data
+    for part in ref.lstrip('#/').split('/'):
+        part = part.replace('~1', '/').replace('~0', '~')
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+def collect_components(openapi_data, root, index=None):
+    # Components reachable from root, grouped by section and shared with the original document
+    if index is None:
+        index = build_ref_index(openapi_data)
+    components = {}
+    source = openapi_data.get('components') or {}
+    for ref in sorted(ref_closure(index, collect_refs(root, set()))):
+        section, name = split_component_ref(ref)
+        components.setdefault(section, {})[name] = source[section][name]
+    return components
+
+def slice_operation(openapi_data, path, method, index=None):
+    # Build a minimal, self-contained spec holding a single operation and what it references
+    path_item = openapi_data.get('paths', {}).get(path, {})
+    operation = path_item.get(method.lower(), {})
+    sliced_path = {method.lower(): operation}
+    if 'parameters' in path_item:
+        sliced_path['parameters'] = path_item['parameters']
+
+    sliced = {key: openapi_data[key] for key in ('openapi', 'info', 'servers') if key in openapi_data}
+    security = operation.get('security', openapi_data.get('security'))
+    if security:
+        sliced['security'] = security
+    sliced['paths'] = {path: sliced_path}
+
+    components = collect_components(openapi_data, sliced_path, index)
+    security_schemes = openapi_data.get('components', {}).get('securitySchemes', {})
+    for requirement in security or []:
+        for scheme in requirement:
+            if scheme in security_schemes:
+                components.setdefault('securitySchemes', {})[scheme] = security_schemes[scheme]
+    if components:
+        sliced['components'] = components
+    return sliced
 
-    # Filter endpoints by the given tag
-    filtered_paths, used_schemas = filter_endpoints_by_tag(openapi_data, tag)
+def filter_by_tag(openapi_data, tag, index=None):
+    # Self-contained subset of the document for one tag, sharing unchanged nodes with the original
+    filtered_paths = filter_endpoints_by_tag(openapi_data, tag)
+    components = collect_components(openapi_data, filtered_paths, index)
 
-    # Filter schemas
-    filtered_schemas = filter_schemas(openapi_data, used_schemas)
+    # Security schemes are referenced by name rather than $ref, keep them all
+    source_components = openapi_data.get('components') or {}
+    if 'securitySchemes' in source_components:
+        components['securitySchemes'] = source_components['securitySchemes']
 
-    # Create new OpenAPI structure
-    filtered_openapi = copy.deepcopy(openapi_data)
+    filtered_openapi = dict(openapi_data)
     filtered_openapi['paths'] = filtered_paths
-    filtered_openapi['components']['schemas'] = filtered_schemas
+    if components:
+        filtered_openapi['components'] = components
+    else:
+        filtered_openapi.pop('components', None)
+
+    # Only keep the tag definitions that are still in use
+    if 'tags' in openapi_data:
+        filtered_openapi['tags'] = [entry for entry in openapi_data['tags'] if entry.get('name') == tag]
+    return filtered_openapi
+
+def filter_by_operations(openapi_data, operations, index=None):
+    # Self-contained subset of the document holding the given (path, method) operations
+    selected = {}
+    for path, method in operations:
+        selected.setdefault(path, []).append(method)
+
+    filtered_paths = {}
+    for path, methods in selected.items():
+        path_item = openapi_data['paths'][path]
+        filtered_paths[path] = {method: path_item[method] for method in methods}
+        if 'parameters' in path_item:
+            filtered_paths[path]['parameters'] = path_item['parameters']
+    components = collect_components(openapi_data, filtered_paths, index)
+
+    source_components = openapi_data.get('components') or {}
+    if 'securitySchemes' in source_components:
+        components['securitySchemes'] = source_components['securitySchemes']
+
+    filtered_openapi = dict(openapi_data)
+    filtered_openapi['paths'] = filtered_paths
+    if components:
+        filtered_openapi['components'] = components
+    else:
+        filtered_openapi.pop('components', None)
+
+    if 'tags' in openapi_data:
+        used_tags = {tag for path, method in operations for tag in openapi_data['paths'][path][method].get('tags', [])}
+        filtered_openapi['tags'] = [entry for entry in openapi_data['tags'] if entry.get('name') in used_tags]
+    return filtered_openapi
+
+def main(input_file, output_file, tag):
+    openapi_data = load_openapi(input_file)
+
+    # Filter endpoints and the components they reference by the given tag
+    filtered_openapi = filter_by_tag(openapi_data, tag)
 
     # Save to output file
     with open(output_file, 'w') as file:
-        yaml.safe_dump(filtered_openapi, file)
+        yaml.dump(filtered_openapi, file, Dumper=NoAliasDumper)
 
 if __name__ == "__main__":
     if len(sys.argv) != 4:
@@ -1,115 +1,256 @@
 import os
+import json
 import yaml
 import re
-from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
-from typing import Dict, Any
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_client import get_llm
+from typing import Dict, Any, List, Optional, Set, Tuple
+import cache
+from cache import cache_key, model_name
+from filter import slice_operation, build_ref_index
+import template
+import resources
+import telemetry
+from utils import invoke_with_retry
+from openapi import load_yaml, load_openapi
+from validate import validate_handlers
 
-def generate_handlers(serverless_yaml_path: str, openapi_yaml_path: str, example_handler_path: str, output_dir: str):
-    # Load environment variables and set up API key
-    load_dotenv()
-    os.environ["ANTHROPIC_API_KEY"] = os.getenv("ANTHROPIC_API_KEY")
+def load_example_handler(file_path: str) -> str:
+    with open(file_path, 'r') as file:
+        return file.read()
 
-    # Initialize ChatAnthropic
-    llm = ChatAnthropic(model="claude-3-5-sonnet-20240620")
+def extract_code(text: str) -> str:
+    # Try to find code between triple backticks
+    code_match = re.search(r'```python\n(.*?)```', text, re.DOTALL)
+    if code_match:
+        return code_match.group(1).strip()
 
-    def load_yaml(file_path: str) -> Dict[str, Any]:
-        with open(file_path, 'r') as file:
-            return yaml.safe_load(file)
+    # If no triple backticks, try to find the first Python-like code block
+    lines = text.split('\n')
+    code_lines = []
+    in_code_block = False
+    for line in lines:
+        if line.strip().startswith('def ') or line.strip().startswith('import '):
+            in_code_block = True
+        if in_code_block:
+            code_lines.append(line)
 
-    def load_example_handler(file_path: str) -> str:
-        with open(file_path, 'r') as file:
-            return file.read()
+    return '\n'.join(code_lines).strip()
 
+SYNTH_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synth.py')
+RESPONSE_CACHE_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'response_cache.py')
+STATE_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.py')
+
+MEMOIZE_HANDLER = '''
+
+# Responses are memoized by method, route and normalized path/query parameters
+import response_cache
+handler = response_cache.memoize_responses(handler)
+'''
+
+# How many times a handler that fails validation is sent back to the LLM
+VALIDATION_RETRIES = 2
+
+HANDLER_PROMPT_TEMPLATE = """
+    Modify the following example AWS Lambda handler to create a new handler for the function '{function_name}' with these specifications:
+
+    1. HTTP Method: {method}
+    2. Path: {path}
+    3. Summary: {summary}
+    4. Operation ID: {operation_id}
+
+    Example handler:
+    ```python
+    {example_handler}
+    ```
+    Handler requirements:
+    - The handler should be a function that takes an event and context as arguments, always called handler(event, context)
+    - The handler should return a response object with the following properties: statusCode, body, and headers
+    - The handler should write proper error handling and appropriate HTTP responses
+    - When neeeded use the logging library to log the request and response
+
+
+    To mock the api responses, use the following openapi spec for this endpoint which contains api responses examples:
+    ```yaml
+    {openapi_spec}
+    ```
+
+    Example success response body generated from the response schema, use it where the spec has no example:
+    ```json
+    {example_response}
+    ```
+
+    Requirements:
+    - The purpose of the handlers is to serve api endpoints that will be used to mock the api responses
+    - Make the api responses as realistic as possible
+    - Each handler will manage the function of a single endpoint
+    - Maintain the basic structure of the example handler
+    - Modify the logic to handle the specific HTTP method and path
+    - Parse any path parameters, query string parameters, and request body as needed
+    - Include error handling and appropriate HTTP responses
+    - Use boto3 for any AWS service interactions (if needed)
+    - Include comments explaining the main parts of the code
+
+    Please provide only the modified Python code for this Lambda handler, enclosed in triple backticks.
+    """
+
+VALIDATION_FEEDBACK_TEMPLATE = """
+    A previous version of this handler failed validation before deployment: {error}
+    Make sure the module compiles, defines handler(event, context) and returns a dict with an int statusCode and a string body.
+    """
+
+def generate_handler(llm, function_name: str, http_event: Dict[str, Any], openapi_spec: Dict[str, Any], example_handler: str, use_cache: bool = True, ref_index: Optional[Dict[str, Set[str]]] = None, feedback: Optional[str] = None) -> str:
+    path = http_event.get('path', '')
+    method = http_event.get('method', '').lower()
+
+    # Only send the operation and the components it references, not the whole document
+    operation_slice = slice_operation(openapi_spec, path, method, ref_index)
+    operation_spec = operation_slice['paths'][path][method]
+
+    # Reuse a previous generation when nothing that feeds the prompt has changed
+    key = cache_key('handler', model_name(llm), HANDLER_PROMPT_TEMPLATE, function_name, operation_slice, example_handler)
+    if use_cache and feedback is None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    prompt = HANDLER_PROMPT_TEMPLATE.format(
+        function_name=function_name,
+        method=method.upper(),
+        path=path,
+        summary=operation_spec.get('summary', 'No summary provided'),
+        operation_id=operation_spec.get('operationId', 'No operationId provided'),
+        example_handler=example_handler,
+        openapi_spec=yaml.safe_dump(operation_slice, sort_keys=False),
+        example_response=json.dumps(template.synthesize_example(operation_slice, path, method), indent=2)
+    )
+    # A regeneration after a failed validation replaces the cached handler that failed
+    if feedback is not None:
+        prompt += VALIDATION_FEEDBACK_TEMPLATE.format(error=feedback)
+
+    response = invoke_with_retry(llm, prompt, operation=function_name, temperature=0)
+    handler_code = extract_code(response.content)
+    if use_cache and handler_code:
+        cache.put(key, handler_code)
+    return handler_code
+
+def enumerate_http_events(serverless_config: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    # Producer: one job per http event declared in the serverless config
+    jobs = []
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        for event in function_config.get('events', []):
+            if 'http' in event:
+                jobs.append((function_name, event['http']))
+    return jobs
+
+def generate_handlers(serverless_yaml_path: str, openapi_yaml_path: str, example_handler_path: str, output_dir: str, concurrency: int = 1, llm=None, use_cache: bool = True, only: Optional[Set[str]] = None, engine: str = 'template', memoize: bool = False, validate: bool = False, stateful: bool = False) -> Dict[str, str]:
     # Load the example handler
     example_handler = load_example_handler(example_handler_path)
 
     # Load the YAML files
     serverless_config = load_yaml(serverless_yaml_path)
-    openapi_spec = load_yaml(openapi_yaml_path)
-
-    def extract_code(text: str) -> str:
-        # Try to find code between triple backticks
-        code_match = re.search(r'```python\n(.*?)```', text, re.DOTALL)
-        if code_match:
-            return code_match.group(1).strip()
-
-        # If no triple backticks, try to find the first Python-like code block
-        lines = text.split('\n')
-        code_lines = []
-        in_code_block = False
-        for line in lines:
-            if line.strip().startswith('def ') or line.strip().startswith('import '):
-                in_code_block = True
-            if in_code_block:
-                code_lines.append(line)
-
-        return '\n'.join(code_lines).strip()
-
-    def generate_handler(function_name: str, http_event: Dict[str, Any], openapi_spec: Dict[str, Any]) -> str:
-        path = http_event.get('path', '')
-        method = http_event.get('method', '').lower()
-
-        # Find the corresponding OpenAPI spec for this path and method
-        path_spec = openapi_spec.get('paths', {}).get(path, {})
-        operation_spec = path_spec.get(method, {})
-
-        prompt = f"""
-        Modify the following example AWS Lambda handler to create a new handler for the function '{function_name}' with these specifications:
-
-        1. HTTP Method: {method.upper()}
-        2. Path: {path}
-        3. Summary: {operation_spec.get('summary', 'No summary provided')}
-        4. Operation ID: {operation_spec.get('operationId', 'No operationId provided')}
-
-        Example handler:
-        ```python
-        {example_handler}
-        ```
-        Handler requirements:
-        - The handler should be a function that takes an event and context as arguments, always called handler(event, context)
-        - The handler should return a response object with the following properties: statusCode, body, and headers
-        - The handler should write proper error handling and appropriate HTTP responses
-        - When neeeded use the logging library to log the request and response
-
-
-        To mock the api responses, use the following openapi spec which contains api responses examples:
-        ```yaml
-        {openapi_spec}
-        ```
-
-        Requirements:
-        - The purpose of the handlers is to serve api endpoints that will be used to mock the api responses
-        - Make the api responses as realistic as possible
-        - Each handler will manage the function of a single endpoint
-        - Maintain the basic structure of the example handler
-        - Modify the logic to handle the specific HTTP method and path
-        - Parse any path parameters, query string parameters, and request body as needed
-        - Include error handling and appropriate HTTP responses
-        - Use boto3 for any AWS service interactions (if needed)
-        - Include comments explaining the main parts of the code
-
-        Please provide only the modified Python code for this Lambda handler, enclosed in triple backticks.
-        """
-        print("✨", end="", flush=True)
-        response = llm.invoke(prompt, temperature=0)
-        return extract_code(response.content)
-
-    # Generate handlers for each function
-    for function_name, function_config in serverless_config.get('functions', {}).items():
-        events = function_config.get('events', [])
-        for event in events:
-            if 'http' in event:
-                handler_code = generate_handler(function_name, event['http'], openapi_spec)
+    openapi_spec = load_openapi(openapi_yaml_path)
+
+    jobs = enumerate_http_events(serverless_config)
+    ref_index = build_ref_index(openapi_spec)
+
+    # The template engine handles every operation unless the LLM is requested globally or per operation
+    def uses_llm(http_event: Dict[str, Any]) -> bool:
+        return engine == 'llm' or template.wants_llm(openapi_spec, http_event.get('path', ''), http_event.get('method', ''))
+
+    if llm is None and any(uses_llm(http_event) for _, http_event in jobs):
+        llm = get_llm()
+
+    # Resources that keep state, everywhere with --stateful or where x-mockthis-state asks for it
+    tables = resources.resource_tables(openapi_spec, stateful)
+
+    def state_operation(http_event: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if uses_llm(http_event):
+            return None
+        return resources.state_operation(openapi_spec, http_event.get('path', ''), http_event.get('method', ''), tables)
 
-                # Create a directory for the handlers if it doesn't exist
-                os.makedirs(output_dir, exist_ok=True)
+    def build_handler(function_name: str, http_event: Dict[str, Any], feedback: Optional[str] = None) -> str:
+        with telemetry.span('handler', operation=function_name, engine='llm' if uses_llm(http_event) else 'template', regenerated=feedback is not None):
+            if uses_llm(http_event):
+                handler_code = generate_handler(llm, function_name, http_event, openapi_spec, example_handler, use_cache, ref_index, feedback)
+                return handler_code + MEMOIZE_HANDLER if memoize and handler_code else handler_code
+            return template.render_handler(function_name, http_event.get('path', ''), http_event.get('method', ''), openapi_spec, memoize, state_operation(http_event))
+
+    # Skip handlers that are already on disk and whose operation did not change
+    if only is not None:
+        jobs = [(function_name, http_event) for function_name, http_event in jobs
+                if function_name in only or not os.path.exists(f'{output_dir}/{function_name}.py')]
+
+    # Create a directory for the handlers if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Handlers of synthetic operations import synth.py from the root of the deployment package
+    states = [state for state in (state_operation(http_event) for _, http_event in jobs) if state is not None]
+    if any(template.wants_synth(openapi_spec, http_event.get('path', ''), http_event.get('method', '')) for _, http_event in jobs) \
+            or any(table.get('seed_items') for _, table in states):
+        shutil.copyfile(SYNTH_MODULE_PATH, os.path.join(os.path.dirname(os.path.abspath(output_dir)), 'synth.py'))
+    if states:
+        shutil.copyfile(STATE_MODULE_PATH, os.path.join(os.path.dirname(os.path.abspath(output_dir)), 'state.py'))
+    if memoize and any(uses_llm(http_event) for _, http_event in jobs):
+        shutil.copyfile(RESPONSE_CACHE_MODULE_PATH, os.path.join(os.path.dirname(os.path.abspath(output_dir)), 'response_cache.py'))
+
+    def write_handlers(jobs: List[Tuple[str, Dict[str, Any]]], feedback: Dict[str, str]) -> Dict[str, str]:
+        # Workers run the prompts; this thread writes each file as soon as its result comes back
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {
+                executor.submit(telemetry.in_context(build_handler), function_name, http_event, feedback.get(function_name)): function_name
+                for function_name, http_event in jobs
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                function_name = futures[future]
+                try:
+                    handler_code = future.result()
+                except Exception as error:
+                    failures[function_name] = str(error)
+                    print(f"[{completed}/{len(jobs)}] ❌ {function_name}: {error}", flush=True)
+                    continue
 
                 # Write the handler to a file
                 with open(f'{output_dir}/{function_name}.py', 'w') as file:
                     file.write(handler_code)
+                print(f"[{completed}/{len(jobs)}] ✨ {function_name}", flush=True)
+        return failures
+
+    failures = write_handlers(jobs, {})
+
+    # Smoke-test the written handlers before they are deployed; LLM handlers that fail are
+    # generated again with the error in the prompt
+    if validate:
+        http_events = dict(jobs)
+        pending = [function_name for function_name in http_events if function_name not in failures]
+        for attempt in range(VALIDATION_RETRIES + 1):
+            if not pending:
+                break
+            print(f"Validating {len(pending)} handler(s)... 🔎")
+            with telemetry.span('validate', handlers=len(pending)) as span:
+                invalid = validate_handlers(serverless_config, openapi_spec, output_dir, pending)
+                span.set('failures', len(invalid))
+            retry = {function_name: error for function_name, error in invalid.items() if uses_llm(http_events[function_name])}
+            if attempt == VALIDATION_RETRIES:
+                retry = {}
+            for function_name, error in invalid.items():
+                if function_name not in retry:
+                    failures[function_name] = f"failed validation: {error}"
+                    print(f"❌ {function_name} failed validation: {error}", flush=True)
+            if retry:
+                print(f"Regenerating {len(retry)} handler(s) that failed validation 🔁")
+                failures.update(write_handlers([(function_name, http_events[function_name]) for function_name in retry], retry))
+            pending = [function_name for function_name in retry if function_name not in failures]
+
+    if use_cache:
+        cache.evict()
+
+    if failures:
+        print(f"{len(failures)} handler(s) failed to generate: {', '.join(sorted(failures))}")
+    return failures
 
-    print("✨")
 if __name__ == "__main__":
     # This block will only run if the script is executed directly
     generate_handlers(
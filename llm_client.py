@@ -0,0 +1,28 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+MODEL_NAME = "claude-3-5-sonnet-20240620"
+
+_llm = None
+_lock = threading.Lock()
+
+def get_llm():
+    # One ChatAnthropic for every stage, so they all share its HTTP connection pool.
+    # langchain_anthropic is imported here rather than at module load: it dominates startup time.
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                # Load environment variables and set up API key
+                load_dotenv()
+                os.environ["ANTHROPIC_API_KEY"] = os.getenv("ANTHROPIC_API_KEY")
+
+                from langchain_anthropic import ChatAnthropic
+                _llm = ChatAnthropic(model=MODEL_NAME)
+    return _llm
+
+def set_llm(llm):
+    # Swap the shared client, e.g. for fake_llm.FakeChatModel in benchmarks
+    global _llm
+    _llm = llm
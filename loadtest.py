@@ -0,0 +1,260 @@
+# python loadtest.py --config deploy/api.yml --openapi input/openapi.yml --requests 10000 --concurrency 4 --allocations
+# python loadtest.py --config deploy/api.yml --replay traffic.har --url http://localhost:3000 --concurrency 16
+import sys
+import json
+import math
+import time
+import threading
+import argparse
+import tracemalloc
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from urllib.parse import urlsplit
+import local
+from router import Router
+from monolith import http_events
+from openapi import load_yaml, load_openapi
+from validate import smoke_requests
+from benchmark import print_report
+
+# Load harness for the generated handlers: requests derived from the spec's operations, or replayed
+# from captured traffic, are sent in-process through the same dispatch as local.py or over HTTP to
+# any stand-in, and latency percentiles, throughput and allocations are reported per operation.
+
+VARIANTS = 10
+ALLOCATION_SAMPLES = 50
+MAX_REGRESSION = 0.2
+
+def label_router(serverless_config: Dict[str, Any]) -> Router:
+    # Route table of function names, used to attribute any request to its operation
+    router = Router()
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        for http_event in http_events(function_config):
+            router.add(http_event.get('method', 'any'), '/' + str(http_event.get('path', '')).lstrip('/'), function_name)
+    return router
+
+def generate_requests(serverless_config: Dict[str, Any], openapi_spec: Dict[str, Any], variants: int = VARIANTS) -> List[Dict[str, Any]]:
+    # A few seeded variants of every operation, so parameters and bodies differ between requests
+    requests = []
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        for seed in range(variants):
+            for method, target, headers, body, _, _ in smoke_requests(openapi_spec, http_events(function_config), seed):
+                requests.append({'operation': function_name, 'method': method, 'target': target, 'headers': headers, 'body': body})
+    return requests
+
+def load_traffic(traffic_path: str) -> List[Dict[str, Any]]:
+    # A HAR capture, or JSON lines of {method, url or path, headers, body}
+    requests = []
+    with open(traffic_path, 'r') as file:
+        if traffic_path.endswith('.har'):
+            for entry in json.load(file).get('log', {}).get('entries', []):
+                request = entry.get('request') or {}
+                requests.append({
+                    'method': request.get('method', 'GET'),
+                    'url': request.get('url', '/'),
+                    'headers': {header['name']: header['value'] for header in request.get('headers', []) if not header['name'].startswith(':')},
+                    'body': (request.get('postData') or {}).get('text')
+                })
+        else:
+            requests = [json.loads(line) for line in file if line.strip()]
+
+    replayed = []
+    for request in requests:
+        url = urlsplit(request.get('url') or request.get('path') or '/')
+        body = request.get('body')
+        if body is not None and not isinstance(body, str):
+            body = json.dumps(body)
+        # Hop-by-hop and length headers are recomputed for the replayed body
+        headers = {name: str(value) for name, value in (request.get('headers') or {}).items()
+                   if name.lower() not in ('host', 'content-length', 'connection', 'transfer-encoding')}
+        replayed.append({
+            'operation': None,
+            'method': str(request.get('method', 'GET')).upper(),
+            'target': (url.path or '/') + (f"?{url.query}" if url.query else ''),
+            'headers': headers,
+            'body': (body or '').encode()
+        })
+    return replayed
+
+def label_requests(requests: List[Dict[str, Any]], router: Router) -> List[Dict[str, Any]]:
+    for request in requests:
+        if request['operation'] is None:
+            function_name, _, _, _ = router.match(request['method'], urlsplit(request['target']).path)
+            request['operation'] = function_name or f"{request['method']} {urlsplit(request['target']).path} (unrouted)"
+    return requests
+
+def in_process_sender(config_path: str) -> Callable[[Dict[str, Any]], int]:
+    # Handlers are imported once up front, so the timings only cover warm invocations
+    router = local.load_routes(config_path)
+
+    def send(request: Dict[str, Any]) -> int:
+        status, _, _ = local.dispatch(router, request['method'], request['target'], request['headers'], request['body'])
+        return status
+    return send
+
+def http_sender(base_url: str) -> Callable[[Dict[str, Any]], int]:
+    # One keep-alive connection per worker thread
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    connections = threading.local()
+
+    def send(request: Dict[str, Any]) -> int:
+        for attempt in range(2):
+            connection = getattr(connections, 'connection', None)
+            if connection is None:
+                connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+                connection = connections.connection = connection_class(url.hostname, url.port, timeout=30)
+            try:
+                connection.request(request['method'], prefix + request['target'], body=request['body'] or None, headers=request['headers'])
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (ConnectionError, http.client.HTTPException):
+                connection.close()
+                connections.connection = None
+                if attempt:
+                    raise
+    return send
+
+def run_load(send: Callable[[Dict[str, Any]], int], requests: List[Dict[str, Any]], total: int, concurrency: int = 1) -> Tuple[List[Tuple[str, int, int]], float]:
+    # Cycles through the request set until total requests were sent by concurrency threads;
+    # returns (operation, latency in ns, status) samples and the wall time
+    def worker(offset: int) -> List[Tuple[str, int, int]]:
+        samples = []
+        for index in range(offset, total, concurrency):
+            request = requests[index % len(requests)]
+            started = time.perf_counter_ns()
+            try:
+                status = send(request)
+            except Exception:
+                status = 599
+            samples.append((request['operation'], time.perf_counter_ns() - started, status))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    wall_time = time.perf_counter() - started
+    return [sample for samples in results for sample in samples], wall_time
+
+def measure_allocations(send: Callable[[Dict[str, Any]], int], requests: List[Dict[str, Any]], samples: int = ALLOCATION_SAMPLES) -> Dict[str, Dict[str, float]]:
+    # A separate pass, tracemalloc slows every allocation down and would skew the latencies:
+    # peak memory allocated while a request runs, and blocks still allocated once it returned
+    by_operation = {}
+    for request in requests:
+        by_operation.setdefault(request['operation'], []).append(request)
+
+    allocations = {}
+    tracemalloc.start()
+    try:
+        for operation, operation_requests in by_operation.items():
+            peaks, retained = [], []
+            for index in range(samples):
+                request = operation_requests[index % len(operation_requests)]
+                blocks = sys.getallocatedblocks()
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                send(request)
+                _, peak = tracemalloc.get_traced_memory()
+                retained.append(sys.getallocatedblocks() - blocks)
+                peaks.append(peak - before)
+            allocations[operation] = {'peak_kb': round(max(peaks) / 1024, 1), 'retained_blocks': round(sum(retained) / len(retained), 1)}
+    finally:
+        tracemalloc.stop()
+    return allocations
+
+def percentile(values: List[int], fraction: float) -> int:
+    # Nearest rank on sorted values: the smallest value with at least fraction of the values at or below it.
+    # The rank is rounded first so float error (0.07 * 100 = 7.000000000000001) cannot push it up one
+    return values[max(0, math.ceil(round(fraction * len(values), 9)) - 1)]
+
+def summarize(samples: List[Tuple[str, int, int]], wall_time: float, allocations: Optional[Dict[str, Dict[str, float]]] = None) -> List[Dict[str, Any]]:
+    by_operation = {}
+    for operation, latency, status in samples:
+        by_operation.setdefault(operation, []).append((latency, status))
+
+    def row(operation: str, entries: List[Tuple[int, int]]) -> Dict[str, Any]:
+        latencies = sorted(latency for latency, _ in entries)
+        result = {
+            'operation': operation,
+            'requests': len(entries),
+            'errors': sum(1 for _, status in entries if status >= 500),
+            'rps': round(len(entries) / wall_time, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) / 1e6, 3),
+            'p50_ms': round(percentile(latencies, 0.50) / 1e6, 3),
+            'p95_ms': round(percentile(latencies, 0.95) / 1e6, 3),
+            'p99_ms': round(percentile(latencies, 0.99) / 1e6, 3),
+            'max_ms': round(latencies[-1] / 1e6, 3)
+        }
+        if allocations is not None:
+            result.update(allocations.get(operation, {'peak_kb': '-', 'retained_blocks': '-'}))
+        return result
+
+    rows = sorted((row(operation, entries) for operation, entries in by_operation.items()), key=lambda result: result['p95_ms'], reverse=True)
+    rows.append(row('TOTAL', [entry for entries in by_operation.values() for entry in entries]))
+    return rows
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float = MAX_REGRESSION) -> List[str]:
+    # Operations whose p95 latency grew by more than max_regression since the baseline run
+    previous = {result['operation']: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result['operation'])
+        if before and before['p95_ms'] > 0 and result['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{result['operation']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the latency of the generated handlers under load")
+    parser.add_argument('--config', default='deploy/api.yml', help="Path to the generated serverless configuration")
+    parser.add_argument('--openapi', default='input/openapi.yml', help="Path to the OpenAPI spec the requests are derived from")
+    parser.add_argument('--replay', help="Replay a HAR or JSON lines traffic file instead of deriving requests from the spec")
+    parser.add_argument('--url', help="Send the requests to this base URL, e.g. http://localhost:3000, instead of invoking the handlers in-process")
+    parser.add_argument('--requests', type=int, help="Total number of requests, defaults to 10 passes over the request set")
+    parser.add_argument('--variants', type=int, default=VARIANTS, help="Seeded variants of each operation when deriving requests from the spec")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of concurrent clients")
+    parser.add_argument('--allocations', action='store_true', help="Also measure memory allocated per request, in-process only")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Results of a previous run, exit with an error when a p95 regressed")
+    parser.add_argument('--max-regression', type=float, default=MAX_REGRESSION, help="Allowed p95 growth over the baseline, 0.2 for 20%%")
+    args = parser.parse_args()
+
+    serverless_config = load_yaml(args.config) or {}
+    if args.replay:
+        requests = load_traffic(args.replay)
+    else:
+        requests = generate_requests(serverless_config, load_openapi(args.openapi), args.variants)
+    requests = label_requests(requests, label_router(serverless_config))
+    if not requests:
+        print("No requests to send.")
+        sys.exit(1)
+
+    send = http_sender(args.url) if args.url else in_process_sender(args.config)
+    total = args.requests or len(requests) * 10
+    target = args.url or 'in-process handlers'
+    print(f"Sending {total} requests ({len(requests)} distinct) to {target} with concurrency {args.concurrency}... ⏱️", file=sys.stderr)
+
+    # One warm-up pass, so cold imports and first-call caches are not measured
+    for request in requests:
+        try:
+            send(request)
+        except Exception:
+            pass
+    samples, wall_time = run_load(send, requests, total, max(1, args.concurrency))
+    allocations = measure_allocations(send, requests) if args.allocations and not args.url else None
+
+    results = summarize(samples, wall_time, allocations)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No latency regressions against the baseline. ✅")
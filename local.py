@@ -0,0 +1,239 @@
+# python local.py --config deploy/api.yml --port 3000 --workers 4
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import asyncio
+import argparse
+import importlib.util
+import multiprocessing
+from http import HTTPStatus
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+from router import Router
+from openapi import load_yaml
+
+PORT = 3000
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+class LambdaContext:
+    def __init__(self, function_name: str):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.memory_limit_in_mb = 1024
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f"arn:aws:lambda:local:000000000000:function:{function_name}"
+        self.log_group_name = f"/aws/lambda/{function_name}"
+        self.log_stream_name = 'local'
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 30000
+
+def load_handler(base_dir: str, handler_ref: str, modules: Dict[str, Any]):
+    # 'handlers/get_users.handler' -> function 'handler' in <base_dir>/handlers/get_users.py
+    module_path, _, function_name = handler_ref.rpartition('.')
+    if module_path not in modules:
+        file_path = os.path.join(base_dir, f"{module_path}.py")
+        module_spec = importlib.util.spec_from_file_location(module_path.replace('/', '.'), file_path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        modules[module_path] = module
+    return getattr(modules[module_path], function_name)
+
+def load_routes(config_path: str) -> Router:
+    # Import every handler once and register each http event in the route table
+    serverless_config = load_yaml(config_path) or {}
+
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+
+    router = Router()
+    modules = {}
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        try:
+            handler = load_handler(base_dir, function_config['handler'], modules)
+        except Exception as error:
+            print(f"⚠️ Skipping {function_name}: could not import {function_config.get('handler')}: {error!r}")
+            continue
+        for event in function_config.get('events', []):
+            http_event = event.get('http') if isinstance(event, dict) else None
+            if isinstance(http_event, str):
+                method, _, path = http_event.partition(' ')
+                http_event = {'method': method, 'path': path}
+            if not isinstance(http_event, dict):
+                continue
+            path = '/' + http_event.get('path', '').lstrip('/')
+            router.add(http_event.get('method', 'any'), path, (function_name, handler))
+    return router
+
+def build_event(method: str, target: str, headers: Dict[str, str], body: bytes, path_parameters: Dict[str, str], resource: str) -> Dict[str, Any]:
+    # Lambda proxy integration event, as API Gateway REST APIs send it
+    url = urlsplit(target)
+    query = parse_qsl(url.query, keep_blank_values=True)
+    multi_value_query = {}
+    for name, value in query:
+        multi_value_query.setdefault(name, []).append(value)
+
+    try:
+        decoded_body = body.decode() if body else None
+        is_base64 = False
+    except UnicodeDecodeError:
+        decoded_body = base64.b64encode(body).decode()
+        is_base64 = True
+
+    return {
+        'resource': resource,
+        'path': url.path,
+        'httpMethod': method,
+        'headers': headers,
+        'multiValueHeaders': {name: [value] for name, value in headers.items()},
+        'queryStringParameters': dict(query) or None,
+        'multiValueQueryStringParameters': multi_value_query or None,
+        'pathParameters': path_parameters or None,
+        'stageVariables': None,
+        'requestContext': {
+            'resourcePath': resource,
+            'httpMethod': method,
+            'path': url.path,
+            'stage': 'local',
+            'requestId': str(uuid.uuid4()),
+            'requestTimeEpoch': int(time.time() * 1000),
+            'identity': {'sourceIp': '127.0.0.1'}
+        },
+        'body': decoded_body,
+        'isBase64Encoded': is_base64
+    }
+
+def dispatch(router: Router, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    path = urlsplit(target).path
+    route, path_parameters, resource, path_exists = router.match(method, path)
+    if route is None:
+        status = 405 if path_exists else 404
+        return status, {'Content-Type': 'application/json'}, json.dumps({'message': HTTPStatus(status).phrase}).encode()
+
+    function_name, handler = route
+    event = build_event(method, target, headers, body, path_parameters, resource)
+    try:
+        result = handler(event, LambdaContext(function_name))
+    except Exception as error:
+        print(f"❌ {function_name}: {error!r}", flush=True)
+        return 502, {'Content-Type': 'application/json'}, json.dumps({'message': 'Internal server error'}).encode()
+    # API Gateway answers 502 to a proxy integration that does not return a response object
+    if not isinstance(result, dict):
+        print(f"❌ {function_name}: handler returned {type(result).__name__}, expected a dict", flush=True)
+        return 502, {'Content-Type': 'application/json'}, json.dumps({'message': 'Internal server error'}).encode()
+
+    response_headers = {str(name): str(value) for name, value in (result.get('headers') or {}).items()}
+    for name, values in (result.get('multiValueHeaders') or {}).items():
+        response_headers[str(name)] = ', '.join(str(value) for value in values)
+    response_body = result.get('body') or ''
+    if result.get('isBase64Encoded'):
+        payload = base64.b64decode(response_body)
+    else:
+        payload = response_body.encode() if isinstance(response_body, str) else json.dumps(response_body).encode()
+    return int(result.get('statusCode', 200)), response_headers, payload
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, version = request_line.decode('latin-1').strip().split(' ', 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip()] = value.strip()
+
+    lower_headers = {name.lower(): value for name, value in headers.items()}
+    length = int(lower_headers.get('content-length', 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise ValueError('Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, version, headers, body
+
+def serialize_response(status: int, headers: Dict[str, str], payload: bytes, keep_alive: bool) -> bytes:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    headers = {name: value for name, value in headers.items() if name.lower() not in ('content-length', 'connection')}
+    headers.setdefault('Content-Type', 'application/json')
+    headers['Content-Length'] = str(len(payload))
+    headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload
+
+def make_connection_handler(router: Router):
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(serialize_response(400, {}, b'{"message": "Bad Request"}', False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+
+                # HTTP/1.1 keeps connections open unless the client asks otherwise
+                connection = next((value.lower() for name, value in headers.items() if name.lower() == 'connection'), '')
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                status, response_headers, payload = dispatch(router, method, target, headers, body)
+                writer.write(serialize_response(status, response_headers, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+async def serve(config_path: str, host: str, port: int, reuse_port: bool = False):
+    router = load_routes(config_path)
+    server = await asyncio.start_server(make_connection_handler(router), host, port, reuse_port=reuse_port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+def run_worker(config_path: str, host: str, port: int, reuse_port: bool):
+    try:
+        asyncio.run(serve(config_path, host, port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+def main(config_path: str, host: str, port: int, workers: int):
+    print(f"Serving mock API from {config_path} at http://{host or 'localhost'}:{port} with {workers} worker(s) 🧪")
+    if workers <= 1:
+        run_worker(config_path, host, port, False)
+        return
+
+    # Each worker runs its own event loop on a shared SO_REUSEPORT socket
+    processes = [multiprocessing.Process(target=run_worker, args=(config_path, host, port, True)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the generated handlers locally without deploying to AWS")
+    parser.add_argument('--config', default='deploy/api.yml', help="Path to the generated serverless configuration")
+    parser.add_argument('--host', default='', help="Interface to bind")
+    parser.add_argument('--port', type=int, default=PORT, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
+
+    main(args.config, args.host, args.port, args.workers)
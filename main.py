@@ -1,12 +1,22 @@
 import os
 import sys
 import spec
+import openapi
+import manifest
+import deploy_info
 import implement
+import monolith
+import bundle
 import document
+import runner
+import shard
+import telemetry
+import template
+import resources
 import argparse
 from dotenv import load_dotenv
 
-def main(input_arg):
+def main(input_arg, concurrency=1, use_cache=True, force=False, engine='template', batch_size=1, token_budget=None, dry_run=False, mode='functions', memoize=False, validate=True, stateful=False, profile=bundle.DEFAULT_PROFILE):
     # Check that the input file exists
     if not os.path.exists(input_arg):
         print(f"Input file {input_arg} does not exist")
@@ -14,23 +24,86 @@ def main(input_arg):
     else:
         print(f"Processing file {input_arg} 👷")
 
+    # Diff the spec against the last build to find the operations that need regenerating
+    openapi_content = openapi.load_openapi(input_arg)
+    api_functions = spec.extract_api_functions(openapi_content)
+    previous_manifest = manifest.load_manifest()
+    current_manifest = manifest.build_manifest(openapi_content, api_functions, {'engine': engine, 'memoize': memoize, 'stateful': stateful, 'profile': profile, 'mode': mode})
+    diff = manifest.diff_manifests(previous_manifest, current_manifest)
+
+    # Every deployed function has its own tables, so a write made by one operation's function is never
+    # read by another's: state is only shared when a single function serves every operation
+    if mode == 'functions' and resources.resource_tables(openapi_content, stateful):
+        if stateful and not dry_run:
+            print("--stateful needs a single function to share its tables, use --mode monolith or run local.py. ❌")
+            sys.exit(1)
+        print("⚠️ Stateful resources only keep their writes with --mode monolith or local.py, each deployed function has its own tables")
+
+    if dry_run:
+        print_plan(openapi_content, previous_manifest, current_manifest, diff, force, engine)
+        return
+
+    regenerate = None
+    if not force and os.path.exists('deploy/api.yml'):
+        if not manifest.has_changes(diff):
+            print("No operations changed since the last build, skipping generation and deployment. 💤")
+            return
+        regenerate = {current_manifest['operations'][key]['function'] for key in diff['added'] + diff['changed']}
+        print(f"Operations added: {len(diff['added'])}, changed: {len(diff['changed'])}, removed: {len(diff['removed'])} 🔍")
+
+    # Install the deployment plugin in the background while the platform is being generated
+    npm_step = runner.start_step(install_deploy_dependencies)
+
     # Generate serverless.yml
-    spec.generate_serverless_config(input_arg)
+    with runner.timed_step("spec"):
+        spec.generate_serverless_config(input_arg, concurrency=concurrency, use_cache=use_cache, regenerate=regenerate,
+            batch_size=batch_size, token_budget=token_budget)
 
     print("Platform deployment file generated. 🏗️")
 
+    # Delete the handlers of operations that no longer exist in the spec
+    current_functions = {func['name'] for func in api_functions}
+    for key in diff['removed']:
+        function_name = previous_manifest['operations'][key]['function']
+        handler_path = f'deploy/handlers/{function_name}.py'
+        if function_name not in current_functions and os.path.exists(handler_path):
+            os.remove(handler_path)
+
     #implement the platform
     print("Implementing platform functions and logic... 🔨")
-    implement.generate_handlers(serverless_yaml_path='deploy/api.yml',
-        openapi_yaml_path=input_arg,
-        example_handler_path='input/handler.py',
-        output_dir='deploy/handlers')
+    with runner.timed_step("implement"):
+        failures = implement.generate_handlers(serverless_yaml_path='deploy/api.yml',
+            openapi_yaml_path=input_arg,
+            example_handler_path='input/handler.py',
+            output_dir='deploy/handlers',
+            concurrency=concurrency,
+            use_cache=use_cache,
+            only=regenerate,
+            engine=engine,
+            memoize=memoize,
+            validate=validate,
+            stateful=stateful)
+
+    if failures:
+        print("Some platform functions could not be implemented, aborting deployment.")
+        sys.exit(1)
 
     print("Platform functions and logic implemented. 🧠")
 
-    #deploy the platform, run command line
+    # In monolith mode a single function routes every request to the operation handlers
+    deploy_config = 'api.yml'
+    if mode == 'monolith':
+        deploy_config = os.path.basename(monolith.write_monolith('deploy/api.yml'))
+        print("Single-function dispatcher generated. 🧱")
+
+    # Package each function with only what its handler imports, in a derived configuration
+    with runner.timed_step("package"):
+        package_report = bundle.write_packaging(os.path.join('deploy', deploy_config), profile)
+    bundle.print_report(package_report)
+    deploy_config = os.path.basename(package_report['config'])
+
+    #deploy the platform
     print("Deploying platform... 🚀")
-    os.system("touch deploy/deploy.log")
 
     # Load environment variables from .env file
     load_dotenv()
@@ -44,27 +117,82 @@ def main(input_arg):
         print("Please set AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables.")
         sys.exit(1)
 
-    # Construct the serverless deploy command with environment variables
-    deploy_command = f"cd deploy && AWS_ACCESS_KEY_ID={aws_access_key_id} AWS_SECRET_ACCESS_KEY={aws_secret_access_key} serverless deploy --config api.yml --stage dev >> deploy.log"
-
-    # Execute the deploy command
-    os.system(deploy_command)
+    try:
+        npm_result = npm_step.wait()
+    except Exception as error:
+        print(f"Installing the deployment dependencies failed: {error!r}")
+        sys.exit(1)
+    if npm_result is not None and not npm_result.ok:
+        print("Installing the deployment dependencies failed, see deploy/npm.log.")
+        sys.exit(1)
 
-    # log os.system output
-    print("Platform deployed. ✅ 🛰️")
+    # Credentials are passed through the environment, never on the command line
+    credentials = {'AWS_ACCESS_KEY_ID': aws_access_key_id, 'AWS_SECRET_ACCESS_KEY': aws_secret_access_key}
     print("-----------------------------------")
-    os.system("cd deploy && npm init --yes && npm install serverless-python-requirements --save")
-    os.system("cd deploy && serverless deploy --config api.yml --stage dev")
-    os.system("cd deploy && serverless info --config api.yml --stage dev")
+    deploy_result = runner.run_step("deploy",
+        runner.command_line(runner.SERVERLESS_BIN, 'deploy', '--config', deploy_config, '--stage', 'dev'),
+        cwd='deploy', env=credentials, log_path='deploy/deploy.log')
+    if not deploy_result.ok:
+        print("-----------------------------------")
+        print("Platform deployment failed, see deploy/deploy.log. ❌")
+        runner.print_timings()
+        sys.exit(1)
+
+    # Record the build only once the deploy went through
+    manifest.save_manifest(current_manifest)
+    runner.run_step("info",
+        runner.command_line(runner.SERVERLESS_BIN, 'info', '--config', deploy_config, '--stage', 'dev'),
+        cwd='deploy', env=credentials, log_path='deploy/deploy.log')
     print("-----------------------------------")
+    print("Platform deployed. ✅ 🛰️")
+
+    # Keep only what consumers need from the deploy output: endpoints, stage, region and functions
+    with open('deploy/deploy.log', 'r') as file:
+        deploy_info.save_deploy_info(deploy_info.parse_deploy_log(file.read()))
 
     #generate documentation
     print("Generating API documentation... 📝")
-    documentation = document.generate_api_documentation(serverless_yaml_path='deploy/api.yml',
-        openapi_yaml_path=input_arg,
-        deploy_log_path='deploy/deploy.log')
-    document.save_documentation(documentation, 'deploy/API_DOCUMENTATION.md')
+    with runner.timed_step("document"):
+        document.generate_api_documentation(serverless_yaml_path='deploy/api.yml',
+            openapi_yaml_path=input_arg,
+            deploy_info_path='deploy/deploy.json',
+            output_path='deploy/API_DOCUMENTATION.md',
+            concurrency=concurrency,
+            use_cache=use_cache)
     print("API documentation generated. 📚")
+    runner.print_timings()
+
+def print_plan(openapi_content, previous_manifest, current_manifest, diff, force, engine):
+    # What a build would do, without loading the LLM client, generating or deploying anything
+    if force or not os.path.exists('deploy/api.yml'):
+        diff = dict(diff, added=diff['added'] + diff['changed'] + diff['unchanged'], changed=[], unchanged=[])
+
+    print("Dry run, nothing will be generated or deployed. 🧾")
+    for status, symbol in (('added', '+'), ('changed', '~'), ('removed', '-')):
+        manifest_operations = (previous_manifest if status == 'removed' else current_manifest)['operations']
+        for key in diff[status]:
+            operation = manifest_operations[key]
+            backend = ''
+            if status != 'removed':
+                uses_llm = engine == 'llm' or template.wants_llm(openapi_content, operation['path'], operation['method'])
+                backend = ' (llm)' if uses_llm else ' (template)'
+            print(f"  {symbol} {operation['method'].upper():<7} {operation['path']} -> {operation['function']}{backend}")
+    print(f"Operations added: {len(diff['added'])}, changed: {len(diff['changed'])}, removed: {len(diff['removed'])}, "
+          f"unchanged: {len(diff['unchanged'])} 🔍")
+    if not manifest.has_changes(diff):
+        print("A build would skip generation and deployment. 💤")
+
+def install_deploy_dependencies():
+    # Only touch npm when the plugin is not installed yet
+    os.makedirs('deploy', exist_ok=True)
+    commands = []
+    if not os.path.exists('deploy/package.json'):
+        commands.append(runner.command_line(runner.NPM_BIN, 'init', '--yes'))
+    if not os.path.exists('deploy/node_modules/serverless-python-requirements'):
+        commands.append(runner.command_line(runner.NPM_BIN, 'install', 'serverless-python-requirements', '--save'))
+    if not commands:
+        return None
+    return runner.run_steps("npm", commands, cwd='deploy', log_path='deploy/npm.log', echo=False)
 
 
 def generate_serverless_yml(data):
@@ -80,6 +208,36 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Generate serverless configuration from OpenAPI spec")
     parser.add_argument('--input', required=True, help="Path to the OpenAPI YAML file")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of concurrent LLM calls per stage")
+    parser.add_argument('--batch-size', type=int, default=1, help="Number of operations per serverless configuration LLM call")
+    parser.add_argument('--token-budget', type=int, help="Fill each serverless configuration LLM call with operations up to this many prompt tokens")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not update the generation cache")
+    parser.add_argument('--force', action='store_true', help="Regenerate every operation, ignoring the last build manifest")
+    parser.add_argument('--engine', choices=['template', 'llm'], default='template', help="Backend used to generate the handlers")
+    parser.add_argument('--mode', choices=['functions', 'monolith'], default='functions', help="Deploy one function per operation, or a single function that routes every request")
+    parser.add_argument('--memoize', action='store_true', help="Generate handlers that serialize their responses once and cache them by parameters")
+    parser.add_argument('--stateful', action='store_true', help="Back every collection/item resource with an indexed table so CRUD requests change what later requests return")
+    parser.add_argument('--profile', choices=sorted(bundle.PROFILES), default=bundle.DEFAULT_PROFILE, help="Runtime, architecture, memory size and timeout of the deployed functions")
+    parser.add_argument('--skip-validation', action='store_true', help="Deploy the generated handlers without compiling and smoke-invoking them first")
+    parser.add_argument('--otlp', action='store_true', help="Also write the run report as OTLP/JSON spans to deploy/run-report.otlp.json")
+    parser.add_argument('--shard-by', choices=['tag', 'size'], help="Split the spec into services by tag or by size and build them in parallel, each as its own stack")
+    parser.add_argument('--max-operations', type=int, default=shard.MAX_SHARD_OPERATIONS, help="Largest number of operations in a shard")
+    parser.add_argument('--shard-workers', type=int, help="Number of shards built at once, defaults to the CPU count")
+    parser.add_argument('--dry-run', action='store_true', help="Print the operations a build would regenerate, then exit")
     args = parser.parse_args()
 
-    output_file = main(args.input)
+    options = dict(concurrency=args.concurrency, use_cache=not args.no_cache, force=args.force, engine=args.engine,
+        batch_size=args.batch_size, token_budget=args.token_budget, dry_run=args.dry_run, mode=args.mode, memoize=args.memoize,
+        validate=not args.skip_validation, stateful=args.stateful, profile=args.profile)
+    try:
+        if args.shard_by:
+            # Each shard runs this same pipeline from its own directory, see shard.py
+            if shard.build_shards(args.input, by=args.shard_by, max_operations=args.max_operations, workers=args.shard_workers, **options):
+                sys.exit(1)
+        else:
+            output_file = main(args.input, **options)
+    finally:
+        # Failed runs are reported too, with the failing stage marked
+        report_path = telemetry.write_report(otlp_path=telemetry.OTLP_PATH if args.otlp else None)
+        if report_path:
+            print(f"Run report written to {report_path} 📊")
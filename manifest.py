@@ -0,0 +1,67 @@
+import os
+import json
+import hashlib
+from typing import Dict, Any, List, Optional
+from filter import slice_operation, build_ref_index
+
+MANIFEST_PATH = "deploy/manifest.json"
+
+def hash_content(content: Any) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def operation_key(path: str, method: str, operation_id: Optional[str]) -> str:
+    return f"{method.upper()} {path} {operation_id or '-'}"
+
+def build_manifest(openapi_content: Dict[str, Any], api_functions: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    operations = {}
+    ref_index = build_ref_index(openapi_content)
+    for func in api_functions:
+        key = operation_key(func['path'], func['method'], func.get('operationId'))
+        operations[key] = {
+            'function': func['name'],
+            'path': func['path'],
+            'method': func['method'],
+            'operationId': func.get('operationId'),
+            'hash': hash_content(slice_operation(openapi_content, func['path'], func['method'], ref_index))
+        }
+
+    # Service-level settings feed every prompt and generation options shape every handler,
+    # so a change to either invalidates every operation
+    service = openapi_content.get('info', {})
+    if options:
+        service = {'info': service, 'options': options}
+    return {
+        'service_hash': hash_content(service),
+        'operations': operations
+    }
+
+def load_manifest(manifest_path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'service_hash': None, 'operations': {}}
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: str = MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+def diff_manifests(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    old_operations = old.get('operations', {})
+    new_operations = new.get('operations', {})
+    service_changed = old.get('service_hash') != new.get('service_hash')
+
+    diff = {'added': [], 'changed': [], 'removed': [], 'unchanged': []}
+    for key, entry in new_operations.items():
+        if key not in old_operations:
+            diff['added'].append(key)
+        elif service_changed or old_operations[key]['hash'] != entry['hash']:
+            diff['changed'].append(key)
+        else:
+            diff['unchanged'].append(key)
+    diff['removed'] = [key for key in old_operations if key not in new_operations]
+    return diff
+
+def has_changes(diff: Dict[str, List[str]]) -> bool:
+    return bool(diff['added'] or diff['changed'] or diff['removed'])
@@ -0,0 +1,118 @@
+# python monolith.py deploy/api.yml
+import os
+import sys
+import shutil
+import pprint
+import yaml
+from typing import Dict, Any, List, Tuple
+from openapi import load_yaml
+
+# Monolith mode: instead of one Lambda function per operation, a single function with a catch-all
+# http event routes every request to the operation's handler module, imported on first use.
+
+MONOLITH_CONFIG = 'api.monolith.yml'
+DISPATCH_MODULE = 'dispatch'
+FUNCTION_NAME = 'api'
+ROUTER_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'router.py')
+
+DISPATCHER_TEMPLATE = '''import json
+import importlib
+from router import Router
+
+# Single-function entry point for '{service}', generated from the serverless configuration.
+# Every request reaches this handler and is routed to its operation's handler module.
+
+ROUTES = {routes}
+
+router = Router()
+for method, template, module_name, function_name in ROUTES:
+    router.add(method, template, (module_name, function_name))
+
+handlers = {{}}
+
+def load_handler(target):
+    # Handler modules are imported on their first request, so a cold start only pays for the router
+    handler_function = handlers.get(target)
+    if handler_function is None:
+        module_name, function_name = target
+        handler_function = handlers[target] = getattr(importlib.import_module(module_name), function_name)
+    return handler_function
+
+def handler(event, context):
+    target, path_parameters, resource, path_exists = router.match(event.get('httpMethod', ''), event.get('path') or '/')
+    if target is None:
+        status_code, message = (405, 'Method not allowed') if path_exists else (404, 'Not found')
+        return {{
+            "statusCode": status_code,
+            "headers": {{"Content-Type": "application/json"}},
+            "body": json.dumps({{'message': message}})
+        }}
+
+    # Present the event as API Gateway would to the operation's own function
+    event = dict(event, resource=resource, pathParameters=path_parameters or None)
+    return load_handler(target)(event, context)
+'''
+
+def http_events(function_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Both the long form ({method, path}) and the short form ('GET /users') of http events
+    events = []
+    for event in function_config.get('events') or []:
+        http_event = event.get('http') if isinstance(event, dict) else None
+        if isinstance(http_event, str):
+            method, _, path = http_event.partition(' ')
+            http_event = {'method': method, 'path': path}
+        if isinstance(http_event, dict):
+            events.append(http_event)
+    return events
+
+def build_routes(serverless_config: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+    # (method, path template, handler module, handler function) for every http event
+    routes = []
+    for function_config in (serverless_config.get('functions') or {}).values():
+        module_path, _, function_name = function_config['handler'].rpartition('.')
+        for http_event in http_events(function_config):
+            path = '/' + str(http_event.get('path', '')).lstrip('/')
+            routes.append((str(http_event.get('method', 'any')).upper(), path, module_path.replace('/', '.'), function_name))
+    return routes
+
+def render_dispatcher(serverless_config: Dict[str, Any]) -> str:
+    return DISPATCHER_TEMPLATE.format(
+        service=serverless_config.get('service'),
+        routes=pprint.pformat(build_routes(serverless_config), width=120)
+    )
+
+def monolith_config(serverless_config: Dict[str, Any]) -> Dict[str, Any]:
+    # Same service and provider, with the functions replaced by the dispatcher behind a catch-all route
+    cors = any(http_event.get('cors') for function_config in (serverless_config.get('functions') or {}).values()
+               for http_event in http_events(function_config))
+    events = []
+    for path in ('/', '/{proxy+}'):
+        http_event = {'path': path, 'method': 'any'}
+        if cors:
+            http_event['cors'] = True
+        events.append({'http': http_event})
+
+    config = {key: value for key, value in serverless_config.items() if key != 'functions'}
+    config['functions'] = {FUNCTION_NAME: {'handler': f'{DISPATCH_MODULE}.handler', 'events': events}}
+    return config
+
+def write_monolith(serverless_yaml_path: str = 'deploy/api.yml') -> str:
+    # Writes the dispatcher, the router it needs and the single-function configuration next to
+    # serverless_yaml_path, which keeps describing one function per operation for the other stages
+    serverless_config = load_yaml(serverless_yaml_path) or {}
+    output_dir = os.path.dirname(os.path.abspath(serverless_yaml_path))
+
+    with open(os.path.join(output_dir, f'{DISPATCH_MODULE}.py'), 'w') as file:
+        file.write(render_dispatcher(serverless_config))
+    shutil.copyfile(ROUTER_MODULE_PATH, os.path.join(output_dir, 'router.py'))
+
+    config_path = os.path.join(output_dir, MONOLITH_CONFIG)
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(monolith_config(serverless_config), file, sort_keys=False, default_flow_style=False)
+    return config_path
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python monolith.py <serverless_yaml>")
+    else:
+        print(f"Single-function configuration written to {write_monolith(sys.argv[1])} 🧱")
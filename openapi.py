@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Tuple
+import yaml
+
+HTTP_METHODS = {'get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace'}
+
+# Parsed documents are kept for the few most recently loaded files
+MAX_CACHED_DOCUMENTS = 8
+
+# libyaml does the parsing when PyYAML was built with it, which is several times faster
+BaseLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+class SpecLoader(BaseLoader):
+    # Builds the same tree json.loads(json.dumps(yaml.safe_load(...))) used to, in a single pass:
+    # mapping keys are strings (responses: {200: ...} -> {'200': ...}) and dates stay strings
+    def construct_mapping(self, node, deep=False):
+        mapping = super().construct_mapping(node, deep=deep)
+        if all(isinstance(key, str) for key in mapping):
+            return mapping
+        return {json_key(key): value for key, value in mapping.items()}
+
+SpecLoader.add_constructor('tag:yaml.org,2002:timestamp', SpecLoader.construct_yaml_str)
+
+def json_key(key: Any) -> str:
+    if isinstance(key, bool):
+        return 'true' if key else 'false'
+    if key is None:
+        return 'null'
+    return str(key)
+
+_documents = OrderedDict()
+_lock = threading.Lock()
+
+def load_yaml(file_path: str) -> Any:
+    # Parse a YAML file once per content hash. The parsed tree is shared between callers,
+    # so treat it as read-only and copy before modifying it.
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    key = hashlib.sha256(content).hexdigest()
+    with _lock:
+        if key in _documents:
+            _documents.move_to_end(key)
+            return _documents[key]
+
+    document = yaml.load(content, Loader=SpecLoader)
+    with _lock:
+        _documents[key] = document
+        while len(_documents) > MAX_CACHED_DOCUMENTS:
+            _documents.popitem(last=False)
+    return document
+
+def load_openapi(file_path: str) -> Dict[str, Any]:
+    return load_yaml(file_path) or {}
+
+def iter_operations(openapi_spec: Dict[str, Any]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    # (path, method, operation) for every operation, skipping path-level keys such as parameters
+    for path, methods in (openapi_spec.get('paths') or {}).items():
+        for method, details in (methods or {}).items():
+            if method in HTTP_METHODS and isinstance(details, dict):
+                yield path, method, details
+
+def clear():
+    with _lock:
+        _documents.clear()
@@ -0,0 +1,163 @@
+# python resources.py input/openapi.yml
+import re
+import sys
+import json
+from typing import Dict, Any, Optional, Tuple
+import synth
+from filter import collect_components
+from openapi import load_openapi
+from template import deref, schema_from_content, select_success_status, collect_parameters
+
+# Stateful mocks: collection/item path pairs (/pets and /pets/{petId}) are treated as one resource
+# whose operations create, read, update, delete and list items of a table in state.py. The table's
+# primary key and secondary indexes are derived from the resource schema and parameters.
+
+STATE_EXTENSION = 'x-mockthis-state'
+PARAMETER = re.compile(r'^\{([^}+]+)\}$')
+INDEXED_FORMATS = {'uuid', 'email', 'date'}
+
+# (collection or item path, method) -> what the operation does to its resource
+OPERATION_KINDS = {
+    ('collection', 'post'): 'create',
+    ('collection', 'get'): 'list',
+    ('item', 'get'): 'read',
+    ('item', 'put'): 'replace',
+    ('item', 'patch'): 'update',
+    ('item', 'delete'): 'delete'
+}
+
+def state_options(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # x-mockthis-state: true, or {seed_items: 100000, seed: 1, indexes: [ownerId]}
+    value = (node or {}).get(STATE_EXTENSION)
+    if value is True:
+        return {}
+    if isinstance(value, dict):
+        return value
+    return None
+
+def resource_schema(openapi_spec: Dict[str, Any], collection: Dict[str, Any], item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # The item schema as returned by a read, created by a post or listed by a get
+    candidates = []
+    for operation in (item.get('get'), collection.get('post'), item.get('put')):
+        if not operation:
+            continue
+        responses = {str(code): deref(response, openapi_spec) for code, response in (operation.get('responses') or {}).items()}
+        _, success_code = select_success_status(responses)
+        if success_code:
+            candidates.append(schema_from_content(responses[success_code]))
+        candidates.append(schema_from_content(deref(operation.get('requestBody') or {}, openapi_spec) or {}))
+    if collection.get('get'):
+        responses = {str(code): deref(response, openapi_spec) for code, response in (collection['get'].get('responses') or {}).items()}
+        _, success_code = select_success_status(responses)
+        listed = schema_from_content(responses[success_code]) if success_code else None
+        if listed is not None:
+            candidates.append(synth.list_items_schema(listed, openapi_spec))
+    for schema in candidates:
+        if isinstance(deref(schema, openapi_spec), dict) and object_properties(schema, openapi_spec):
+            return schema
+    return None
+
+def object_properties(schema: Any, openapi_spec: Dict[str, Any]) -> Dict[str, Any]:
+    schema = deref(schema, openapi_spec)
+    if not isinstance(schema, dict):
+        return {}
+    properties = {}
+    for part in schema.get('allOf') or []:
+        properties.update(object_properties(part, openapi_spec))
+    properties.update(schema.get('properties') or {})
+    return {name: deref(prop, openapi_spec) for name, prop in properties.items()}
+
+def table_spec(openapi_spec: Dict[str, Any], collection_path: str, item_path: str, schema: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    properties = object_properties(schema, openapi_spec)
+    key_parameter = PARAMETER.match(item_path.rstrip('/').split('/')[-1]).group(1)
+    key = key_parameter if key_parameter in properties else ('id' if 'id' in properties else key_parameter)
+    key_type = 'integer' if (properties.get(key) or {}).get('type') == 'integer' else 'string'
+
+    # Secondary indexes: list filters, parent path parameters, enums and identifier-like fields
+    indexes = list(options.get('indexes') or [])
+    for parameter in collect_parameters(openapi_spec, collection_path, 'get'):
+        if parameter.get('in') in ('query', 'path'):
+            indexes.append(parameter.get('name'))
+    for name, prop in properties.items():
+        if isinstance(prop, dict) and prop.get('type') in ('string', 'integer', 'boolean', None):
+            if prop.get('enum') or prop.get('format') in INDEXED_FORMATS or name.endswith(('Id', '_id')):
+                indexes.append(name)
+    indexes = [name for name in dict.fromkeys(indexes) if name in properties and name != key]
+
+    name = '_'.join(segment for segment in collection_path.strip('/').split('/') if not PARAMETER.match(segment))
+    spec = {
+        'name': re.sub(r'[^A-Za-z0-9_]', '_', name) or 'root',
+        'key': key,
+        'key_type': key_type,
+        'key_parameter': key_parameter,
+        'indexes': indexes
+    }
+    if options.get('seed_items'):
+        spec.update({
+            'seed_items': int(options['seed_items']),
+            'seed': int(options.get('seed', 0)),
+            'schema': schema,
+            'document': {'components': collect_components(openapi_spec, schema)}
+        })
+    return spec
+
+def resource_tables(openapi_spec: Dict[str, Any], stateful: bool = False) -> Dict[str, Dict[str, Any]]:
+    # {collection path: table spec} for every resource that is stateful, either globally or
+    # through x-mockthis-state on its paths or operations
+    paths = openapi_spec.get('paths') or {}
+    tables = {}
+    for item_path, item in paths.items():
+        segments = item_path.rstrip('/').split('/')
+        if len(segments) < 2 or not PARAMETER.match(segments[-1]):
+            continue
+        collection_path = '/'.join(segments[:-1]) or '/'
+        collection = paths.get(collection_path) or {}
+        options = {}
+        enabled = stateful
+        for node in [collection, item] + [node.get(method) for node in (collection, item) for method in ('get', 'post', 'put', 'patch', 'delete')]:
+            found = state_options(node) if isinstance(node, dict) else None
+            if found is not None:
+                enabled = True
+                options.update(found)
+        if not enabled:
+            continue
+        schema = resource_schema(openapi_spec, collection, item)
+        if schema is not None:
+            tables[collection_path] = table_spec(openapi_spec, collection_path, item_path, schema, options)
+    return tables
+
+def state_operation(openapi_spec: Dict[str, Any], path: str, method: str, tables: Dict[str, Dict[str, Any]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    # (kind, table spec) when path/method is an operation of a stateful resource
+    method = method.lower()
+    if path in tables:
+        kind = OPERATION_KINDS.get(('collection', method))
+        table = tables[path]
+    else:
+        collection_path = '/'.join(path.rstrip('/').split('/')[:-1]) or '/'
+        kind = OPERATION_KINDS.get(('item', method))
+        table = tables.get(collection_path)
+        if table is not None and path.rstrip('/').split('/')[-1] != f"{{{table['key_parameter']}}}":
+            table = None
+    if kind is None or table is None:
+        return None
+    if kind == 'list':
+        # Lists are served from the table when the response is an array of items, or an object
+        # wrapping one ({data: [...], pagination: {...}}) whose array property gets the page
+        operation = openapi_spec.get('paths', {}).get(path, {}).get(method, {})
+        responses = {str(code): deref(response, openapi_spec) for code, response in (operation.get('responses') or {}).items()}
+        _, success_code = select_success_status(responses)
+        listed = schema_from_content(responses[success_code]) if success_code else None
+        if listed is None or synth.list_items_schema(listed, openapi_spec) is None:
+            return None
+        list_property = synth.list_property(listed, openapi_spec)
+        if list_property is not None:
+            table = dict(table, list_property=list_property)
+    return kind, table
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python resources.py <openapi_yaml>")
+    else:
+        for collection_path, table in resource_tables(load_openapi(sys.argv[1]), stateful=True).items():
+            summary = {key: table[key] for key in ('name', 'key', 'key_type', 'indexes')}
+            print(f"{collection_path}: {json.dumps(summary)}")
@@ -0,0 +1,64 @@
+# Response memoization for generated handlers.
+# Standard library only: the module is copied next to the generated handlers and imported by them.
+import threading
+from collections import OrderedDict
+
+MAX_RESPONSES = 256
+CACHED_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def normalize(parameters):
+    # Parameter order and value types do not change the response
+    return tuple(sorted((str(name), str(value)) for name, value in (parameters or {}).items()))
+
+def cache_key(event):
+    return (
+        event.get('httpMethod'),
+        event.get('resource') or event.get('path'),
+        normalize(event.get('pathParameters')),
+        normalize(event.get('queryStringParameters'))
+    )
+
+def fresh_response(response):
+    # Cached responses are shared, callers get their own response and headers dicts to modify
+    if not isinstance(response, dict):
+        return response
+    copied = dict(response)
+    for name in ('headers', 'multiValueHeaders'):
+        if isinstance(copied.get(name), dict):
+            copied[name] = dict(copied[name])
+    return copied
+
+def cacheable(response):
+    # Only successful responses: an error may be transient, and a 404 would outlive a later create
+    status_code = response.get('statusCode') if isinstance(response, dict) else None
+    return isinstance(status_code, int) and 200 <= status_code < 300
+
+def memoize_responses(handler, max_responses=MAX_RESPONSES, methods=CACHED_METHODS):
+    # Wrap handler(event, context) with a bounded LRU of its responses, keyed by method, route and
+    # normalized path/query parameters. Only safe methods are cached, other requests always run.
+    responses = OrderedDict()
+    # A handler module may be shared by threads, e.g. a monolith invoked from a thread pool
+    lock = threading.Lock()
+
+    def memoized_handler(event, context):
+        if event.get('httpMethod') not in methods:
+            return handler(event, context)
+        key = cache_key(event)
+        with lock:
+            response = responses.get(key)
+            if response is not None:
+                responses.move_to_end(key)
+        if response is not None:
+            return fresh_response(response)
+
+        response = handler(event, context)
+        if cacheable(response):
+            with lock:
+                responses[key] = fresh_response(response)
+                responses.move_to_end(key)
+                if len(responses) > max_responses:
+                    responses.popitem(last=False)
+        return response
+
+    memoized_handler.responses = responses
+    return memoized_handler
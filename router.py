@@ -0,0 +1,78 @@
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+# Path-template router shared by the local mock server and the single-function dispatcher.
+# Templates use API Gateway syntax: '/users/{userId}' and greedy '/files/{proxy+}'.
+
+class RouteNode:
+    __slots__ = ('static', 'param', 'greedy', 'methods')
+
+    def __init__(self):
+        self.static = {}
+        self.param = None
+        self.greedy = None
+        # method -> (target, template, parameter names); routes sharing a node can name their parameters differently
+        self.methods = {}
+
+def split_path(path: str) -> List[str]:
+    return [segment for segment in path.split('/') if segment]
+
+class Router:
+    def __init__(self):
+        self.root = RouteNode()
+
+    def add(self, method: str, template: str, target: Any):
+        node = self.root
+        names = []
+        for segment in split_path(template):
+            if segment.startswith('{') and segment.endswith('+}'):
+                if node.greedy is None:
+                    node.greedy = RouteNode()
+                names.append(segment[1:-2])
+                node = node.greedy
+                break
+            if segment.startswith('{') and segment.endswith('}'):
+                if node.param is None:
+                    node.param = RouteNode()
+                names.append(segment[1:-1])
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, RouteNode())
+        node.methods[method.upper()] = (target, template, names)
+
+    def find(self, path: str) -> Optional[Tuple[RouteNode, List[str]]]:
+        # Static segments win over parameters, parameters over greedy matches. Returns the node and
+        # the decoded values of its parameters, in path order
+        segments = split_path(path)
+        return self._find(self.root, segments, 0, [])
+
+    def _find(self, node: RouteNode, segments: List[str], position: int, values: List[str]):
+        if position == len(segments):
+            if node.methods:
+                return node, values
+            return None
+        segment = segments[position]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._find(child, segments, position + 1, values)
+            if found:
+                return found
+        if node.param is not None:
+            found = self._find(node.param, segments, position + 1, values + [unquote(segment)])
+            if found:
+                return found
+        if node.greedy is not None and node.greedy.methods:
+            return node.greedy, values + ['/'.join(unquote(segment) for segment in segments[position:])]
+        return None
+
+    def match(self, method: str, path: str) -> Tuple[Optional[Any], Dict[str, str], Optional[str], bool]:
+        # Returns (target, path parameters, matched template, path_exists)
+        found = self.find(path)
+        if found is None:
+            return None, {}, None, False
+        node, values = found
+        route = node.methods.get(method.upper()) or node.methods.get('ANY')
+        if route is None:
+            return None, {}, None, True
+        target, template, names = route
+        return target, dict(zip(names, values)), template, True
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import shlex
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import telemetry
+
+# Executables can be swapped out, e.g. SERVERLESS_BIN="python /path/to/fake_serverless.py"
+SERVERLESS_BIN = os.getenv("SERVERLESS_BIN", "serverless")
+NPM_BIN = os.getenv("NPM_BIN", "npm")
+
+class StepResult:
+    def __init__(self, name: str, command: List[str]):
+        self.name = name
+        self.command = command
+        self.returncode = None
+        self.duration = 0.0
+        self.output = []
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+class Step:
+    # Work running in a background thread; wait() joins it and returns its result, or raises its exception
+    def __init__(self, fn, *args, **kwargs):
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=telemetry.in_context(self.run), args=(fn, args, kwargs), daemon=True)
+        self.thread.start()
+
+    def run(self, fn, args, kwargs):
+        try:
+            self.result = fn(*args, **kwargs)
+        except BaseException as error:
+            self.error = error
+
+    def wait(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+_log_lock = threading.Lock()
+timings: List[StepResult] = []
+
+def reset():
+    # Timings belong to one build, and a shard worker process runs several
+    timings.clear()
+
+def command_line(executable: str, *args: str) -> List[str]:
+    return shlex.split(executable) + list(args)
+
+def run_step(name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, log_path: Optional[str] = None, echo: bool = True) -> StepResult:
+    # Run a command, streaming its output line by line to the console and the log file
+    result = StepResult(name, command)
+    process_env = dict(os.environ)
+    process_env.update(env or {})
+    with telemetry.span(name, root=True, kind='step', command=' '.join(command)) as span:
+        execute(result, command, cwd, process_env, log_path, echo)
+        span.set('returncode', result.returncode)
+        if not result.ok:
+            span.error = f"exit status {result.returncode}"
+    timings.append(result)
+    return result
+
+def execute(result: StepResult, command: List[str], cwd: Optional[str], env: Dict[str, str], log_path: Optional[str], echo: bool):
+    name = result.name
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True, bufsize=1)
+    except OSError as error:
+        result.returncode = 127
+        result.output.append(f"{error}\n")
+        print(f"[{name}] {error}", file=sys.stderr)
+    else:
+        log_file = open(log_path, 'a') if log_path else None
+        try:
+            for line in process.stdout:
+                result.output.append(line)
+                if log_file:
+                    with _log_lock:
+                        log_file.write(line)
+                        log_file.flush()
+                if echo:
+                    print(f"[{name}] {line}", end='', flush=True)
+        finally:
+            if log_file:
+                log_file.close()
+        result.returncode = process.wait()
+
+    result.duration = time.perf_counter() - started
+
+def start_step(fn, *args, **kwargs) -> Step:
+    # Start a step (e.g. run_step or run_steps) in the background so independent work can overlap with it
+    return Step(fn, *args, **kwargs)
+
+def run_steps(name: str, commands: List[List[str]], **kwargs) -> StepResult:
+    # Run commands one after another, stopping at the first failure
+    result = None
+    for command in commands:
+        result = run_step(name, command, **kwargs)
+        if not result.ok:
+            break
+    return result
+
+def print_timings():
+    print("Step timings ⏱️")
+    for result in timings:
+        status = "✅" if result.ok else f"❌ ({result.returncode})"
+        print(f"  {result.name:<20} {result.duration:8.2f}s {status}")
+
+@contextmanager
+def timed_step(name: str):
+    # Record the duration of in-process work (generation stages) alongside the commands
+    result = StepResult(name, [])
+    started = time.perf_counter()
+    try:
+        with telemetry.stage(name):
+            yield result
+        result.returncode = 0
+    except BaseException:
+        result.returncode = 1
+        raise
+    finally:
+        result.duration = time.perf_counter() - started
+        timings.append(result)
@@ -1,7 +1,17 @@
+import os
+import gzip
+import argparse
+import hashlib
+import threading
 import http.server
-import socketserver
+from email.utils import formatdate, parsedate_to_datetime
 import markdown2
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 PORT = 8000
 DOCUMENTATION_FILE = "deploy/API_DOCUMENTATION.md"
 
@@ -51,21 +61,134 @@ pre code {
 </style>
 """
 
-class DocumentationHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/' or self.path == '/API_DOCUMENTATION.md':
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
+class RenderedDocumentation:
+    def __init__(self, html: bytes, mtime: float):
+        self.html = html
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+
+        # Precompress once per render instead of once per request
+        self.variants = {'identity': html, 'gzip': gzip.compress(html, compresslevel=9)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(html)
+        # Each encoding is a different representation, so each gets its own strong ETag
+        self.etags = {encoding: f'"{hashlib.sha256(body).hexdigest()[:32]}"' for encoding, body in self.variants.items()}
+
+_rendered = None
+_rendered_key = None
+_render_lock = threading.Lock()
+
+def get_rendered_documentation():
+    # Re-render only when the markdown file's mtime or size changes
+    global _rendered, _rendered_key
+    try:
+        stat = os.stat(DOCUMENTATION_FILE)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _rendered_key == key:
+        return _rendered
+
+    with _render_lock:
+        if _rendered_key != key:
             with open(DOCUMENTATION_FILE, 'r') as f:
                 content = f.read()
-                html = markdown2.markdown(content, extras=["fenced-code-blocks", "tables"])
-                full_html = f"<html><head>{CSS}</head><body>{html}</body></html>"
-                self.wfile.write(full_html.encode())
-        else:
+            html = markdown2.markdown(content, extras=["fenced-code-blocks", "tables"])
+            full_html = f"<html><head>{CSS}</head><body>{html}</body></html>"
+            _rendered = RenderedDocumentation(full_html.encode(), stat.st_mtime)
+            _rendered_key = key
+    return _rendered
+
+def choose_encoding(accept_encoding: str, variants) -> str:
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+class DocumentationHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_documentation(include_body=True)
+
+    def do_HEAD(self):
+        self.send_documentation(include_body=False)
+
+    def is_not_modified(self, rendered: RenderedDocumentation, etag: str) -> bool:
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= rendered.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_documentation(self, include_body: bool):
+        if self.path.split('?')[0] not in ('/', '/API_DOCUMENTATION.md'):
             self.send_error(404, "File not found")
+            return
+
+        rendered = get_rendered_documentation()
+        if rendered is None:
+            self.send_error(404, "Documentation has not been generated yet")
+            return
+
+        encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), rendered.variants)
+        etag = rendered.etags[encoding]
+        if self.is_not_modified(rendered, etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", rendered.last_modified)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        body = rendered.variants[encoding]
+        self.send_response(200)
+        self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", rendered.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding != 'identity':
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    # Dashboards poll this page constantly, --quiet drops the access log
+    quiet = False
+
+    def log_request(self, code='-', size='-'):
+        if not self.quiet:
+            super().log_request(code, size)
+
+class DocumentationServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
 
 if __name__ == "__main__":
-    with socketserver.TCPServer(("", PORT), DocumentationHandler) as httpd:
-        print(f"Serving API documentation at http://localhost:{PORT}")
-        httpd.serve_forever()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Serve the generated API documentation as HTML")
+    parser.add_argument('--port', type=int, default=PORT, help="Port to listen on")
+    parser.add_argument('--quiet', action='store_true', help="Do not log every request, errors are still logged")
+    args = parser.parse_args()
+
+    DocumentationHandler.quiet = args.quiet
+    with DocumentationServer(("", args.port), DocumentationHandler) as httpd:
+        print(f"Serving API documentation at http://localhost:{args.port}")
+        httpd.serve_forever()
@@ -0,0 +1,179 @@
+# python shard.py --input input/openapi.yml --by tag --max-operations 60 --workers 4
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+import yaml
+import cache
+import runner
+import telemetry
+from document import group_operations
+from filter import NoAliasDumper, build_ref_index, filter_by_operations
+from openapi import load_openapi, iter_operations
+
+# Sharded builds: the spec is split by tag or by size into sub-services, each built from its own
+# directory under deploy/shards/ (input/openapi.yml and deploy/, like a regular build) in a process
+# pool. Shards share the parent build's generation cache and are stitched together by deploy/API_INDEX.md.
+
+SHARDS_DIR = 'deploy/shards'
+INDEX_PATH = 'deploy/API_INDEX.md'
+# Each function with an http event adds about six CloudFormation resources (function, version, log
+# group, permission, API method and resource), which keeps a shard under the 500 resources of a stack
+MAX_SHARD_OPERATIONS = 60
+# Inputs every build reads besides the spec, copied into each shard
+SHARED_INPUTS = ('handler.py', 'serverless.yml')
+
+def shard_name(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-') or 'api'
+
+def split_by_size(operations: List[Tuple[str, str]], max_operations: int) -> List[List[Tuple[str, str]]]:
+    # Operations of one path stay together, API Gateway builds one resource per path
+    by_path = OrderedDict()
+    for path, method in operations:
+        by_path.setdefault(path, []).append((path, method))
+    chunks = [[]]
+    for path_operations in by_path.values():
+        if chunks[-1] and len(chunks[-1]) + len(path_operations) > max_operations:
+            chunks.append([])
+        chunks[-1].extend(path_operations)
+    return chunks
+
+def plan_shards(openapi_spec: Dict[str, Any], by: str = 'tag', max_operations: int = MAX_SHARD_OPERATIONS) -> "OrderedDict[str, List[Tuple[str, str]]]":
+    # {shard name: [(path, method)]}; tags over the size budget are split into numbered shards
+    if by == 'tag':
+        groups = OrderedDict((shard_name(tag), operations) for tag, operations in group_operations(openapi_spec).items())
+    else:
+        groups = OrderedDict([('api', [(path, method) for path, method, _ in iter_operations(openapi_spec)])])
+
+    shards = OrderedDict()
+    for name, operations in groups.items():
+        chunks = split_by_size(operations, max_operations)
+        for number, chunk in enumerate(chunks, start=1):
+            shards[name if len(chunks) == 1 else f"{name}-{number}"] = chunk
+    return shards
+
+def write_shard(shard_dir: str, shard_spec: Dict[str, Any], input_dir: str = 'input'):
+    os.makedirs(os.path.join(shard_dir, 'input'), exist_ok=True)
+    with open(os.path.join(shard_dir, 'input', 'openapi.yml'), 'w') as file:
+        yaml.dump(shard_spec, file, Dumper=NoAliasDumper, sort_keys=False)
+    for name in SHARED_INPUTS:
+        shutil.copyfile(os.path.join(input_dir, name), os.path.join(shard_dir, 'input', name))
+
+def build_shard(task: Tuple[str, str, str, Dict[str, Any]]) -> Tuple[str, Optional[str], float]:
+    # Runs in a worker process: a regular build from inside the shard directory, logged to build.log,
+    # with the generation cache of the directory the sharded build was started from
+    import main  # main imports this module for --shard-by
+    name, shard_dir, cache_dir, options = task
+    started = time.perf_counter()
+    cache.CACHE_DIR = cache_dir
+    os.chdir(shard_dir)
+    telemetry.reset()
+    runner.reset()
+    error = None
+    with open('build.log', 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            main.main('input/openapi.yml', **options)
+        except SystemExit as exit:
+            if exit.code not in (None, 0):
+                error = f"build exited with status {exit.code}"
+        except Exception as exception:
+            error = repr(exception)
+        finally:
+            telemetry.write_report()
+    return name, error, time.perf_counter() - started
+
+def write_index(shards: "OrderedDict[str, List[Tuple[str, str]]]", openapi_spec: Dict[str, Any], failures: Dict[str, str], shards_dir: str = SHARDS_DIR, index_path: str = INDEX_PATH) -> str:
+    # One page linking every shard's documentation, and which shard serves each operation
+    index_dir = os.path.dirname(os.path.abspath(index_path))
+    title = openapi_spec.get('info', {}).get('title', 'API')
+    lines = [f"# {title}", "", f"Built as {len(shards)} services.", "",
+             "| Service | Operations | Base URL | Documentation |", "| --- | --- | --- | --- |"]
+    base_urls = {}
+    for name, operations in shards.items():
+        shard_dir = os.path.join(shards_dir, name)
+        try:
+            with open(os.path.join(shard_dir, 'deploy', 'deploy.json'), 'r') as file:
+                base_urls[name] = json.load(file).get('base_url')
+        except (OSError, ValueError):
+            base_urls[name] = None
+        documentation = os.path.join(shard_dir, 'deploy', 'API_DOCUMENTATION.md')
+        link = f"[{name}]({os.path.relpath(os.path.abspath(documentation), index_dir)})" if os.path.exists(documentation) else name
+        status = f"failed: {failures[name]}" if name in failures else (base_urls[name] or '-')
+        lines.append(f"| {link} | {len(operations)} | {status} | {'yes' if os.path.exists(documentation) else 'no'} |")
+
+    lines += ["", "## Operations", "", "| Method | Path | Service | URL |", "| --- | --- | --- | --- |"]
+    for name, operations in shards.items():
+        for path, method in operations:
+            url = f"{base_urls[name]}{path}" if base_urls[name] else '-'
+            lines.append(f"| {method.upper()} | `{path}` | {name} | {url} |")
+
+    os.makedirs(index_dir, exist_ok=True)
+    with open(index_path, 'w') as file:
+        file.write("\n".join(lines) + "\n")
+    return index_path
+
+def build_shards(input_path: str, by: str = 'tag', max_operations: int = MAX_SHARD_OPERATIONS, workers: Optional[int] = None, input_dir: str = 'input', shards_dir: str = SHARDS_DIR, **options) -> Dict[str, str]:
+    # Returns {shard name: reason} for every shard whose build failed
+    if not os.path.exists(input_path):
+        print(f"Input file {input_path} does not exist")
+        sys.exit(1)
+    openapi_spec = load_openapi(input_path)
+    shards = plan_shards(openapi_spec, by, max_operations)
+    index = build_ref_index(openapi_spec)
+    title = openapi_spec.get('info', {}).get('title', 'api-service')
+
+    tasks = []
+    cache_dir = os.path.abspath(cache.CACHE_DIR)
+    for name, operations in shards.items():
+        shard_spec = filter_by_operations(openapi_spec, operations, index)
+        # Distinct titles give every shard its own service name and stack
+        shard_spec['info'] = dict(shard_spec.get('info') or {}, title=f"{title} {name}")
+        shard_dir = os.path.abspath(os.path.join(shards_dir, name))
+        write_shard(shard_dir, shard_spec, input_dir)
+        tasks.append((name, shard_dir, cache_dir, options))
+
+    stale = [name for name in (os.listdir(shards_dir) if os.path.isdir(shards_dir) else []) if name not in shards]
+    if stale:
+        print(f"Shards no longer in the plan, their stacks are left deployed: {', '.join(sorted(stale))}")
+
+    print(f"Building {len(shards)} shard(s) by {by} with up to {max_operations} operations each... 🧩")
+    failures = {}
+    with telemetry.stage('shards', shards=len(shards)):
+        with ProcessPoolExecutor(max_workers=min(len(tasks), workers or os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(build_shard, task) for task in tasks]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                name, error, duration = future.result()
+                telemetry.add('shards.failed' if error else 'shards.built')
+                if error:
+                    failures[name] = error
+                    print(f"[{completed}/{len(tasks)}] ❌ {name}: {error}, see {os.path.join(shards_dir, name, 'build.log')}", flush=True)
+                else:
+                    print(f"[{completed}/{len(tasks)}] ✨ {name} ({len(shards[name])} operations, {duration:.1f}s)", flush=True)
+
+    if options.get('dry_run'):
+        for name in shards:
+            with open(os.path.join(shards_dir, name, 'build.log'), 'r') as file:
+                print(f"--- {name} ---\n{file.read().rstrip()}")
+        return failures
+
+    if options.get('use_cache', True):
+        cache.evict()
+    print(f"Combined documentation index written to {write_index(shards, openapi_spec, failures, shards_dir)} 📚")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print how a spec would be split into shards, see main.py --shard-by to build them")
+    parser.add_argument('--input', default='input/openapi.yml', help="Path to the OpenAPI YAML file")
+    parser.add_argument('--by', choices=['tag', 'size'], default='tag', help="Group operations by their first tag, or only by size")
+    parser.add_argument('--max-operations', type=int, default=MAX_SHARD_OPERATIONS, help="Largest number of operations in a shard")
+    args = parser.parse_args()
+
+    for name, operations in plan_shards(load_openapi(args.input), args.by, args.max_operations).items():
+        print(f"{name}: {len(operations)} operations")
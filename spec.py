@@ -1,31 +1,69 @@
 import os
 import sys
 import argparse
-from dotenv import load_dotenv
 import yaml
-import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Set
 from collections import OrderedDict
-from langchain_anthropic import ChatAnthropic
-from utils import to_snake_case
+from concurrent.futures import ThreadPoolExecutor
+from llm_client import get_llm
+import cache
+from cache import cache_key, model_name
+from utils import to_snake_case, invoke_with_retry, estimate_tokens
+from openapi import load_yaml, load_openapi, iter_operations
+import telemetry
 
-def generate_serverless_config(input_file: str) -> str:
-    # Load environment variables and set up API key
-    load_dotenv()
-    os.environ["ANTHROPIC_API_KEY"] = os.getenv("ANTHROPIC_API_KEY")
+def extract_api_functions(openapi_content: Dict[str, Any]) -> List[Dict[str, Any]]:
+    api_functions = []
+    for path, method, details in iter_operations(openapi_content):
+        function_name = details.get("operationId", f"{method}_{to_snake_case(path.replace('/', '_'))}")
+        api_functions.append({
+            "name": to_snake_case(function_name),
+            "method": method.upper(),
+            "path": path,
+            "operationId": details.get("operationId"),
+            "summary": details.get("summary", "No summary provided")
+        })
+    return api_functions
+
+def is_valid_function(function_config: Any, func: Dict[str, Any]) -> bool:
+    # A batched entry is only accepted if it declares the http event that was requested
+    if not isinstance(function_config, dict):
+        return False
+    for event in function_config.get('events') or []:
+        http_event = event.get('http') if isinstance(event, dict) else None
+        if isinstance(http_event, dict) and str(http_event.get('method', '')).upper() == func['method'] and http_event.get('path') == func['path']:
+            return True
+    return False
 
-    # Initialize ChatAnthropic
-    llm = ChatAnthropic(model="claude-3-5-sonnet-20240620")
+def plan_batches(api_functions: List[Dict[str, Any]], base_prompt: str, batch_size: int = 1, token_budget: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    # Group operations into batches of at most batch_size, or as many as fit in the token budget
+    batches = []
+    batch = []
+    batch_tokens = estimate_tokens(base_prompt)
+    for func in api_functions:
+        function_tokens = estimate_tokens(f"{func['name']} {func['method']} {func['path']} {func['summary']}") + 20
+        full_by_size = not token_budget and len(batch) >= max(1, batch_size)
+        full_by_budget = token_budget and batch and batch_tokens + function_tokens > token_budget
+        if batch and (full_by_size or full_by_budget):
+            batches.append(batch)
+            batch = []
+            batch_tokens = estimate_tokens(base_prompt)
+        batch.append(func)
+        batch_tokens += function_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def generate_serverless_config(input_file: str, concurrency: int = 1, llm=None, use_cache: bool = True, regenerate: Optional[Set[str]] = None, batch_size: int = 1, token_budget: Optional[int] = None) -> str:
+    if llm is None:
+        llm = get_llm()
 
     # Read the YAML file for serverless structure
     serverless_yaml_path = "input/serverless.yml"
-    with open(serverless_yaml_path, 'r') as file:
-        serverless_yaml_content = yaml.safe_load(file)
+    serverless_yaml_content = load_yaml(serverless_yaml_path)
 
-    # Read the OpenAPI definition from the input argument
-    with open(input_file, 'r') as file:
-        openapi_yaml_content = yaml.safe_load(file)
-        openapi_content = json.loads(json.dumps(openapi_yaml_content))
+    # Read the OpenAPI definition from the input argument, parsed once and shared with the other stages
+    openapi_content = load_openapi(input_file)
 
     def create_schema_from_yaml(yaml_dict: Dict[str, Any], title: str = "ServerlessConfig") -> Dict[str, Any]:
         properties = OrderedDict([
@@ -58,16 +96,7 @@ def generate_serverless_config(input_file: str) -> str:
     structured_llm = llm.with_structured_output(schema)
 
     # Extract API paths and methods from OpenAPI definition
-    api_functions = []
-    for path, methods in openapi_content.get("paths", {}).items():
-        for method, details in methods.items():
-            function_name = details.get("operationId", f"{method}_{to_snake_case(path.replace('/', '_'))}")
-            api_functions.append({
-                "name": to_snake_case(function_name),
-                "method": method.upper(),
-                "path": path,
-                "summary": details.get("summary", "No summary provided")
-            })
+    api_functions = extract_api_functions(openapi_content)
 
     # Create a base prompt
     base_prompt = f"""
@@ -85,26 +114,101 @@ def generate_serverless_config(input_file: str) -> str:
     Please structure the configuration according to the provided schema, ensuring all necessary sections are included and properly formatted. Make sure to follow this order for the top-level keys: service, provider, functions, and then any other keys.
     """
 
-    # Initialize an empty response
-    response = {}
-
-    # Process each function separately
-    for func in api_functions:
-        function_prompt = base_prompt + f"""
+    def build_function_prompt(func: Dict[str, Any]) -> str:
+        return base_prompt + f"""
         Add the following function to the configuration:
         Function name: '{func['name']}'
         - HTTP {func['method']} endpoint at '{func['path']}'
         - {func['summary']}
         """
-        
-        # Invoke the model with the function-specific prompt
-        function_response = structured_llm.invoke(function_prompt, temperature=0)
-        
-        # Merge the function response into the main response
+
+    def build_batch_prompt(batch: List[Dict[str, Any]]) -> str:
+        return base_prompt + f"""
+        Add the following {len(batch)} functions to the configuration, using exactly these function names:
+        """ + "".join(f"""
+        Function name: '{func['name']}'
+        - HTTP {func['method']} endpoint at '{func['path']}'
+        - {func['summary']}
+        """ for func in batch)
+
+    output_path = "deploy/api.yml"
+
+    # When only some operations changed, keep the previous build's entries for the others
+    previous_config = {}
+    if regenerate is not None and os.path.exists(output_path):
+        previous_config = load_yaml(output_path) or {}
+    previous_functions = previous_config.get('functions') or {}
+
+    top_level_keys = ['frameworkVersion', 'service', 'provider', 'plugins']
+
+    def function_cache_key(func: Dict[str, Any]) -> str:
+        return cache_key('serverless-function', model_name(llm), schema, build_function_prompt(func))
+
+    def lookup_function(func: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if regenerate is not None and func['name'] not in regenerate and func['name'] in previous_functions:
+            reused = {key: previous_config[key] for key in top_level_keys if key in previous_config}
+            reused['functions'] = {func['name']: previous_functions[func['name']]}
+            return reused
+
+        # Reuse the stored fragment when the prompt, schema and model are unchanged
+        if use_cache:
+            return cache.get(function_cache_key(func))
+        return None
+
+    def invoke_function(func: Dict[str, Any]) -> Dict[str, Any]:
+        # Invoke the model with the function-specific prompt, retrying on rate limits
+        function_response = invoke_with_retry(structured_llm, build_function_prompt(func), operation=func['name'], temperature=0)
+        if use_cache and function_response:
+            cache.put(function_cache_key(func), function_response)
+        return function_response
+
+    def invoke_batch(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # One call for several operations, split back into per-function fragments
+        batch_response = invoke_with_retry(structured_llm, build_batch_prompt(batch),
+            operation=','.join(func['name'] for func in batch), temperature=0)
+        functions = batch_response.get('functions') or {}
+        fragments = {}
+        for func in batch:
+            if not is_valid_function(functions.get(func['name']), func):
+                continue
+            fragment = {key: batch_response[key] for key in top_level_keys if key in batch_response}
+            fragment['functions'] = {func['name']: functions[func['name']]}
+            fragments[func['name']] = fragment
+            if use_cache:
+                cache.put(function_cache_key(func), fragment)
+        return fragments
+
+    function_responses = [lookup_function(func) for func in api_functions]
+    pending = [index for index, function_response in enumerate(function_responses) if function_response is None]
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        if batch_size > 1 or token_budget:
+            batches = plan_batches([api_functions[index] for index in pending], base_prompt, batch_size, token_budget)
+            fragments = {}
+            for batch_fragments in executor.map(telemetry.in_context(invoke_batch), batches):
+                fragments.update(batch_fragments)
+            for index in pending:
+                function_responses[index] = fragments.get(api_functions[index]['name'])
+            pending = [index for index in pending if function_responses[index] is None]
+            if pending:
+                print(f"Retrying {len(pending)} function(s) missing from batched responses individually")
+
+        # Fan the per-function calls out over a bounded pool; map() yields results in spec order
+        for index, function_response in zip(pending, executor.map(telemetry.in_context(invoke_function), [api_functions[index] for index in pending])):
+            function_responses[index] = function_response
+
+    if use_cache:
+        cache.evict()
+
+    # Initialize an empty response
+    response = {}
+
+    # Merge each function response in spec order so the output matches the sequential path
+    for function_response in function_responses:
         if 'functions' not in response:
             response['functions'] = {}
         response['functions'].update(function_response.get('functions', {}))
-        
+
         # Merge other top-level keys
         for key in ['frameworkVersion', 'service', 'provider', 'plugins']:
             if key in function_response and key not in response:
@@ -141,7 +245,6 @@ def generate_serverless_config(input_file: str) -> str:
         os.makedirs("deploy")
 
     # Output the response to a new YAML file
-    output_path = "deploy/api.yml"
     with open(output_path, 'w') as file:
         yaml.dump(ordered_response, file, Dumper=OrderedDumper, default_flow_style=False)
 
@@ -150,7 +253,11 @@ def generate_serverless_config(input_file: str) -> str:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate serverless configuration from OpenAPI spec")
     parser.add_argument('--input', required=True, help="Path to the OpenAPI YAML file")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of concurrent LLM calls")
+    parser.add_argument('--batch-size', type=int, default=1, help="Number of operations per LLM call")
+    parser.add_argument('--token-budget', type=int, help="Fill each LLM call with operations up to this many prompt tokens")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not update the generation cache")
     args = parser.parse_args()
 
-    output_file = generate_serverless_config(args.input)
+    output_file = generate_serverless_config(args.input, concurrency=args.concurrency, use_cache=not args.no_cache, batch_size=args.batch_size, token_budget=args.token_budget)
     print(f"Generated serverless configuration has been written to {output_file}")
\ No newline at end of file
@@ -0,0 +1,372 @@
+# Indexed state for stateful mock handlers, with the item API of a boto3 DynamoDB Table
+# (put_item, get_item, delete_item, query, scan) so a real table can stand in for it.
+# Standard library only: the module is copied next to the generated handlers and imported by them.
+#
+# MOCKTHIS_STATE selects the backend: 'memory' (default) or 'sqlite:/tmp/mockthis.db'.
+import os
+import json
+import uuid
+import base64
+import random
+import sqlite3
+import bisect
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+STATE_BACKEND = os.getenv("MOCKTHIS_STATE", "memory")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+PAGE_SIZE_PARAMETERS = ('limit', 'pageSize', 'page_size', 'per_page')
+CURSOR_PARAMETER = 'cursor'
+SEED_BATCH_SIZE = 1000
+
+class ItemExists(Exception):
+    pass
+
+def order(value: Any) -> Tuple[int, Any]:
+    # Numbers sort before strings, as in SQLite, so both backends page in the same order
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value))
+
+def index_value(value: Any) -> str:
+    # Query strings arrive as text, so index values are compared as text: 3 -> '3', True -> 'true'
+    return value if isinstance(value, str) else json.dumps(value)
+
+def equality_condition(key_conditions: Dict[str, Any]) -> Tuple[str, Any]:
+    # Legacy KeyConditions, e.g. {'status': {'AttributeValueList': ['active'], 'ComparisonOperator': 'EQ'}}
+    if len(key_conditions) != 1:
+        raise ValueError("Only a single equality key condition is supported")
+    (attribute, condition), = key_conditions.items()
+    if condition.get('ComparisonOperator', 'EQ') != 'EQ':
+        raise ValueError("Only EQ key conditions are supported")
+    return attribute, condition['AttributeValueList'][0]
+
+def equality_filters(conditions: Optional[Dict[str, Any]]) -> List[Tuple[str, Any]]:
+    # Legacy QueryFilter/ScanFilter of EQ conditions. Unlike DynamoDB, which filters the items a Limit
+    # read, they are applied before Limit, so a page is only short when it is the last one
+    return [equality_condition({attribute: condition}) for attribute, condition in (conditions or {}).items()]
+
+class MemoryTable:
+    def __init__(self, name: str, key: str, indexes: List[str]):
+        self.name = name
+        self.key = key
+        self.indexes = list(indexes)
+        self.items = {}
+        # Primary keys in order, and per index attribute: value -> primary keys in order
+        self.keys = []
+        self.index_keys = {attribute: {} for attribute in self.indexes}
+        self.last_number = 0
+        self.lock = threading.RLock()
+
+    def _insert(self, item: Dict[str, Any]):
+        sort_key = order(item[self.key])
+        if sort_key in self.items:
+            self._remove(sort_key)
+        self.items[sort_key] = item
+        if self.keys and self.keys[-1] < sort_key:
+            self.keys.append(sort_key)
+        else:
+            bisect.insort(self.keys, sort_key)
+        for attribute in self.indexes:
+            if item.get(attribute) is not None:
+                keys = self.index_keys[attribute].setdefault(index_value(item[attribute]), [])
+                if keys and keys[-1] < sort_key:
+                    keys.append(sort_key)
+                else:
+                    bisect.insort(keys, sort_key)
+        if sort_key[0] == 0:
+            self.last_number = max(self.last_number, int(sort_key[1]))
+
+    def _remove(self, sort_key: Tuple[int, Any]) -> Optional[Dict[str, Any]]:
+        item = self.items.pop(sort_key, None)
+        if item is None:
+            return None
+        del self.keys[bisect.bisect_left(self.keys, sort_key)]
+        for attribute in self.indexes:
+            if item.get(attribute) is not None:
+                keys = self.index_keys[attribute].get(index_value(item[attribute]), [])
+                position = bisect.bisect_left(keys, sort_key)
+                if position < len(keys) and keys[position] == sort_key:
+                    del keys[position]
+        return item
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            self._insert(dict(Item))
+        return {}
+
+    def batch_put(self, items: List[Dict[str, Any]]):
+        with self.lock:
+            for item in items:
+                self._insert(dict(item))
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        item = self.items.get(order(Key[self.key]))
+        return {'Item': dict(item)} if item is not None else {}
+
+    def delete_item(self, Key: Dict[str, Any], ReturnValues: str = 'NONE', **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            item = self._remove(order(Key[self.key]))
+        return {'Attributes': item} if item is not None and ReturnValues == 'ALL_OLD' else {}
+
+    def _page(self, keys: List[Tuple[int, Any]], limit: Optional[int], start_key: Optional[Dict[str, Any]], extra: Dict[str, Any],
+              filters: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        # Resume after the last key of the previous page with a binary search, never a scan
+        start = bisect.bisect_right(keys, order(start_key[self.key])) if start_key else 0
+        if not filters:
+            end = len(keys) if limit is None else start + limit
+            page, more = keys[start:end], end < len(keys)
+        else:
+            filters = [(attribute, index_value(value)) for attribute, value in filters]
+            page, more = [], False
+            for sort_key in keys[start:]:
+                item = self.items[sort_key]
+                if all(index_value(item.get(attribute)) == value for attribute, value in filters):
+                    if limit is not None and len(page) == limit:
+                        more = True
+                        break
+                    page.append(sort_key)
+        result = {'Items': [dict(self.items[sort_key]) for sort_key in page], 'Count': len(page)}
+        if more and page:
+            result['LastEvaluatedKey'] = dict(extra, **{self.key: page[-1][1]})
+        return result
+
+    def scan(self, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict[str, Any]] = None, ScanFilter: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            return self._page(self.keys, Limit, ExclusiveStartKey, {}, equality_filters(ScanFilter))
+
+    def query(self, KeyConditions: Dict[str, Any], IndexName: Optional[str] = None, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+              QueryFilter: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        attribute, value = equality_condition(KeyConditions)
+        with self.lock:
+            if attribute == self.key:
+                sort_key = order(value)
+                return self._page([sort_key] if sort_key in self.items else [], None, None, {}, equality_filters(QueryFilter))
+            if attribute not in self.index_keys:
+                raise ValueError(f"No index on '{attribute}' for table '{self.name}'")
+            keys = self.index_keys[attribute].get(index_value(value), [])
+            return self._page(keys, Limit, ExclusiveStartKey, {attribute: value}, equality_filters(QueryFilter))
+
+    def item_count(self) -> int:
+        return len(self.items)
+
+    def add_item(self, Item: Dict[str, Any], allocate_key: bool = False) -> Dict[str, Any]:
+        # Insert a new item, numbering it after the highest integer key when allocate_key is set;
+        # raises ItemExists instead of replacing an item
+        with self.lock:
+            item = dict(Item)
+            if allocate_key:
+                item[self.key] = self.last_number + 1
+            if order(item[self.key]) in self.items:
+                raise ItemExists(item[self.key])
+            self._insert(item)
+        return dict(item)
+
+class SqliteTable:
+    def __init__(self, name: str, key: str, indexes: List[str], path: str):
+        self.name = name
+        self.key = key
+        self.indexes = list(indexes)
+        self.table = f'"items_{name}"'
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.RLock()
+
+        # Untyped columns keep integer keys numeric and sort them before text keys
+        columns = ''.join(f', "ix_{attribute}"' for attribute in self.indexes)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (pk PRIMARY KEY, item TEXT NOT NULL{columns})")
+        for attribute in self.indexes:
+            self.connection.execute(f'CREATE INDEX IF NOT EXISTS "items_{name}_{attribute}" ON {self.table} ("ix_{attribute}", pk)')
+
+    def _row(self, item: Dict[str, Any]) -> tuple:
+        values = [item.get(attribute) for attribute in self.indexes]
+        return (item[self.key], json.dumps(item), *(index_value(value) if value is not None else None for value in values))
+
+    def batch_put(self, items: List[Dict[str, Any]]):
+        placeholders = ', '.join('?' * (2 + len(self.indexes)))
+        with self.lock:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES ({placeholders})", [self._row(item) for item in items])
+            self.connection.execute("COMMIT")
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        placeholders = ', '.join('?' * (2 + len(self.indexes)))
+        with self.lock:
+            self.connection.execute(f"INSERT OR REPLACE INTO {self.table} VALUES ({placeholders})", self._row(Item))
+        return {}
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            row = self.connection.execute(f"SELECT item FROM {self.table} WHERE pk = ?", (Key[self.key],)).fetchone()
+        return {'Item': json.loads(row[0])} if row else {}
+
+    def delete_item(self, Key: Dict[str, Any], ReturnValues: str = 'NONE', **kwargs) -> Dict[str, Any]:
+        # Read and delete in one write transaction, so a concurrent delete cannot return the item too
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(f"SELECT item FROM {self.table} WHERE pk = ?", (Key[self.key],)).fetchone()
+                if row:
+                    self.connection.execute(f"DELETE FROM {self.table} WHERE pk = ?", (Key[self.key],))
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+        return {'Attributes': json.loads(row[0])} if row and ReturnValues == 'ALL_OLD' else {}
+
+    def _page(self, where: str, parameters: list, limit: Optional[int], start_key: Optional[Dict[str, Any]], extra: Dict[str, Any],
+              filters: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        clauses = [where] if where else []
+        for attribute, value in filters:
+            if attribute not in self.indexes:
+                raise ValueError(f"No index on '{attribute}' for table '{self.name}'")
+            clauses.append(f'"ix_{attribute}" = ?')
+            parameters = parameters + [index_value(value)]
+        if start_key:
+            clauses.append("pk > ?")
+            parameters = parameters + [start_key[self.key]]
+        sql = f"SELECT pk, item FROM {self.table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY pk"
+        if limit is not None:
+            # One extra row tells whether there is a next page
+            sql += f" LIMIT {int(limit) + 1}"
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if limit is not None else rows
+        result = {'Items': [json.loads(item) for _, item in rows], 'Count': len(rows)}
+        if more and rows:
+            result['LastEvaluatedKey'] = dict(extra, **{self.key: rows[-1][0]})
+        return result
+
+    def scan(self, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict[str, Any]] = None, ScanFilter: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        return self._page('', [], Limit, ExclusiveStartKey, {}, equality_filters(ScanFilter))
+
+    def query(self, KeyConditions: Dict[str, Any], IndexName: Optional[str] = None, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+              QueryFilter: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        attribute, value = equality_condition(KeyConditions)
+        if attribute == self.key:
+            return self._page("pk = ?", [value], Limit, None, {}, equality_filters(QueryFilter))
+        if attribute not in self.indexes:
+            raise ValueError(f"No index on '{attribute}' for table '{self.name}'")
+        return self._page(f'"ix_{attribute}" = ?', [index_value(value)], Limit, ExclusiveStartKey, {attribute: value}, equality_filters(QueryFilter))
+
+    def item_count(self) -> int:
+        with self.lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def add_item(self, Item: Dict[str, Any], allocate_key: bool = False) -> Dict[str, Any]:
+        # The write lock is taken before the highest key is read, so processes sharing the database
+        # cannot allocate the same key; a plain INSERT fails instead of replacing an item
+        placeholders = ', '.join('?' * (2 + len(self.indexes)))
+        item = dict(Item)
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                if allocate_key:
+                    row = self.connection.execute(f"SELECT MAX(pk) FROM {self.table} WHERE typeof(pk) = 'integer'").fetchone()
+                    item[self.key] = (row[0] or 0) + 1
+                self.connection.execute(f"INSERT INTO {self.table} VALUES ({placeholders})", self._row(item))
+            except sqlite3.IntegrityError:
+                self.connection.execute("ROLLBACK")
+                raise ItemExists(item[self.key])
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+        return item
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def open_table(table_spec: Dict[str, Any], backend: Optional[str] = None):
+    # One table per resource and process, shared by every handler loaded in it
+    name = table_spec['name']
+    backend = backend or STATE_BACKEND
+    with _tables_lock:
+        table = _tables.get(name)
+        if table is None:
+            if backend.startswith('sqlite:'):
+                table = SqliteTable(name, table_spec['key'], table_spec.get('indexes', []), backend[len('sqlite:'):])
+            else:
+                table = MemoryTable(name, table_spec['key'], table_spec.get('indexes', []))
+            if table_spec.get('seed_items') and table.item_count() == 0:
+                seed_table(table, table_spec)
+            _tables[name] = table
+    return table
+
+def seed_table(table, table_spec: Dict[str, Any]):
+    # Fill an empty table with synthetic items, written in batches
+    import synth
+    count = int(table_spec['seed_items'])
+    seed = int(table_spec.get('seed', 0))
+    rng = random.Random(seed)
+    number = 0
+    for batch in synth.iter_batches(table_spec['schema'], count, table_spec.get('document'), seed, SEED_BATCH_SIZE):
+        for item in batch:
+            number += 1
+            item[table.key] = number if table_spec.get('key_type') == 'integer' else str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        table.batch_put([item for item in batch if isinstance(item, dict)])
+
+def create_item(table, table_spec: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+    # The stored item, keyed by the client or with a new key: the next integer, or a uuid4. Client
+    # keys are stored as parse_key reads them, e.g. "5" as 5 in an integer-keyed table
+    if item.get(table_spec['key']) is not None:
+        return table.add_item(Item=dict(item, **parse_key(table_spec, item[table_spec['key']])))
+    if table_spec.get('key_type') == 'integer':
+        return table.add_item(Item=item, allocate_key=True)
+    return table.add_item(Item=dict(item, **{table_spec['key']: str(uuid.uuid4())}))
+
+def list_body(table_spec: Dict[str, Any], example: Any, items: List[Dict[str, Any]]) -> Any:
+    # The page itself, or the example response with its list property replaced by the page
+    if not table_spec.get('list_property'):
+        return items
+    return dict(example if isinstance(example, dict) else {}, **{table_spec['list_property']: items})
+
+def parse_key(table_spec: Dict[str, Any], value: Any) -> Dict[str, Any]:
+    # Path parameters are strings; integer keys are stored as numbers
+    if table_spec.get('key_type') == 'integer':
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            pass
+    return {table_spec['key']: value}
+
+def encode_cursor(last_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+
+def list_page(table, table_spec: Dict[str, Any], query_parameters: Dict[str, str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # One page of a list operation: an index query when a query parameter matches an indexed
+    # attribute, a scan otherwise. Other indexed filters are applied before paging.
+    page_size = DEFAULT_PAGE_SIZE
+    for name in PAGE_SIZE_PARAMETERS:
+        if name in query_parameters:
+            try:
+                page_size = max(1, min(MAX_PAGE_SIZE, int(query_parameters[name])))
+            except ValueError:
+                pass
+            break
+    start_key = decode_cursor(query_parameters.get(CURSOR_PARAMETER))
+    filters = {attribute: query_parameters[attribute] for attribute in table_spec.get('indexes', []) if attribute in query_parameters}
+
+    conditions = {attribute: {'AttributeValueList': [value], 'ComparisonOperator': 'EQ'} for attribute, value in filters.items()}
+    if conditions:
+        attribute = next(iter(conditions))
+        result = table.query(IndexName=attribute, KeyConditions={attribute: conditions.pop(attribute)}, QueryFilter=conditions,
+                             Limit=page_size, ExclusiveStartKey=start_key)
+    else:
+        result = table.scan(Limit=page_size, ExclusiveStartKey=start_key)
+    return result['Items'], encode_cursor(result.get('LastEvaluatedKey'))
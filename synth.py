@@ -0,0 +1,407 @@
+# Seeded, batched payload synthesis from OpenAPI schemas.
+# Standard library only: the module is copied next to the generated handlers and imported by them.
+import math
+import uuid
+import base64
+import random
+import string
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# A generator produces a whole column of values at once: generator(rng, n) -> list of n values
+Generator = Callable[[random.Random, int], List[Any]]
+
+BATCH_SIZE = 1000
+MAX_DEPTH = 6
+DEFAULT_MAX_ITEMS = 5
+MAX_PATTERN_REPEAT = 8
+# Names commonly given to the array of an object-wrapped list, {"data": [...], "pagination": {...}}
+LIST_PROPERTIES = ('data', 'items', 'results', 'records', 'entries', 'values', 'content')
+
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+
+WORDS = ['alpha', 'bravo', 'cedar', 'delta', 'ember', 'falcon', 'garnet', 'harbor', 'indigo', 'juniper',
+         'kestrel', 'lumen', 'maple', 'nebula', 'onyx', 'pepper', 'quartz', 'raven', 'sierra', 'tundra',
+         'umber', 'violet', 'willow', 'xenon', 'yarrow', 'zephyr']
+FIRST_NAMES = ['ada', 'alan', 'grace', 'linus', 'margaret', 'dennis', 'barbara', 'ken', 'frances', 'guido']
+LAST_NAMES = ['lovelace', 'turing', 'hopper', 'torvalds', 'hamilton', 'ritchie', 'liskov', 'thompson', 'allen', 'rossum']
+
+ALPHANUMERIC = string.ascii_letters + string.digits
+PRINTABLE = ALPHANUMERIC + ' -_.,:;!?@#$%&*+=/()[]{}'
+CATEGORY_CHARS = {
+    sre_parse.CATEGORY_DIGIT: string.digits,
+    sre_parse.CATEGORY_NOT_DIGIT: string.ascii_letters,
+    sre_parse.CATEGORY_WORD: ALPHANUMERIC + '_',
+    sre_parse.CATEGORY_NOT_WORD: ' -.',
+    sre_parse.CATEGORY_SPACE: ' ',
+    sre_parse.CATEGORY_NOT_SPACE: ALPHANUMERIC
+}
+
+def resolve(document: Dict[str, Any], ref: str) -> Any:
+    # Local references only ('#/components/schemas/...')
+    node = document
+    for part in ref.lstrip('#/').split('/'):
+        part = part.replace('~1', '/').replace('~0', '~')
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+def dereference(schema: Any, document: Optional[Dict[str, Any]]) -> Any:
+    seen = set()
+    while isinstance(schema, dict) and '$ref' in schema and schema['$ref'] not in seen:
+        seen.add(schema['$ref'])
+        schema = resolve(document or {}, schema['$ref'])
+    return schema
+
+def is_array(schema: Any) -> bool:
+    return isinstance(schema, dict) and (schema.get('type') == 'array' or (schema.get('type') is None and 'items' in schema))
+
+def object_properties(schema: Dict[str, Any], document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    properties = {}
+    for part in schema.get('allOf') or []:
+        properties.update((dereference(part, document) or {}).get('properties') or {})
+    properties.update(schema.get('properties') or {})
+    return {name: dereference(prop, document) for name, prop in properties.items()}
+
+def list_property(schema: Any, document: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    # The array property of an object-wrapped list: the only array property, or else the one with
+    # a conventional name; None for arrays and for objects without an obvious one
+    schema = dereference(schema, document)
+    if not isinstance(schema, dict) or is_array(schema):
+        return None
+    arrays = [name for name, prop in object_properties(schema, document).items() if is_array(prop)]
+    if len(arrays) == 1:
+        return arrays[0]
+    return next((name for name in LIST_PROPERTIES if name in arrays), None)
+
+def list_items_schema(schema: Any, document: Optional[Dict[str, Any]] = None) -> Any:
+    # Schema of the listed items, for a top-level array or an object-wrapped list
+    schema = dereference(schema, document)
+    if is_array(schema):
+        return schema.get('items', {})
+    name = list_property(schema, document)
+    if name is None:
+        return None
+    return object_properties(schema, document)[name].get('items', {})
+
+def constant(value: Any) -> Generator:
+    return lambda rng, n: [value] * n
+
+def compile_schema(schema: Any, document: Optional[Dict[str, Any]] = None, depth: int = 0) -> Generator:
+    # Turn a schema into a column generator once, so batches only pay for drawing random values
+    seen = set()
+    while isinstance(schema, dict) and '$ref' in schema and schema['$ref'] not in seen:
+        seen.add(schema['$ref'])
+        schema = resolve(document or {}, schema['$ref'])
+    if not isinstance(schema, dict) or depth > MAX_DEPTH:
+        return constant(None)
+
+    if 'const' in schema:
+        return constant(schema['const'])
+    if schema.get('enum'):
+        values = list(schema['enum'])
+        return lambda rng, n: rng.choices(values, k=n)
+    if schema.get('allOf'):
+        return compile_all_of(schema['allOf'], document, depth)
+    for key in ('oneOf', 'anyOf'):
+        if schema.get(key):
+            return compile_one_of(schema[key], document, depth)
+
+    schema_type = schema.get('type')
+    if isinstance(schema_type, list):
+        schema_type = next((entry for entry in schema_type if entry != 'null'), None)
+    if schema_type == 'object' or (schema_type is None and 'properties' in schema):
+        return compile_object(schema, document, depth)
+    if schema_type == 'array' or (schema_type is None and 'items' in schema):
+        return compile_array(schema, document, depth)
+    if schema_type == 'integer':
+        return compile_integer(schema)
+    if schema_type == 'number':
+        return compile_number(schema)
+    if schema_type == 'boolean':
+        return lambda rng, n: rng.choices((True, False), k=n)
+    if schema_type == 'string':
+        return compile_string(schema)
+    if 'example' in schema:
+        return constant(schema['example'])
+    return constant(None)
+
+def compile_object(schema: Dict[str, Any], document: Optional[Dict[str, Any]], depth: int) -> Generator:
+    properties = schema.get('properties') or {}
+    names = list(properties)
+    generators = [compile_schema(properties[name], document, depth + 1) for name in names]
+
+    def generate(rng: random.Random, n: int) -> List[Any]:
+        if not names:
+            return [{} for _ in range(n)]
+        # One column per property, zipped into rows
+        columns = [generator(rng, n) for generator in generators]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+    return generate
+
+def compile_array(schema: Dict[str, Any], document: Optional[Dict[str, Any]], depth: int) -> Generator:
+    item_generator = compile_schema(schema.get('items', {}), document, depth + 1)
+    min_items = max(0, int(schema.get('minItems', 1)))
+    max_items = max(min_items, int(schema.get('maxItems', min_items + DEFAULT_MAX_ITEMS - 1)))
+    lengths = range(min_items, max_items + 1)
+
+    def generate(rng: random.Random, n: int) -> List[Any]:
+        # Draw every array's items in one batch, then slice them apart
+        counts = rng.choices(lengths, k=n)
+        items = item_generator(rng, sum(counts))
+        arrays = []
+        offset = 0
+        for count in counts:
+            arrays.append(items[offset:offset + count])
+            offset += count
+        return arrays
+    return generate
+
+def compile_all_of(parts: List[Any], document: Optional[Dict[str, Any]], depth: int) -> Generator:
+    generators = [compile_schema(part, document, depth + 1) for part in parts]
+    if len(generators) == 1:
+        return generators[0]
+
+    def generate(rng: random.Random, n: int) -> List[Any]:
+        rows = [{} for _ in range(n)]
+        for generator in generators:
+            for row, value in zip(rows, generator(rng, n)):
+                if isinstance(value, dict):
+                    row.update(value)
+        return rows
+    return generate
+
+def compile_one_of(options: List[Any], document: Optional[Dict[str, Any]], depth: int) -> Generator:
+    generators = [compile_schema(option, document, depth + 1) for option in options]
+    choices = range(len(generators))
+
+    def generate(rng: random.Random, n: int) -> List[Any]:
+        # Pick an option per value, then generate each option's values as one batch
+        picks = rng.choices(choices, k=n)
+        values = [None] * n
+        for option, generator in enumerate(generators):
+            positions = [index for index, pick in enumerate(picks) if pick == option]
+            for position, value in zip(positions, generator(rng, len(positions))):
+                values[position] = value
+        return values
+    return generate
+
+def bounds(schema: Dict[str, Any], step: Any) -> tuple:
+    # OpenAPI 3.0 uses boolean exclusive flags, 3.1 uses numeric exclusive bounds
+    low, high = schema.get('minimum'), schema.get('maximum')
+    if isinstance(schema.get('exclusiveMinimum'), (int, float)) and not isinstance(schema.get('exclusiveMinimum'), bool):
+        low = schema['exclusiveMinimum'] + step
+    elif schema.get('exclusiveMinimum') is True and low is not None:
+        low += step
+    if isinstance(schema.get('exclusiveMaximum'), (int, float)) and not isinstance(schema.get('exclusiveMaximum'), bool):
+        high = schema['exclusiveMaximum'] - step
+    elif schema.get('exclusiveMaximum') is True and high is not None:
+        high -= step
+    return low, high
+
+def compile_integer(schema: Dict[str, Any]) -> Generator:
+    low, high = bounds(schema, 1)
+    if low is None:
+        low = 1 if high is None or high >= 10000 else high - 9999
+    if high is None:
+        high = low + 9999
+    multiple = abs(int(schema.get('multipleOf', 1))) or 1
+    # The first multiple within the bounds; when there is none it is still the closest valid value
+    start, stop = math.ceil(low / multiple) * multiple, math.floor(high) + 1
+    if start >= stop:
+        return constant(start)
+    # One draw per value: choices() needs a sequence, and a range over int64 bounds overflows len()
+    return lambda rng, n: [rng.randrange(start, stop, multiple) for _ in range(n)]
+
+def compile_number(schema: Dict[str, Any]) -> Generator:
+    # Values are multiples of multipleOf, or of a cent, strictly inside exclusive bounds
+    low, high = schema.get('minimum'), schema.get('maximum')
+    exclusive_low, exclusive_high = schema.get('exclusiveMinimum') is True, schema.get('exclusiveMaximum') is True
+    if isinstance(schema.get('exclusiveMinimum'), (int, float)) and not isinstance(schema.get('exclusiveMinimum'), bool):
+        low, exclusive_low = schema['exclusiveMinimum'], True
+    if isinstance(schema.get('exclusiveMaximum'), (int, float)) and not isinstance(schema.get('exclusiveMaximum'), bool):
+        high, exclusive_high = schema['exclusiveMaximum'], True
+    if low is None:
+        low = 0.0 if high is None or high >= 1000 else high - 1000.0
+    if high is None:
+        high = low + 1000.0
+
+    step = abs(float(schema.get('multipleOf') or 0)) or 0.01
+    places = max(0, -Decimal(repr(step)).as_tuple().exponent)
+    first, last = math.ceil(low / step), math.floor(high / step)
+    if exclusive_low and first * step <= low:
+        first += 1
+    if exclusive_high and last * step >= high:
+        last -= 1
+    if first > last:
+        return constant(round(first * step, places) if schema.get('multipleOf') else (low + high) / 2)
+    return lambda rng, n: [round(rng.randint(first, last) * step, places) for _ in range(n)]
+
+def compile_string(schema: Dict[str, Any]) -> Generator:
+    if schema.get('pattern'):
+        pattern = compile_pattern(schema['pattern'])
+        if pattern is not None:
+            return lambda rng, n: [pattern(rng, {}) for _ in range(n)]
+    string_format = schema.get('format')
+    if string_format in FORMATS:
+        return FORMATS[string_format]
+
+    min_length = int(schema.get('minLength', 0))
+    max_length = int(schema.get('maxLength', max(min_length, 64)))
+
+    def generate(rng: random.Random, n: int) -> List[Any]:
+        values = [f"{first} {second}" for first, second in zip(rng.choices(WORDS, k=n), rng.choices(WORDS, k=n))]
+        if min_length or max_length < 64:
+            values = [(value + ''.join(rng.choices(string.ascii_lowercase, k=max(0, min_length - len(value)))))[:max_length] for value in values]
+        return values
+    return generate
+
+def date_times(rng: random.Random, n: int) -> List[str]:
+    return [(EPOCH + timedelta(seconds=offset)).strftime('%Y-%m-%dT%H:%M:%SZ') for offset in rng.choices(range(SPAN_SECONDS), k=n)]
+
+def dates(rng: random.Random, n: int) -> List[str]:
+    return [(EPOCH + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in rng.choices(range(SPAN_SECONDS // 86400), k=n)]
+
+def times(rng: random.Random, n: int) -> List[str]:
+    return [f"{offset // 3600:02d}:{offset // 60 % 60:02d}:{offset % 60:02d}" for offset in rng.choices(range(86400), k=n)]
+
+def emails(rng: random.Random, n: int) -> List[str]:
+    return [f"{first}.{last}{number}@example.com" for first, last, number in
+            zip(rng.choices(FIRST_NAMES, k=n), rng.choices(LAST_NAMES, k=n), rng.choices(range(100), k=n))]
+
+def uuids(rng: random.Random, n: int) -> List[str]:
+    bits = rng.getrandbits
+    return [str(uuid.UUID(int=bits(128), version=4)) for _ in range(n)]
+
+def uris(rng: random.Random, n: int) -> List[str]:
+    return [f"https://example.com/{word}/{number}" for word, number in zip(rng.choices(WORDS, k=n), rng.choices(range(10000), k=n))]
+
+def hostnames(rng: random.Random, n: int) -> List[str]:
+    return [f"{word}{number}.example.com" for word, number in zip(rng.choices(WORDS, k=n), rng.choices(range(100), k=n))]
+
+def ipv4s(rng: random.Random, n: int) -> List[str]:
+    bits = rng.getrandbits
+    return [f"10.{value >> 16}.{value >> 8 & 255}.{value & 255}" for value in (bits(24) for _ in range(n))]
+
+def ipv6s(rng: random.Random, n: int) -> List[str]:
+    bits = rng.getrandbits
+    return [f"2001:db8::{bits(16):x}:{bits(16):x}" for _ in range(n)]
+
+def byte_strings(rng: random.Random, n: int) -> List[str]:
+    bits = rng.getrandbits
+    return [base64.b64encode(bits(96).to_bytes(12, 'big')).decode() for _ in range(n)]
+
+def passwords(rng: random.Random, n: int) -> List[str]:
+    return [''.join(rng.choices(ALPHANUMERIC, k=16)) for _ in range(n)]
+
+FORMATS = {
+    'date-time': date_times,
+    'date': dates,
+    'time': times,
+    'email': emails,
+    'uuid': uuids,
+    'uri': uris,
+    'url': uris,
+    'hostname': hostnames,
+    'ipv4': ipv4s,
+    'ipv6': ipv6s,
+    'byte': byte_strings,
+    'password': passwords
+}
+
+def compile_pattern(pattern: str) -> Optional[Callable[[random.Random, Dict[int, str]], str]]:
+    # Strings matching a regular expression, built from the parsed pattern; None when it cannot be parsed
+    try:
+        return compile_pattern_items(sre_parse.parse(pattern))
+    except Exception:
+        return None
+
+def character_set(items: List[Any]) -> str:
+    characters = set()
+    negate = False
+    for op, value in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            characters.add(chr(value))
+        elif op is sre_parse.RANGE:
+            characters.update(chr(code) for code in range(value[0], min(value[1], value[0] + 255) + 1))
+        elif op is sre_parse.CATEGORY:
+            characters.update(CATEGORY_CHARS.get(value, ''))
+    if negate:
+        return ''.join(character for character in PRINTABLE if character not in characters)
+    return ''.join(sorted(characters))
+
+def compile_pattern_items(items: Any) -> Callable[[random.Random, Dict[int, str]], str]:
+    parts = []
+    for op, value in items:
+        if op is sre_parse.LITERAL:
+            parts.append(lambda rng, groups, text=chr(value): text)
+        elif op is sre_parse.NOT_LITERAL:
+            candidates = PRINTABLE.replace(chr(value), '')
+            parts.append(lambda rng, groups, candidates=candidates: rng.choice(candidates))
+        elif op is sre_parse.ANY:
+            parts.append(lambda rng, groups: rng.choice(ALPHANUMERIC))
+        elif op is sre_parse.IN:
+            candidates = character_set(value) or ALPHANUMERIC
+            parts.append(lambda rng, groups, candidates=candidates: rng.choice(candidates))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = value
+            counts = range(low, min(high, low + MAX_PATTERN_REPEAT) + 1)
+            part = compile_pattern_items(sub)
+            parts.append(lambda rng, groups, counts=counts, part=part: ''.join(part(rng, groups) for _ in range(rng.choice(counts))))
+        elif op is sre_parse.SUBPATTERN:
+            group, sub = value[0], value[-1]
+            part = compile_pattern_items(sub)
+
+            def capture(rng, groups, group=group, part=part):
+                text = part(rng, groups)
+                if group:
+                    groups[group] = text
+                return text
+            parts.append(capture)
+        elif op is sre_parse.BRANCH:
+            branches = [compile_pattern_items(branch) for branch in value[1]]
+            parts.append(lambda rng, groups, branches=branches: rng.choice(branches)(rng, groups))
+        elif op is sre_parse.GROUPREF:
+            parts.append(lambda rng, groups, group=value: groups.get(group, ''))
+        elif op is sre_parse.CATEGORY:
+            candidates = CATEGORY_CHARS.get(value, ALPHANUMERIC)
+            parts.append(lambda rng, groups, candidates=candidates: rng.choice(candidates))
+        # Anchors and lookarounds do not produce characters
+
+    return lambda rng, groups: ''.join(part(rng, groups) for part in parts)
+
+def iter_batches(schema: Any, count: int, document: Optional[Dict[str, Any]] = None, seed: int = 0, batch_size: int = BATCH_SIZE) -> Iterator[List[Any]]:
+    # count values of the schema in batches; the same seed always yields the same values
+    generator = compile_schema(schema, document)
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        yield generator(rng, min(batch_size, count - start))
+
+def generate_batch(schema: Any, count: int, document: Optional[Dict[str, Any]] = None, seed: int = 0) -> List[Any]:
+    values = []
+    for batch in iter_batches(schema, count, document, seed):
+        values.extend(batch)
+    return values
+
+def generate(schema: Any, document: Optional[Dict[str, Any]] = None, seed: int = 0, items: Optional[int] = None) -> Any:
+    # A single payload; items sets the length of the listed array, e.g. a list endpoint returning
+    # 10k entries, either a top-level array or the array property of an object-wrapped list
+    if items is not None:
+        if is_array(dereference(schema, document)):
+            return generate_batch(list_items_schema(schema, document), items, document, seed)
+        name = list_property(schema, document)
+        payload = generate_batch(schema, 1, document, seed)[0]
+        if name is not None and isinstance(payload, dict):
+            payload[name] = generate_batch(list_items_schema(schema, document), items, document, seed)
+        return payload
+    return generate_batch(schema, 1, document, seed)[0]
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
+
+# Timed spans for the pipeline: one per stage and deploy step, one per generated operation and one
+# per LLM invocation, written to deploy/ as a JSON run report and optionally as OTLP/JSON.
+
+REPORT_PATH = "deploy/run-report.json"
+OTLP_PATH = "deploy/run-report.otlp.json"
+SLOWEST_OPERATIONS = 10
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.error = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1):
+        with _lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': round(self.duration, 6),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+trace_id = uuid.uuid4().hex
+spans: List[Span] = []
+_lock = threading.Lock()
+_current = contextvars.ContextVar('span', default=None)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def in_context(fn: Callable) -> Callable:
+    # Executor threads do not inherit the context: the wrapper runs fn in a copy of the submitting
+    # thread's context, so the spans fn opens are parented by the span that was current there.
+    # Each call gets its own copy, a context cannot be entered by two threads at once
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+@contextmanager
+def span(name: str, root: bool = False, **attributes):
+    parent = None if root else current_span()
+    record = Span(name, parent.span_id if parent else None, attributes)
+    with _lock:
+        spans.append(record)
+    token = _current.set(record)
+    try:
+        yield record
+    except BaseException as error:
+        record.error = repr(error)
+        raise
+    finally:
+        record.end = time.time_ns()
+        _current.reset(token)
+
+@contextmanager
+def stage(name: str, **attributes):
+    # A top-level span for a pipeline stage; its worker threads join it through in_context
+    with span(name, root=True, kind='stage', **attributes) as record:
+        yield record
+
+def add(key: str, amount: float = 1):
+    # Count something (cache hits, retries...) on whatever span is running
+    record = current_span()
+    if record is not None:
+        record.add(key, amount)
+
+def reset():
+    global trace_id
+    with _lock:
+        spans.clear()
+    trace_id = uuid.uuid4().hex
+
+def descendants(root: Span, children: Dict[str, List[Span]]) -> List[Span]:
+    found = []
+    pending = [root]
+    while pending:
+        record = pending.pop()
+        found.append(record)
+        pending.extend(children.get(record.span_id, []))
+    return found
+
+def summarize(records: List[Span]) -> Dict[str, Any]:
+    calls = [record for record in records if record.name == 'llm.invoke']
+    total = lambda key: sum(record.attributes.get(key, 0) for record in records)
+    return {
+        'llm_calls': len(calls),
+        'llm_seconds': round(sum(record.duration for record in calls), 3),
+        'prompt_tokens': total('llm.prompt_tokens'),
+        'completion_tokens': total('llm.completion_tokens'),
+        'retries': total('llm.retries'),
+        'cache_hits': total('cache.hits'),
+        'cache_misses': total('cache.misses')
+    }
+
+def build_report() -> Dict[str, Any]:
+    with _lock:
+        records = list(spans)
+    children = {}
+    for record in records:
+        children.setdefault(record.parent_id, []).append(record)
+
+    stages = []
+    for record in children.get(None, []):
+        stages.append(dict({'name': record.name, 'duration': round(record.duration, 3), 'error': record.error},
+                           **summarize(descendants(record, children))))
+
+    # LLM calls count as operations unless they already sit inside a span for their operation
+    operation_ids = {record.span_id for record in records if 'operation' in record.attributes and record.name != 'llm.invoke'}
+    operations = [record for record in records if 'operation' in record.attributes
+                  and not (record.name == 'llm.invoke' and record.parent_id in operation_ids)]
+    operations.sort(key=lambda record: record.duration, reverse=True)
+    started = min((record.start for record in records), default=time.time_ns())
+    ended = max((record.end or time.time_ns() for record in records), default=started)
+    return {
+        'trace_id': trace_id,
+        'started': started,
+        'duration': round((ended - started) / 1e9, 3),
+        'totals': summarize(records),
+        'stages': stages,
+        'slowest_operations': [
+            {'name': record.name, 'operation': record.attributes['operation'], 'duration': round(record.duration, 3)}
+            for record in operations[:SLOWEST_OPERATIONS]
+        ],
+        'spans': [record.to_dict() for record in records]
+    }
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def build_otlp(service_name: str = 'mockthis') -> Dict[str, Any]:
+    # OTLP/JSON as written by the OpenTelemetry collector's file exporter, one trace per run
+    with _lock:
+        records = list(spans)
+    otlp_spans = []
+    for record in records:
+        otlp_span = {
+            'traceId': trace_id,
+            'spanId': record.span_id,
+            'name': record.name,
+            'kind': 1,
+            'startTimeUnixNano': str(record.start),
+            'endTimeUnixNano': str(record.end or time.time_ns()),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in record.attributes.items()],
+            'status': {'code': 2, 'message': record.error} if record.error else {'code': 1}
+        }
+        if record.parent_id:
+            otlp_span['parentSpanId'] = record.parent_id
+        otlp_spans.append(otlp_span)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+        'scopeSpans': [{'scope': {'name': 'mockthis.telemetry'}, 'spans': otlp_spans}]
+    }]}
+
+def write_report(path: str = REPORT_PATH, otlp_path: Optional[str] = None) -> Optional[str]:
+    if not spans:
+        return None
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(build_report(), file, indent=2, default=str)
+    if otlp_path:
+        with open(otlp_path, 'w') as file:
+            file.write(json.dumps(build_otlp(), default=str) + "\n")
+    return path
@@ -0,0 +1,352 @@
+import pprint
+from typing import Dict, Any, List, Optional, Tuple
+from filter import resolve_ref, collect_components
+import synth
+
+# Deterministic, LLM-free handler generation: the spec's examples (or payloads synthesized
+# from its schemas) are baked into a handler shaped like input/handler.py.
+
+LLM_EXTENSION = 'x-mockthis-llm'
+SYNTHETIC_EXTENSION = 'x-mockthis-synthetic'
+
+FORMAT_EXAMPLES = {
+    'date-time': '2023-01-01T00:00:00Z',
+    'date': '2023-01-01',
+    'time': '00:00:00',
+    'email': 'user@example.com',
+    'uuid': '3fa85f64-5717-4562-b3fc-2c963f66afa6',
+    'uri': 'https://example.com',
+    'url': 'https://example.com',
+    'hostname': 'example.com',
+    'ipv4': '192.0.2.1',
+    'ipv6': '2001:db8::1',
+    'byte': 'ZXhhbXBsZQ==',
+    'password': 'password'
+}
+
+HANDLER_TEMPLATE = '''import json{imports}
+
+# Mock handler '{function_name}' for {method} {path}, generated from the OpenAPI spec
+
+PATH_PARAMETERS = {path_parameters}
+REQUIRED_QUERY_PARAMETERS = {required_query_parameters}
+QUERY_DEFAULTS = {query_defaults}
+BODY_REQUIRED = {body_required}
+
+SUCCESS_STATUS = {success_status}
+{synthetic_schema}SUCCESS_BODY = {success_body}
+ERROR_BODIES = {error_bodies}
+
+def handler(event, context):
+    http_method = event['httpMethod']
+
+    if http_method == '{method}':
+        return handle_{handler_name}(event)
+    else:
+        return create_response(405, {{'error': 'Method not allowed'}})
+
+def handle_{handler_name}(event):
+    # Parse path parameters, query string parameters and request body
+    path_parameters = event.get('pathParameters') or {{}}
+    query_parameters = dict(QUERY_DEFAULTS)
+    query_parameters.update(event.get('queryStringParameters') or {{}})
+
+    missing = [name for name in PATH_PARAMETERS if not path_parameters.get(name)]
+    missing += [name for name in REQUIRED_QUERY_PARAMETERS if name not in query_parameters]
+    if missing:
+        return error_response(400, f"Missing required parameters: {{', '.join(missing)}}")
+
+    body = None
+    if event.get('body'):
+        try:
+            body = json.loads(event['body'])
+        except ValueError:
+            return error_response(400, 'Request body is not valid JSON')
+    if BODY_REQUIRED and body is None:
+        return error_response(400, 'Request body is required')
+
+    return {success_response}
+
+{error_cache}def error_response(status_code, message):
+    # Prefer the error example declared in the spec for this status code
+    body = ERROR_BODIES.get(status_code, {{'error': message}})
+    return create_response(status_code, body)
+
+def create_response(status_code, body):
+    if status_code == 204 or body is None:
+        return {{
+            "statusCode": status_code,
+            "headers": {{"Content-Type": "application/json"}},
+            "body": ""
+        }}
+    return {{
+        "statusCode": status_code,
+        "headers": {{"Content-Type": "application/json"}},
+        "body": json.dumps(body)
+    }}
+{memoized_responses}'''
+
+MEMOIZED_RESPONSES = '''
+# Serialized once at import, warm invocations get a copy of the same response
+SUCCESS_RESPONSE = create_response(SUCCESS_STATUS, SUCCESS_BODY)
+success_response = fresh_response(lambda: SUCCESS_RESPONSE)
+'''
+
+RESPONSE_CACHE_SIZE = 256
+
+# Cached responses are shared between invocations, so callers get their own response and headers
+# dicts around the cached body and can add headers without changing later responses
+ERROR_CACHE = '''def fresh_response(cached):
+    @functools.wraps(cached)
+    def response(*args):
+        cached_response = cached(*args)
+        return dict(cached_response, headers=dict(cached_response['headers']))
+    return response
+
+@fresh_response
+@functools.lru_cache(maxsize={cache_size})
+'''
+
+STATE_BLOCK = '''
+# '{kind}' operation on the '{table}' table, shared with the other handlers loaded in this process
+TABLE_SPEC = {table_spec}
+table = state.open_table(TABLE_SPEC)
+
+def handle_state(path_parameters, query_parameters, body):
+{state_code}'''
+
+STATE_CODE = {
+    'create': '''    try:
+        item = state.create_item(table, TABLE_SPEC, body if isinstance(body, dict) else {})
+    except state.ItemExists:
+        return error_response(409, 'Already exists')
+    return create_response(SUCCESS_STATUS, item)
+''',
+    'list': '''    items, next_cursor = state.list_page(table, TABLE_SPEC, query_parameters)
+    response = create_response(SUCCESS_STATUS, state.list_body(TABLE_SPEC, SUCCESS_BODY, items))
+    if next_cursor:
+        response['headers'] = dict(response['headers'], **{'X-Next-Cursor': next_cursor})
+    return response
+''',
+    'read': '''    item = table.get_item(Key=state.parse_key(TABLE_SPEC, path_parameters[TABLE_SPEC['key_parameter']])).get('Item')
+    if item is None:
+        return error_response(404, 'Not found')
+    return create_response(SUCCESS_STATUS, item)
+''',
+    'replace': '''    key = state.parse_key(TABLE_SPEC, path_parameters[TABLE_SPEC['key_parameter']])
+    if table.get_item(Key=key).get('Item') is None:
+        return error_response(404, 'Not found')
+    item = dict(body if isinstance(body, dict) else {}, **key)
+    table.put_item(Item=item)
+    return create_response(SUCCESS_STATUS, item)
+''',
+    'update': '''    key = state.parse_key(TABLE_SPEC, path_parameters[TABLE_SPEC['key_parameter']])
+    item = table.get_item(Key=key).get('Item')
+    if item is None:
+        return error_response(404, 'Not found')
+    item.update(body if isinstance(body, dict) else {})
+    item.update(key)
+    table.put_item(Item=item)
+    return create_response(SUCCESS_STATUS, item)
+''',
+    'delete': '''    key = state.parse_key(TABLE_SPEC, path_parameters[TABLE_SPEC['key_parameter']])
+    item = table.delete_item(Key=key, ReturnValues='ALL_OLD').get('Attributes')
+    if item is None:
+        return error_response(404, 'Not found')
+    return create_response(SUCCESS_STATUS, item)
+'''
+}
+
+def deref(node: Any, openapi_spec: Dict[str, Any]) -> Any:
+    # Follow $ref chains until a concrete node is reached
+    seen = set()
+    while isinstance(node, dict) and '$ref' in node and node['$ref'] not in seen:
+        seen.add(node['$ref'])
+        resolved = resolve_ref(openapi_spec, node['$ref'])
+        if resolved is None:
+            return {}
+        node = resolved
+    return node
+
+def example_from_schema(schema: Dict[str, Any], openapi_spec: Dict[str, Any], depth: int = 0) -> Any:
+    # Deterministically synthesize a payload from a schema
+    schema = deref(schema, openapi_spec)
+    if not isinstance(schema, dict) or depth > 8:
+        return None
+    for key in ('example', 'default'):
+        if key in schema:
+            return schema[key]
+    if schema.get('enum'):
+        return schema['enum'][0]
+    if 'allOf' in schema:
+        merged = {}
+        for part in schema['allOf']:
+            value = example_from_schema(part, openapi_spec, depth + 1)
+            if isinstance(value, dict):
+                merged.update(value)
+        return merged
+    for key in ('oneOf', 'anyOf'):
+        if schema.get(key):
+            return example_from_schema(schema[key][0], openapi_spec, depth + 1)
+
+    schema_type = schema.get('type')
+    if schema_type == 'object' or 'properties' in schema:
+        return {
+            name: example_from_schema(prop, openapi_spec, depth + 1)
+            for name, prop in (schema.get('properties') or {}).items()
+        }
+    if schema_type == 'array':
+        count = max(1, schema.get('minItems', 1))
+        return [example_from_schema(schema.get('items', {}), openapi_spec, depth + 1) for _ in range(count)]
+    if schema_type == 'integer':
+        return schema.get('minimum', 1)
+    if schema_type == 'number':
+        return float(schema.get('minimum', 1.0))
+    if schema_type == 'boolean':
+        return True
+    if schema_type == 'string':
+        return FORMAT_EXAMPLES.get(schema.get('format'), 'string')
+    return None
+
+def example_from_content(response: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Any:
+    # Prefer explicit examples over schema synthesis, JSON media types first
+    content = response.get('content') or {}
+    media_types = sorted(content, key=lambda media_type: 'json' not in media_type)
+    for media_type in media_types:
+        media = content[media_type] or {}
+        if 'example' in media:
+            return media['example']
+        for example in (media.get('examples') or {}).values():
+            example = deref(example, openapi_spec)
+            if isinstance(example, dict) and 'value' in example:
+                return example['value']
+        if 'schema' in media:
+            return example_from_schema(media['schema'], openapi_spec)
+    return None
+
+def schema_from_content(response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    content = response.get('content') or {}
+    for media_type in sorted(content, key=lambda media_type: 'json' not in media_type):
+        if 'schema' in (content[media_type] or {}):
+            return content[media_type]['schema']
+    return None
+
+def synthetic_options(operation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # x-mockthis-synthetic: true, or {items: 10000, seed: 42} to size a list response
+    value = operation.get(SYNTHETIC_EXTENSION)
+    if value is True:
+        return {}
+    if isinstance(value, dict):
+        return value
+    return None
+
+def synthesize_example(openapi_spec: Dict[str, Any], path: str, method: str, seed: int = 0) -> Any:
+    # A varied success payload drawn from the response schema, for prompts that would otherwise invent one
+    operation = openapi_spec.get('paths', {}).get(path, {}).get(method.lower(), {})
+    responses = {str(code): deref(response, openapi_spec) for code, response in (operation.get('responses') or {}).items()}
+    _, success_code = select_success_status(responses)
+    schema = schema_from_content(responses[success_code]) if success_code else None
+    return synth.generate(schema, openapi_spec, seed=seed) if schema else None
+
+def select_success_status(responses: Dict[str, Any]) -> Tuple[int, Optional[str]]:
+    # The lowest declared 2xx status, falling back to 'default' and then 200
+    codes = sorted(str(code) for code in responses if str(code).startswith('2') and str(code).isdigit())
+    if codes:
+        return int(codes[0]), codes[0]
+    if 'default' in responses:
+        return 200, 'default'
+    return 200, None
+
+def collect_parameters(openapi_spec: Dict[str, Any], path: str, method: str) -> List[Dict[str, Any]]:
+    # Operation parameters override path-level ones with the same name and location
+    path_item = openapi_spec.get('paths', {}).get(path, {})
+    operation = path_item.get(method, {})
+    parameters = {}
+    for parameter in path_item.get('parameters', []) + operation.get('parameters', []):
+        parameter = deref(parameter, openapi_spec)
+        parameters[(parameter.get('name'), parameter.get('in'))] = parameter
+    return list(parameters.values())
+
+def wants_llm(openapi_spec: Dict[str, Any], path: str, method: str) -> bool:
+    # Operations can opt into the LLM backend with the x-mockthis-llm extension
+    operation = openapi_spec.get('paths', {}).get(path, {}).get(method.lower(), {})
+    return bool(operation.get(LLM_EXTENSION))
+
+def wants_synth(openapi_spec: Dict[str, Any], path: str, method: str) -> bool:
+    operation = openapi_spec.get('paths', {}).get(path, {}).get(method.lower(), {})
+    return synthetic_options(operation) is not None
+
+def format_literal(value: Any) -> str:
+    return pprint.pformat(value, width=100, sort_dicts=False)
+
+def render_handler(function_name: str, path: str, method: str, openapi_spec: Dict[str, Any], memoize: bool = False, state: Optional[Tuple[str, Dict[str, Any]]] = None) -> str:
+    method = method.lower()
+    operation = openapi_spec.get('paths', {}).get(path, {}).get(method, {})
+    parameters = collect_parameters(openapi_spec, path, method)
+    responses = {str(code): deref(response, openapi_spec) for code, response in (operation.get('responses') or {}).items()}
+
+    success_status, success_code = select_success_status(responses)
+    success_body = format_literal(example_from_content(responses[success_code], openapi_spec) if success_code else None)
+
+    # Synthetic operations generate their payload from the schema when the handler is loaded
+    imports = []
+    synthetic_schema = ''
+    options = synthetic_options(operation)
+    success_schema = schema_from_content(responses[success_code]) if success_code else None
+    if options is not None and success_schema is not None:
+        imports.append('synth')
+        synthetic_schema = (f"SUCCESS_SCHEMA = {format_literal(success_schema)}\n"
+                            f"SCHEMA_DOCUMENT = {format_literal({'components': collect_components(openapi_spec, success_schema)})}\n")
+        items = int(options['items']) if options.get('items') is not None else None
+        success_body = f"synth.generate(SUCCESS_SCHEMA, SCHEMA_DOCUMENT, seed={int(options.get('seed', 0))}, items={items})"
+
+    error_bodies = {}
+    for code, response in responses.items():
+        if code.isdigit() and int(code) >= 400:
+            example = example_from_content(response, openapi_spec)
+            if example is not None:
+                error_bodies[int(code)] = example
+
+    query_parameters = [parameter for parameter in parameters if parameter.get('in') == 'query']
+    query_defaults = {}
+    for parameter in query_parameters:
+        schema = deref(parameter.get('schema', {}), openapi_spec)
+        if isinstance(schema, dict) and 'default' in schema:
+            query_defaults[parameter['name']] = str(schema['default'])
+
+    request_body = deref(operation.get('requestBody', {}), openapi_spec)
+
+    # Memoized handlers serialize the success response once and keep recent error responses
+    success_response = 'create_response(SUCCESS_STATUS, SUCCESS_BODY)'
+    error_cache = memoized_responses = ''
+    if memoize:
+        imports.append('functools')
+        success_response = 'success_response()'
+        error_cache = ERROR_CACHE.format(cache_size=RESPONSE_CACHE_SIZE)
+        memoized_responses = MEMOIZED_RESPONSES
+
+    # Stateful operations read and write their resource's table instead of returning the example
+    if state is not None:
+        kind, table_spec = state
+        imports.append('state')
+        success_response = 'handle_state(path_parameters, query_parameters, body)'
+        memoized_responses = STATE_BLOCK.format(kind=kind, table=table_spec['name'], table_spec=format_literal(table_spec), state_code=STATE_CODE[kind])
+
+    return HANDLER_TEMPLATE.format(
+        function_name=function_name,
+        method=method.upper(),
+        path=path,
+        handler_name=method,
+        path_parameters=format_literal([parameter['name'] for parameter in parameters if parameter.get('in') == 'path']),
+        required_query_parameters=format_literal([parameter['name'] for parameter in query_parameters if parameter.get('required')]),
+        query_defaults=format_literal(query_defaults),
+        body_required=bool(request_body.get('required')),
+        imports=''.join(f"\nimport {module}" for module in sorted(imports)),
+        synthetic_schema=synthetic_schema,
+        success_status=success_status,
+        success_body=success_body,
+        error_bodies=format_literal(error_bodies),
+        success_response=success_response,
+        error_cache=error_cache,
+        memoized_responses=memoized_responses
+    )
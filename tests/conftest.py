@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+import yaml
+
+# The modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import spec
+from openapi import load_openapi
+
+OPENAPI_PATH = os.path.join(ROOT, 'input', 'openapi.yml')
+EXAMPLE_HANDLER_PATH = os.path.join(ROOT, 'input', 'handler.py')
+
+@pytest.fixture
+def serverless_config(tmp_path):
+    # A deploy/api.yml for the sample spec, as spec.py would generate it, in a scratch directory
+    functions = {
+        function['name']: {
+            'handler': f"handlers/{function['name']}.handler",
+            'events': [{'http': {'path': function['path'], 'method': function['method'].lower()}}]
+        }
+        for function in spec.extract_api_functions(load_openapi(OPENAPI_PATH))
+    }
+    config_path = tmp_path / 'api.yml'
+    config_path.write_text(yaml.safe_dump({'service': 'users', 'provider': {'name': 'aws'}, 'plugins': ['serverless-offline'], 'functions': functions}))
+    return str(config_path)
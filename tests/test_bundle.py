@@ -0,0 +1,61 @@
+import sys
+import pytest
+import yaml
+import bundle
+import implement
+from conftest import OPENAPI_PATH, EXAMPLE_HANDLER_PATH
+
+def test_stateful_package_has_no_requirements(tmp_path, serverless_config):
+    config_path = serverless_config
+    failures = implement.generate_handlers(config_path, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'), stateful=True)
+    assert failures == {}
+    assert (tmp_path / 'state.py').exists()
+
+    with open(config_path) as file:
+        generated = file.read()
+
+    report = bundle.write_packaging(config_path)
+
+    assert report['requirements'] == []
+    assert not (tmp_path / 'requirements.txt').exists()
+    # The generated configuration is left for the next incremental build
+    with open(config_path) as file:
+        assert file.read() == generated
+    assert report['config'] == str(tmp_path / 'api.packaged.yml')
+    with open(report['config']) as file:
+        config = yaml.safe_load(file)
+    assert config['provider']['runtime'] == bundle.PROFILES[bundle.DEFAULT_PROFILE]['runtime']
+    assert config['plugins'] == ['serverless-offline']
+    assert 'pythonRequirements' not in (config.get('custom') or {})
+    assert 'state.py' in config['functions']['post_users']['package']['patterns']
+
+def test_only_installed_distributions_are_required(tmp_path):
+    (tmp_path / 'handlers').mkdir()
+    (tmp_path / 'handlers' / 'ping.py').write_text("import yaml\nimport not_a_distribution\nimport synth\n\ndef handler(event, context):\n    pass\n")
+    config_path = tmp_path / 'api.yml'
+    config_path.write_text(yaml.safe_dump({'service': 'ping', 'functions': {'ping': {'handler': 'handlers/ping.handler'}}}))
+
+    report = bundle.write_packaging(str(config_path))
+
+    assert [requirement.split('==')[0].lower() for requirement in report['requirements']] == ['pyyaml']
+    assert (tmp_path / 'requirements.txt').read_text().lower().startswith('pyyaml==')
+
+@pytest.mark.parametrize('module_name', ['json', 'os', 'sys', 'itertools', 'collections', 'sqlite3', 'importlib', 'concurrent', '__future__'])
+def test_standard_library_modules(module_name):
+    assert bundle.is_stdlib(module_name)
+
+@pytest.mark.parametrize('module_name', ['yaml', 'pytest', 'not_a_distribution'])
+def test_other_modules_are_not_standard_library(module_name):
+    assert not bundle.is_stdlib(module_name)
+
+@pytest.mark.skipif(not hasattr(sys, 'stdlib_module_names'), reason="Python 3.10+")
+def test_stdlib_check_agrees_with_python_3_10():
+    # setuptools replaces distutils with its own copy from site-packages
+    importable = [name for name in sorted(sys.stdlib_module_names)
+                  if not name.startswith('_') and name != 'distutils' and bundle.importlib.util.find_spec(name) is not None]
+    assert [name for name in importable if not bundle.is_stdlib(name)] == []
+
+def test_module_distributions():
+    distributions = bundle.module_distributions()
+    assert 'PyYAML' in distributions['yaml']
+    assert 'pytest' in distributions['pytest']
@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import cache
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache_dir = str(tmp_path)
+    key = cache.cache_key('handler', 'get_users')
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda number: cache.put(key, {'writer': number, 'code': 'x' * 100000}, cache_dir), range(64)))
+    assert cache.get(key, cache_dir)['code'] == 'x' * 100000
+    assert os.listdir(os.path.dirname(cache.entry_path(key, cache_dir))) == [f"{key}.json"]
+
+def test_failed_put_leaves_no_temporary_file(tmp_path):
+    key = cache.cache_key('unserializable')
+    with pytest.raises(TypeError):
+        cache.put(key, object(), str(tmp_path))
+    assert os.listdir(os.path.dirname(cache.entry_path(key, str(tmp_path)))) == []
+    assert cache.get(key, str(tmp_path)) is None
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    for number, key in enumerate(['old', 'new']):
+        cache.put(cache.cache_key(key), 'v' * 100, cache_dir)
+        os.utime(cache.entry_path(cache.cache_key(key), cache_dir), (number, number))
+    assert cache.evict(150, cache_dir) == 1
+    assert cache.get(cache.cache_key('old'), cache_dir) is None
+    assert cache.get(cache.cache_key('new'), cache_dir) == 'v' * 100
@@ -0,0 +1,67 @@
+import os
+import deploy_info
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r') as file:
+        return file.read()
+
+def test_single_endpoint_deploy():
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_single.log'))
+    assert (info['service'], info['stage'], info['region'], info['stack']) == ('users-api', 'dev', 'us-east-1', 'users-api-dev')
+    assert info['base_url'] == 'https://abc123defg.execute-api.us-east-1.amazonaws.com/dev'
+    assert info['endpoints'] == [{'method': 'GET', 'path': '/users', 'url': 'https://abc123defg.execute-api.us-east-1.amazonaws.com/dev/users'}]
+    assert info['functions'] == {'get_users': {'name': 'users-api-dev-get_users', 'arn': None}}
+
+def test_multi_endpoint_deploy_with_colors():
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_multi.log'))
+    assert (info['service'], info['stage'], info['region'], info['stack']) == ('users-api', 'prod', 'eu-west-1', 'users-api-prod')
+    base_url = 'https://k3x9p2qz1a.execute-api.eu-west-1.amazonaws.com/prod'
+    assert info['base_url'] == base_url
+    assert [(endpoint['method'], endpoint['path']) for endpoint in info['endpoints']] == [
+        ('GET', '/users'), ('POST', '/users'), ('GET', '/users/{userId}'), ('PUT', '/users/{userId}'), ('DELETE', '/users/{userId}'), ('GET', '/plans')
+    ]
+    assert deploy_info.find_endpoint_url(info, 'delete', '/users/{userId}') == f"{base_url}/users/{{userId}}"
+    assert info['functions']['get_plans'] == {'name': 'users-api-prod-get_plans', 'arn': None}
+    assert list(info['functions']) == ['get_users', 'post_users', 'get_users_user_id', 'put_users_user_id', 'delete_users_user_id', 'get_plans']
+
+def test_quoted_v4_header():
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_v4.log'))
+    assert (info['service'], info['stage'], info['region'], info['stack']) == ('users-api', 'dev', 'us-east-1', 'users-api-dev')
+    assert [endpoint['method'] for endpoint in info['endpoints']] == ['GET', 'POST']
+    assert sorted(info['functions']) == ['get_users', 'post_users']
+
+def test_failed_deploy():
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_failed.log'))
+    assert (info['service'], info['stage'], info['region']) == ('users-api', 'dev', 'us-east-1')
+    assert info['base_url'] is None
+    assert info['endpoints'] == []
+    assert info['functions'] == {}
+
+def test_appended_log_describes_the_last_deploy():
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_multi.log') + read_fixture('deploy_single.log'))
+    assert (info['stage'], info['region']) == ('dev', 'us-east-1')
+    assert len(info['endpoints']) == 1
+    assert list(info['functions']) == ['get_users']
+
+    # A failed deploy after a successful one leaves nothing deployed to report from this log
+    info = deploy_info.parse_deploy_log(read_fixture('deploy_multi.log') + read_fixture('deploy_failed.log'))
+    assert (info['stage'], info['endpoints'], info['functions']) == ('dev', [], {})
+
+def test_info_output_with_stack_outputs():
+    info = deploy_info.parse_deploy_log(read_fixture('info.log'))
+    assert (info['service'], info['stage'], info['region'], info['stack']) == ('users-api', 'dev', 'us-east-1', 'users-api-dev')
+    assert [(endpoint['method'], endpoint['path']) for endpoint in info['endpoints']] == [('GET', '/users'), ('POST', '/users'), ('GET', '/users/{userId}')]
+    assert info['functions']['post_users'] == {
+        'name': 'users-api-dev-post_users',
+        'arn': 'arn:aws:lambda:us-east-1:123456789012:function:users-api-dev-post_users:3'
+    }
+    # Stack outputs are not endpoints
+    assert all(endpoint['path'] != '/' for endpoint in info['endpoints'])
+
+def test_load_deploy_info_reads_raw_logs(tmp_path):
+    log_path = tmp_path / 'deploy.log'
+    log_path.write_text(read_fixture('deploy_single.log'))
+    assert deploy_info.load_deploy_info(str(log_path))['stack'] == 'users-api-dev'
+    assert deploy_info.load_deploy_info(str(tmp_path / 'missing.json')) == deploy_info.empty_deploy_info()
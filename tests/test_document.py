@@ -0,0 +1,45 @@
+import time
+import threading
+import document
+from fake_llm import FakeChatModel
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+class SlowStartModel(FakeChatModel):
+    # The intro is the slowest section, and the last endpoint only answers once the intro is on disk
+    def __init__(self, output_path, last_heading):
+        super().__init__()
+        self.output_path = output_path
+        self.last_heading = last_heading
+        self.streamed = threading.Event()
+
+    def invoke(self, prompt, **kwargs):
+        if 'opening sections' in prompt:
+            time.sleep(0.1)
+        elif self.last_heading in prompt:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and not self.streamed.is_set():
+                with open(self.output_path) as file:
+                    if file.read().startswith('# API Documentation'):
+                        self.streamed.set()
+                time.sleep(0.01)
+        return super().invoke(prompt, **kwargs)
+
+def test_sections_are_streamed_in_spec_order(tmp_path, serverless_config):
+    groups = document.group_operations(load_openapi(OPENAPI_PATH))
+    headings = [f"### {method.upper()} {path}" for operations in groups.values() for path, method in operations]
+    output_path = str(tmp_path / 'API_DOCUMENTATION.md')
+    llm = SlowStartModel(output_path, f"level-3 heading: {headings[-1]}\n")
+
+    documentation = document.generate_api_documentation(serverless_config, OPENAPI_PATH, str(tmp_path / 'deploy.json'),
+        llm=llm, output_path=output_path, concurrency=len(headings) + 1, use_cache=False)
+
+    assert llm.streamed.is_set()
+    assert documentation.startswith('# API Documentation')
+    positions = [documentation.index(heading + "\n") for heading in headings]
+    assert positions == sorted(positions)
+    for group, operations in groups.items():
+        path, method = operations[0]
+        assert f"## {group}\n\n### {method.upper()} {path}\n" in documentation
+    with open(output_path) as file:
+        assert file.read().rstrip() == documentation.rstrip()
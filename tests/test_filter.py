@@ -0,0 +1,62 @@
+import filter
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+DOCUMENT = {
+    'openapi': '3.0.0',
+    'info': {'title': 'Shop', 'version': '1'},
+    'tags': [{'name': 'orders'}, {'name': 'admin'}],
+    'paths': {
+        '/orders/{id}': {
+            'parameters': [{'$ref': '#/components/parameters/Id'}],
+            'get': {'tags': ['orders'], 'responses': {'200': {'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Order'}}}}}}
+        },
+        '/audit': {'get': {'tags': ['admin'], 'responses': {'200': {'$ref': '#/components/responses/Audit'}}}}
+    },
+    'components': {
+        'parameters': {'Id': {'name': 'id', 'in': 'path', 'schema': {'$ref': '#/components/schemas/Id'}}},
+        'responses': {'Audit': {'description': 'Audit', 'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Audit'}}}}},
+        'schemas': {
+            'Id': {'type': 'string'},
+            'Order': {'type': 'object', 'properties': {'lines': {'type': 'array', 'items': {'$ref': '#/components/schemas/Line'}},
+                                                        'customer': {'$ref': '#/components/schemas/Customer'}}},
+            'Line': {'type': 'object', 'properties': {'order': {'$ref': '#/components/schemas/Order'}, 'sku': {'$ref': '#/components/schemas/a~1b'}}},
+            'Customer': {'type': 'object'},
+            'a/b': {'type': 'string'},
+            'Audit': {'type': 'object'},
+            'Unused': {'$ref': '#/components/schemas/Order'}
+        },
+        'securitySchemes': {'key': {'type': 'apiKey', 'in': 'header', 'name': 'X-Key'}}
+    }
+}
+
+def test_closure_follows_cycles_and_escaped_names():
+    index = filter.build_ref_index(DOCUMENT)
+    closure = filter.ref_closure(index, {'#/components/schemas/Line'})
+    assert closure == {'#/components/schemas/Line', '#/components/schemas/Order', '#/components/schemas/Customer', '#/components/schemas/a~1b'}
+    assert filter.ref_closure(index, {'#/components/schemas/Missing'}) == set()
+
+def test_filter_by_tag_keeps_only_the_referenced_components():
+    filtered = filter.filter_by_tag(DOCUMENT, 'orders')
+    assert list(filtered['paths']) == ['/orders/{id}']
+    assert filtered['paths']['/orders/{id}']['parameters'] == DOCUMENT['paths']['/orders/{id}']['parameters']
+    assert sorted(filtered['components']['schemas']) == ['Customer', 'Id', 'Line', 'Order', 'a/b']
+    assert list(filtered['components']['parameters']) == ['Id']
+    assert 'responses' not in filtered['components']
+    assert filtered['components']['securitySchemes'] == DOCUMENT['components']['securitySchemes']
+    assert filtered['tags'] == [{'name': 'orders'}]
+    # Unchanged nodes are shared with the original
+    assert filtered['components']['schemas']['Order'] is DOCUMENT['components']['schemas']['Order']
+
+def test_slice_operation_matches_the_tag_filter():
+    sliced = filter.slice_operation(DOCUMENT, '/audit', 'get')
+    assert sliced['components'] == {'responses': DOCUMENT['components']['responses'], 'schemas': {'Audit': {'type': 'object'}}}
+
+def test_sample_spec_slices_are_self_contained():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    index = filter.build_ref_index(openapi_spec)
+    for path, methods in openapi_spec['paths'].items():
+        for method in methods:
+            sliced = filter.slice_operation(openapi_spec, path, method, index)
+            for ref in filter.collect_refs(sliced, set()):
+                assert filter.resolve_ref(sliced, ref) is not None, (path, method, ref)
@@ -0,0 +1,26 @@
+import pytest
+import loadtest
+
+@pytest.mark.parametrize('values, fraction, expected', [
+    (list(range(1, 11)), 0.50, 5),
+    (list(range(1, 11)), 0.95, 10),
+    (list(range(1, 11)), 0.99, 10),
+    (list(range(1, 11)), 0.10, 1),
+    (list(range(1, 101)), 0.50, 50),
+    (list(range(1, 101)), 0.95, 95),
+    (list(range(1, 101)), 0.99, 99),
+    (list(range(1, 101)), 1.00, 100),
+    (list(range(1, 101)), 0.07, 7),
+    (list(range(1, 1001)), 0.999, 999),
+    ([7], 0.50, 7),
+    ([7], 0.99, 7),
+])
+def test_percentile_is_nearest_rank(values, fraction, expected):
+    assert loadtest.percentile(values, fraction) == expected
+
+def test_summarize_reports_percentiles_per_operation():
+    samples = [('get_users', latency * 1_000_000, 200) for latency in range(1, 101)] + [('post_users', 5_000_000, 500)]
+    rows = {row['operation']: row for row in loadtest.summarize(samples, wall_time=1.0)}
+    assert (rows['get_users']['p50_ms'], rows['get_users']['p95_ms'], rows['get_users']['p99_ms']) == (50.0, 95.0, 99.0)
+    assert rows['post_users']['errors'] == 1
+    assert rows['TOTAL']['requests'] == 101
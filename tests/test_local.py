@@ -0,0 +1,42 @@
+import json
+import base64
+import local
+from router import Router
+
+def route(handler, template='/users/{userId}'):
+    router = Router()
+    router.add('GET', template, ('get_user', handler))
+    return router
+
+def test_event_and_response(monkeypatch):
+    events = []
+
+    def handler(event, context):
+        events.append(event)
+        return {'statusCode': 201, 'headers': {'X-Id': 7}, 'multiValueHeaders': {'Set-Cookie': ['a=1', 'b=2']}, 'body': '{"ok": true}'}
+
+    status, headers, payload = local.dispatch(route(handler), 'GET', '/users/ada%20l?expand=plan&expand=team', {'Accept': 'application/json'}, b'')
+    assert (status, headers, json.loads(payload)) == (201, {'X-Id': '7', 'Set-Cookie': 'a=1, b=2'}, {'ok': True})
+    event = events[0]
+    assert event['pathParameters'] == {'userId': 'ada l'}
+    assert event['resource'] == '/users/{userId}'
+    assert event['queryStringParameters'] == {'expand': 'team'}
+    assert event['multiValueQueryStringParameters'] == {'expand': ['plan', 'team']}
+
+def test_base64_body():
+    handler = lambda event, context: {'statusCode': 200, 'body': base64.b64encode(b'\x89PNG').decode(), 'isBase64Encoded': True}
+    assert local.dispatch(route(handler), 'GET', '/users/1', {}, b'')[2] == b'\x89PNG'
+
+def test_failing_handlers_answer_502():
+    def raising(event, context):
+        raise KeyError('body')
+
+    for handler in (raising, lambda event, context: None, lambda event, context: 'ok', lambda event, context: [200]):
+        status, _, payload = local.dispatch(route(handler), 'GET', '/users/1', {}, b'')
+        assert status == 502
+        assert json.loads(payload) == {'message': 'Internal server error'}
+
+def test_unknown_routes():
+    router = route(lambda event, context: {'statusCode': 200})
+    assert local.dispatch(router, 'GET', '/plans', {}, b'')[0] == 404
+    assert local.dispatch(router, 'POST', '/users/1', {}, b'')[0] == 405
@@ -0,0 +1,76 @@
+import os
+import copy
+import shutil
+import pytest
+import main
+import spec
+import manifest
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def plans(tmp_path, monkeypatch):
+    # Runs dry builds in a scratch directory and records the manifests they would compare
+    shutil.copytree(os.path.join(ROOT, 'input'), tmp_path / 'input', ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.chdir(tmp_path)
+    recorded = []
+    monkeypatch.setattr(main, 'print_plan', lambda openapi_content, previous, current, diff, force, engine: recorded.append((current, diff)))
+    return recorded
+
+def plan(plans, **options):
+    main.main('input/openapi.yml', dry_run=True, **options)
+    return plans[-1]
+
+def test_unchanged_options_need_no_rebuild(plans):
+    current, _ = plan(plans, mode='functions')
+    manifest.save_manifest(current)
+    _, diff = plan(plans, mode='functions')
+    assert not manifest.has_changes(diff)
+
+@pytest.mark.parametrize('options', [{'mode': 'monolith'}, {'stateful': True}, {'memoize': True}, {'profile': 'minimal'}])
+def test_changed_option_rebuilds_every_operation(plans, options):
+    current, _ = plan(plans, mode='functions')
+    manifest.save_manifest(current)
+    _, diff = plan(plans, **dict({'mode': 'functions'}, **options))
+    assert sorted(diff['changed']) == sorted(current['operations'])
+    assert diff['added'] == diff['removed'] == []
+
+def test_stateful_functions_deploy_is_rejected(plans):
+    with pytest.raises(SystemExit):
+        main.main('input/openapi.yml', stateful=True, mode='functions')
+
+def build(openapi_spec):
+    return manifest.build_manifest(openapi_spec, spec.extract_api_functions(openapi_spec))
+
+def test_schema_change_only_changes_the_operations_that_reference_it():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    previous = build(openapi_spec)
+    changed = copy.deepcopy(openapi_spec)
+    changed['components']['schemas']['Plan']['properties']['price'] = {'type': 'number'}
+    diff = manifest.diff_manifests(previous, build(changed))
+    assert diff['changed'] == ['GET /plans -']
+    assert diff['added'] == diff['removed'] == []
+    assert len(diff['unchanged']) == len(previous['operations']) - 1
+
+def test_added_removed_and_service_changes():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    previous = build(openapi_spec)
+    changed = copy.deepcopy(openapi_spec)
+    del changed['paths']['/plans']
+    changed['paths']['/health'] = {'get': {'responses': {'200': {'description': 'OK'}}}}
+    diff = manifest.diff_manifests(previous, build(changed))
+    assert (diff['added'], diff['removed'], diff['changed']) == (['GET /health -'], ['GET /plans -'], [])
+
+    changed['info'] = dict(changed['info'], title='Renamed')
+    diff = manifest.diff_manifests(previous, build(changed))
+    assert sorted(diff['changed']) == sorted(key for key in previous['operations'] if key != 'GET /plans -')
+
+def test_unchanged_build_skips_generation(plans, monkeypatch):
+    current, _ = plan(plans)
+    manifest.save_manifest(current)
+    with open('deploy/api.yml', 'w') as file:
+        file.write('service: unchanged\n')
+    monkeypatch.setattr(spec, 'generate_serverless_config', lambda *args, **kwargs: pytest.fail("generated an unchanged build"))
+    main.main('input/openapi.yml')
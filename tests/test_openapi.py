@@ -0,0 +1,44 @@
+import openapi
+
+SPEC = """openapi: 3.0.0
+info:
+  title: Dates
+  version: 1.0.0
+paths:
+  /events:
+    parameters:
+      - name: since
+        in: query
+    get:
+      responses:
+        200:
+          description: OK
+          content:
+            application/json:
+              example:
+                at: 2024-01-02
+        default:
+          description: Error
+    x-internal: true
+"""
+
+def test_keys_are_strings_and_dates_stay_strings(tmp_path):
+    path = tmp_path / 'openapi.yml'
+    path.write_text(SPEC)
+    document = openapi.load_openapi(str(path))
+    responses = document['paths']['/events']['get']['responses']
+    assert list(responses) == ['200', 'default']
+    assert responses['200']['content']['application/json']['example'] == {'at': '2024-01-02'}
+
+def test_documents_are_parsed_once_per_content(tmp_path):
+    first, second = tmp_path / 'first.yml', tmp_path / 'second.yml'
+    first.write_text(SPEC)
+    second.write_text(SPEC)
+    assert openapi.load_openapi(str(first)) is openapi.load_openapi(str(second))
+    first.write_text(SPEC.replace('Dates', 'Events'))
+    assert openapi.load_openapi(str(first))['info']['title'] == 'Events'
+
+def test_iter_operations_skips_path_level_keys(tmp_path):
+    path = tmp_path / 'openapi.yml'
+    path.write_text(SPEC)
+    assert [(operation_path, method) for operation_path, method, _ in openapi.iter_operations(openapi.load_openapi(str(path)))] == [('/events', 'get')]
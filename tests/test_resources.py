@@ -0,0 +1,49 @@
+import json
+import importlib.util
+import pytest
+import implement
+import resources
+import state
+from openapi import load_openapi
+from conftest import OPENAPI_PATH, EXAMPLE_HANDLER_PATH
+
+@pytest.fixture
+def handlers(tmp_path, serverless_config, monkeypatch):
+    # Stateful handlers for the sample spec, sharing fresh in-memory tables
+    monkeypatch.setattr(state, '_tables', {})
+    implement.generate_handlers(serverless_config, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'), stateful=True)
+
+    def load(function_name):
+        module_spec = importlib.util.spec_from_file_location(f"handler_{function_name}", tmp_path / 'handlers' / f"{function_name}.py")
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        return module.handler
+    return load
+
+def invoke(handler, method, path, body=None, path_parameters=None, query_parameters=None):
+    event = {'httpMethod': method, 'path': path, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(body) if body is not None else None,
+             'pathParameters': path_parameters, 'queryStringParameters': query_parameters}
+    response = handler(event, None)
+    return response['statusCode'], json.loads(response['body']) if response['body'] else None
+
+def test_wrapped_list_is_served_from_the_table():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    tables = resources.resource_tables(openapi_spec, stateful=True)
+    kind, table = resources.state_operation(openapi_spec, '/users', 'get', tables)
+    assert (kind, table['list_property']) == ('list', 'data')
+    assert 'list_property' not in tables['/users']
+
+def test_created_users_are_listed(handlers):
+    create, list_users, read = handlers('post_users'), handlers('get_users'), handlers('get_users_user_id')
+    status, created = invoke(create, 'POST', '/users', {'username': 'ada', 'email': 'ada@example.com'})
+    assert status == 201 and created['id'] == 1
+    invoke(create, 'POST', '/users', {'username': 'grace', 'email': 'grace@example.com'})
+
+    status, listed = invoke(list_users, 'GET', '/users')
+    assert status == 200
+    assert [user['username'] for user in listed['data']] == ['ada', 'grace']
+    # The rest of the wrapper comes from the example response
+    assert 'pagination' in listed
+
+    status, user = invoke(read, 'GET', '/users/1', path_parameters={'userId': '1'})
+    assert (status, user['username']) == (200, 'ada')
@@ -0,0 +1,29 @@
+import pytest
+from router import Router
+
+@pytest.fixture
+def router():
+    router = Router()
+    for method, template in [('GET', '/users'), ('GET', '/users/me'), ('GET', '/users/{id}'), ('DELETE', '/users/{userId}'),
+                             ('GET', '/users/{name}/posts'), ('ANY', '/files/{proxy+}'), ('GET', '/files/readme')]:
+        router.add(method, template, f"{method} {template}")
+    return router
+
+def test_static_segments_win_over_parameters(router):
+    assert router.match('GET', '/users/me')[0] == 'GET /users/me'
+    assert router.match('GET', '/users/42')[:3] == ('GET /users/{id}', {'id': '42'}, '/users/{id}')
+    assert router.match('GET', '/files/readme')[0] == 'GET /files/readme'
+
+def test_parameter_names_belong_to_each_route(router):
+    assert router.match('DELETE', '/users/42')[1] == {'userId': '42'}
+    assert router.match('GET', '/users/ada/posts')[1] == {'name': 'ada'}
+
+def test_parameters_are_decoded(router):
+    assert router.match('GET', '/users/ada%20lovelace')[1] == {'id': 'ada lovelace'}
+    assert router.match('GET', '/users/a%2Fb')[1] == {'id': 'a/b'}
+    assert router.match('PUT', '/files/docs/read%20me.md')[:2] == ('ANY /files/{proxy+}', {'proxy': 'docs/read me.md'})
+
+def test_unknown_paths_and_methods(router):
+    assert router.match('POST', '/users/42') == (None, {}, None, True)
+    assert router.match('GET', '/plans') == (None, {}, None, False)
+    assert router.match('GET', '/users/42/comments') == (None, {}, None, False)
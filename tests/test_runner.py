@@ -0,0 +1,25 @@
+import sys
+import pytest
+import runner
+
+def test_step_returns_its_result():
+    assert runner.start_step(lambda value: value * 2, 21).wait() == 42
+
+def test_step_raises_its_exception():
+    def fail():
+        raise OSError('npm not found')
+
+    step = runner.start_step(fail)
+    with pytest.raises(OSError, match='npm not found'):
+        step.wait()
+
+def test_run_step_records_output_and_status(tmp_path):
+    runner.reset()
+    log_path = tmp_path / 'step.log'
+    result = runner.run_step('echo', [sys.executable, '-c', 'print("one"); print("two"); raise SystemExit(3)'], log_path=str(log_path), echo=False)
+    assert (result.returncode, result.ok) == (3, False)
+    assert result.output == ['one\n', 'two\n']
+    assert log_path.read_text() == 'one\ntwo\n'
+    assert runner.run_step('missing', ['/nonexistent/serverless'], echo=False).returncode == 127
+    assert [timing.name for timing in runner.timings] == ['echo', 'missing']
+    runner.reset()
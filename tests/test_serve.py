@@ -0,0 +1,55 @@
+import threading
+import http.client
+import pytest
+import serve
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    documentation = tmp_path / 'API_DOCUMENTATION.md'
+    documentation.write_text("# API\n\nSome documentation.\n" * 50)
+    monkeypatch.setattr(serve, 'DOCUMENTATION_FILE', str(documentation))
+    monkeypatch.setattr(serve.DocumentationHandler, 'quiet', True)
+    httpd = serve.DocumentationServer(('127.0.0.1', 0), serve.DocumentationHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(port, headers):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    connection.request('GET', '/', headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response
+
+
+def test_each_encoding_has_its_own_etag(server):
+    identity = get(server, {'Accept-Encoding': 'identity'})
+    gzipped = get(server, {'Accept-Encoding': 'gzip'})
+    assert identity.getheader('Content-Encoding') is None
+    assert gzipped.getheader('Content-Encoding') == 'gzip'
+    assert identity.getheader('ETag') != gzipped.getheader('ETag')
+
+
+def test_conditional_request_matches_the_negotiated_encoding(server):
+    gzip_etag = get(server, {'Accept-Encoding': 'gzip'}).getheader('ETag')
+
+    revalidated = get(server, {'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+    assert revalidated.status == 304
+    assert revalidated.getheader('ETag') == gzip_etag
+
+    # The gzip validator does not match the identity representation
+    assert get(server, {'Accept-Encoding': 'identity', 'If-None-Match': gzip_etag}).status == 200
+
+
+def test_requests_are_logged_unless_quiet(server, capsys, monkeypatch):
+    get(server, {})
+    assert 'GET / ' not in capsys.readouterr().err
+
+    monkeypatch.setattr(serve.DocumentationHandler, 'quiet', False)
+    get(server, {})
+    assert 'GET / ' in capsys.readouterr().err
@@ -0,0 +1,54 @@
+import os
+import cache
+import main
+import runner
+import shard
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+def fake_build(input_path, **options):
+    with runner.timed_step("implement"):
+        pass
+    runner.print_timings()
+
+def test_each_shard_logs_only_its_own_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'main', fake_build)
+    monkeypatch.setattr(cache, 'CACHE_DIR', cache.CACHE_DIR)
+    monkeypatch.chdir(tmp_path)
+    for name in ('users', 'plans'):
+        (tmp_path / name).mkdir()
+        assert shard.build_shard((name, str(tmp_path / name), str(tmp_path / 'cache'), {}))[1] is None
+
+    log = (tmp_path / 'plans' / 'build.log').read_text()
+    assert log.count('implement') == 1
+    assert len(runner.timings) == 1
+
+def test_shards_share_the_parent_cache(tmp_path, monkeypatch):
+    # The default cache directory is relative, so a build in a fresh directory gets a fresh cache
+    monkeypatch.setattr(cache, 'CACHE_DIR', cache.CACHE_DIR)
+    monkeypatch.setattr(main, 'main', lambda input_path, **options: cache.put('key', os.getcwd()))
+    monkeypatch.chdir(tmp_path)
+    assert not os.path.isabs(cache.CACHE_DIR)
+    (tmp_path / 'shards' / 'users').mkdir(parents=True)
+    shard.build_shard(('users', str(tmp_path / 'shards' / 'users'), str(tmp_path / '.cache'), {}))
+    assert cache.get('key', str(tmp_path / '.cache')) == str(tmp_path / 'shards' / 'users')
+
+def test_plan_by_tag_splits_oversized_tags_by_path():
+    openapi_spec = {'paths': {
+        '/users': {'get': {'tags': ['Users & Teams']}, 'post': {'tags': ['Users & Teams']}},
+        '/users/{id}': {'get': {'tags': ['Users & Teams']}, 'delete': {'tags': ['Users & Teams']}},
+        '/health': {'get': {}}
+    }}
+    shards = shard.plan_shards(openapi_spec, 'tag', max_operations=3)
+    assert list(shards) == ['users-teams-1', 'users-teams-2', 'health']
+    assert shards['users-teams-1'] == [('/users', 'get'), ('/users', 'post')]
+    assert shards['users-teams-2'] == [('/users/{id}', 'get'), ('/users/{id}', 'delete')]
+
+def test_plan_by_size_covers_every_operation_once():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    shards = shard.plan_shards(openapi_spec, 'size', max_operations=3)
+    operations = [operation for chunk in shards.values() for operation in chunk]
+    assert sorted(operations) == sorted((path, method) for path, method, _ in shard.iter_operations(openapi_spec))
+    assert all(len(chunk) <= 3 for chunk in shards.values())
+    # A path larger than the budget still stays in one shard
+    assert shard.split_by_size([('/a', 'get'), ('/a', 'put'), ('/a', 'post')], 2) == [[('/a', 'get'), ('/a', 'put'), ('/a', 'post')]]
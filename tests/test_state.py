@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import state
+
+SPEC = {'name': 'users', 'key': 'id', 'key_type': 'integer', 'indexes': ['status']}
+
+def sqlite_tables(tmp_path, count):
+    # Separate connections to one database, as in separate processes
+    return [state.SqliteTable('users', 'id', ['status'], str(tmp_path / 'state.db')) for _ in range(count)]
+
+def test_concurrent_creates_get_distinct_keys(tmp_path):
+    tables = sqlite_tables(tmp_path, 4)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        created = list(executor.map(lambda number: state.create_item(tables[number % 4], SPEC, {'status': 'active'}), range(200)))
+    assert sorted(item['id'] for item in created) == list(range(1, 201))
+    assert tables[0].item_count() == 200
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_create_does_not_replace_an_item(tmp_path, backend):
+    table = state.MemoryTable('users', 'id', ['status']) if backend == 'memory' else sqlite_tables(tmp_path, 1)[0]
+    assert state.create_item(table, SPEC, {'name': 'first'}) == {'name': 'first', 'id': 1}
+    with pytest.raises(state.ItemExists):
+        state.create_item(table, SPEC, {'id': 1, 'name': 'second'})
+    assert table.get_item(Key={'id': 1})['Item']['name'] == 'first'
+    assert state.create_item(table, SPEC, {'id': 7})['id'] == 7
+    assert state.create_item(table, SPEC, {})['id'] == 8
+
+def test_uuid_keys(tmp_path):
+    table = state.MemoryTable('plans', 'code', [])
+    item = state.create_item(table, {'name': 'plans', 'key': 'code', 'key_type': 'string'}, {'name': 'basic'})
+    assert len(item['code']) == 36
+    assert table.get_item(Key={'code': item['code']})['Item'] == item
+
+def make_table(tmp_path, backend):
+    return state.MemoryTable('users', 'id', ['status', 'role']) if backend == 'memory' else state.SqliteTable('users', 'id', ['status', 'role'], str(tmp_path / 'state.db'))
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_list_filters_apply_before_paging(tmp_path, backend):
+    table = make_table(tmp_path, backend)
+    table_spec = dict(SPEC, indexes=['status', 'role'])
+    for number in range(1, 31):
+        table.put_item(Item={'id': number, 'status': 'active', 'role': 'admin' if number % 10 == 0 else 'user'})
+    items, cursor = state.list_page(table, table_spec, {'status': 'active', 'role': 'admin', 'limit': '2'})
+    assert [item['id'] for item in items] == [10, 20]
+    items, cursor = state.list_page(table, table_spec, {'status': 'active', 'role': 'admin', 'limit': '2', 'cursor': cursor})
+    assert [item['id'] for item in items] == [30]
+    assert cursor is None
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_client_key_is_stored_as_parsed(tmp_path, backend):
+    table = make_table(tmp_path, backend)
+    assert state.create_item(table, SPEC, {'id': '5', 'status': 'active'})['id'] == 5
+    assert table.get_item(Key=state.parse_key(SPEC, '5'))['Item']['status'] == 'active'
+
+def test_concurrent_deletes_return_the_item_once(tmp_path):
+    tables = sqlite_tables(tmp_path, 4)
+    for number in range(1, 51):
+        tables[0].put_item(Item={'id': number})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        deleted = list(executor.map(lambda number: tables[number % 4].delete_item(Key={'id': number % 50 + 1}, ReturnValues='ALL_OLD'), range(200)))
+    assert sorted(result['Attributes']['id'] for result in deleted if result) == list(range(1, 51))
+    assert tables[0].item_count() == 0
@@ -0,0 +1,56 @@
+import random
+import synth
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+USER = {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'email': {'type': 'string', 'format': 'email'}}}
+DOCUMENT = {'components': {'schemas': {'User': USER}}}
+
+def test_items_sizes_a_top_level_array():
+    payload = synth.generate({'type': 'array', 'items': {'$ref': '#/components/schemas/User'}}, DOCUMENT, items=250)
+    assert len(payload) == 250
+    assert set(payload[0]) == {'id', 'email'}
+
+def test_items_sizes_the_array_of_a_wrapped_list():
+    schema = {'type': 'object', 'properties': {
+        'data': {'type': 'array', 'items': {'$ref': '#/components/schemas/User'}},
+        'pagination': {'type': 'object', 'properties': {'totalItems': {'type': 'integer'}}}
+    }}
+    payload = synth.generate(schema, DOCUMENT, items=250)
+    assert len(payload['data']) == 250
+    assert set(payload['data'][0]) == {'id', 'email'}
+    assert 'totalItems' in payload['pagination']
+
+def test_list_property():
+    two_arrays = {'type': 'object', 'properties': {'tags': {'type': 'array', 'items': {}}, 'results': {'type': 'array', 'items': {}}}}
+    assert synth.list_property(two_arrays) == 'results'
+    assert synth.list_property({'type': 'object', 'properties': {'a': {'type': 'array'}, 'b': {'type': 'array'}}}) is None
+    assert synth.list_property({'type': 'array', 'items': USER}) is None
+    assert synth.list_property(USER) is None
+
+def test_list_property_of_the_sample_spec():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    schema = openapi_spec['paths']['/users']['get']['responses']['200']['content']['application/json']['schema']
+    assert synth.list_property(schema, openapi_spec) == 'data'
+    assert synth.list_items_schema(schema, openapi_spec) == {'$ref': '#/components/schemas/User'}
+
+def column(schema, n=2000):
+    return synth.compile_schema(schema)(random.Random(1), n)
+
+def test_integers_within_int64_bounds():
+    values = column({'type': 'integer', 'format': 'int64', 'minimum': -2 ** 63, 'maximum': 2 ** 63 - 1, 'multipleOf': 1000})
+    assert all(-2 ** 63 <= value < 2 ** 63 and value % 1000 == 0 for value in values)
+    assert len(set(values)) == len(values)
+
+def test_integer_multiples():
+    assert set(column({'type': 'integer', 'minimum': 1, 'maximum': 20, 'multipleOf': 5})) == {5, 10, 15, 20}
+    assert set(column({'type': 'integer', 'minimum': 11, 'maximum': 14, 'multipleOf': 5})) == {15}
+    assert set(column({'type': 'integer', 'minimum': 0, 'maximum': 10, 'exclusiveMinimum': True, 'exclusiveMaximum': True})) == set(range(1, 10))
+
+def test_number_multiples_and_exclusive_bounds():
+    values = column({'type': 'number', 'exclusiveMinimum': 0, 'exclusiveMaximum': 1, 'multipleOf': 0.25})
+    assert set(values) == {0.25, 0.5, 0.75}
+    values = column({'type': 'number', 'minimum': 0, 'maximum': 0.05, 'exclusiveMinimum': True, 'exclusiveMaximum': True})
+    assert set(values) == {0.01, 0.02, 0.03, 0.04}
+    assert 0 < column({'type': 'number', 'exclusiveMinimum': 0, 'exclusiveMaximum': 0.001}, 1)[0] < 0.001
+    assert all(-1005 <= value <= -5 for value in column({'type': 'number', 'maximum': -5}))
@@ -0,0 +1,66 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import spec
+import runner
+import implement
+import telemetry
+from fake_llm import FakeChatModel
+from openapi import load_openapi
+from conftest import ROOT, OPENAPI_PATH, EXAMPLE_HANDLER_PATH
+
+@pytest.fixture(autouse=True)
+def clean_spans():
+    telemetry.reset()
+    runner.reset()
+    yield
+    telemetry.reset()
+    runner.reset()
+
+def by_id():
+    return {record.span_id: record for record in telemetry.spans}
+
+def test_overlapping_stages_parent_their_own_workers():
+    started = threading.Barrier(2)
+
+    def work(name):
+        with telemetry.span('work', stage_name=name):
+            pass
+
+    def run_stage(name, executor):
+        with telemetry.stage(name):
+            started.wait()
+            list(executor.map(telemetry.in_context(work), [name] * 20))
+
+    with ThreadPoolExecutor(max_workers=4) as executor, ThreadPoolExecutor(max_workers=2) as stages:
+        list(stages.map(lambda name: run_stage(name, executor), ['spec', 'document']))
+
+    spans = by_id()
+    work_spans = [record for record in telemetry.spans if record.name == 'work']
+    assert len(work_spans) == 40
+    assert all(spans[record.parent_id].name == record.attributes['stage_name'] for record in work_spans)
+
+def test_pipeline_spans_nest_under_their_stage(tmp_path, monkeypatch, serverless_config):
+    shutil.copytree(os.path.join(ROOT, 'input'), tmp_path / 'input', ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.chdir(tmp_path)
+    llm = FakeChatModel()
+    with runner.timed_step('spec'):
+        spec.generate_serverless_config('input/openapi.yml', concurrency=4, llm=llm, use_cache=False)
+    with runner.timed_step('implement'):
+        implement.generate_handlers(serverless_config, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'),
+            concurrency=4, llm=llm, use_cache=False, engine='llm')
+
+    spans = by_id()
+    stage_of = lambda record: stage_of(spans[record.parent_id]) if record.parent_id else record.name
+    handlers = [record for record in telemetry.spans if record.name == 'handler']
+    calls = [record for record in telemetry.spans if record.name == 'llm.invoke']
+    assert len(handlers) == len(spec.extract_api_functions(load_openapi(OPENAPI_PATH)))
+    assert all(spans[record.parent_id].name == 'implement' for record in handlers)
+    assert all(spans[call.parent_id].name == 'handler' for call in calls if stage_of(call) == 'implement')
+    assert {stage_of(call) for call in calls} == {'spec', 'implement'}
+
+    report = telemetry.build_report()
+    assert [entry['name'] for entry in report['stages']] == ['spec', 'implement']
+    assert sum(entry['llm_calls'] for entry in report['stages']) == report['totals']['llm_calls'] == llm.calls
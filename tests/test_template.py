@@ -0,0 +1,115 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import template
+import response_cache
+from openapi import load_openapi
+from conftest import OPENAPI_PATH
+
+def load_handler(path, method, **options):
+    namespace = {}
+    exec(template.render_handler('handler', path, method, load_openapi(OPENAPI_PATH), **options), namespace)
+    return namespace
+
+def event(method, path, path_parameters=None, body=None):
+    return {'httpMethod': method, 'path': path, 'headers': {}, 'body': body, 'pathParameters': path_parameters, 'queryStringParameters': None}
+
+def test_rendering_is_deterministic():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    source = template.render_handler('handler', '/users/{userId}', 'get', openapi_spec)
+    assert source == template.render_handler('handler', '/users/{userId}', 'get', load_openapi(OPENAPI_PATH))
+    compile(source, 'handler.py', 'exec')
+
+def test_responses_come_from_the_spec_examples():
+    openapi_spec = load_openapi(OPENAPI_PATH)
+    response = load_handler('/plans', 'get')['handler'](event('GET', '/plans'), None)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == openapi_spec['paths']['/plans']['get']['responses']['200']['content']['application/json']['example']
+
+    create = load_handler('/users', 'post')['handler']
+    assert create(event('POST', '/users', body='{"username": "new_user"}'), None)['statusCode'] == 201
+    assert load_handler('/users/{userId}', 'delete')['handler'](event('DELETE', '/users/1', {'userId': '1'}), None) == \
+        {'statusCode': 204, 'headers': {'Content-Type': 'application/json'}, 'body': ''}
+
+def test_request_checks():
+    create = load_handler('/users', 'post')['handler']
+    assert create(event('GET', '/users'), None)['statusCode'] == 405
+    assert create(event('POST', '/users'), None)['statusCode'] == 400
+    assert create(event('POST', '/users', body='{not json'), None)['statusCode'] == 400
+    missing = load_handler('/users/{userId}', 'get')['handler'](event('GET', '/users/1'), None)
+    assert missing['statusCode'] == 400
+
+def test_example_from_schema():
+    openapi_spec = {'components': {'schemas': {'Status': {'type': 'string', 'enum': ['active', 'disabled']}}}}
+    schema = {'type': 'object', 'properties': {
+        'id': {'type': 'integer', 'minimum': 10},
+        'email': {'type': 'string', 'format': 'email'},
+        'status': {'$ref': '#/components/schemas/Status'},
+        'tags': {'type': 'array', 'items': {'type': 'string'}, 'minItems': 2},
+        'name': {'type': 'string', 'example': 'Ada'}
+    }}
+    example = template.example_from_schema(schema, openapi_spec)
+    assert example['id'] == 10 and example['status'] == 'active' and example['name'] == 'Ada'
+    assert example['email'] == template.FORMAT_EXAMPLES['email']
+    assert example['tags'] == ['string', 'string']
+    assert template.select_success_status({'404': {}, '204': {}, '201': {}}) == (201, '201')
+    assert template.select_success_status({'default': {}}) == (200, 'default')
+
+@pytest.mark.parametrize('memoize', [False, True])
+def test_success_responses_are_not_shared(memoize):
+    handler = load_handler('/plans', 'get', memoize=memoize)['handler']
+    first = handler(event('GET', '/plans'), None)
+    first['headers']['X-Request-Id'] = 'abc'
+    first['statusCode'] = 500
+
+    second = handler(event('GET', '/plans'), None)
+    assert second['statusCode'] == 200
+    assert 'X-Request-Id' not in second['headers']
+    assert second['body'] == first['body']
+
+def test_memoized_error_responses_are_not_shared():
+    namespace = load_handler('/users/{userId}', 'get', memoize=True)
+    first = namespace['handler'](event('GET', '/users/1'), None)
+    assert first['statusCode'] == 400
+    first['headers']['Access-Control-Allow-Origin'] = '*'
+
+    second = namespace['handler'](event('GET', '/users/1'), None)
+    assert second['headers'] == {'Content-Type': 'application/json'}
+    assert json.loads(second['body']) == json.loads(first['body'])
+    # The body is still serialized only once
+    assert namespace['error_response'].__wrapped__.cache_info().hits == 1
+
+def test_response_cache_returns_copies():
+    calls = []
+
+    def handler(event, context):
+        calls.append(event)
+        return {'statusCode': 200, 'headers': {'Content-Type': 'application/json'}, 'body': '{}'}
+
+    memoized = response_cache.memoize_responses(handler)
+    first = memoized(event('GET', '/plans'), None)
+    first['headers']['Set-Cookie'] = 'session=1'
+    second = memoized(event('GET', '/plans'), None)
+    third = memoized(event('GET', '/plans'), None)
+
+    assert len(calls) == 1
+    assert second == {'statusCode': 200, 'headers': {'Content-Type': 'application/json'}, 'body': '{}'}
+    assert second is not third and second['headers'] is not third['headers']
+
+def test_response_cache_keeps_only_successful_responses():
+    statuses = [404, 500, 200, 404]
+
+    def handler(event, context):
+        return {'statusCode': statuses.pop(0), 'headers': {}, 'body': '{}'}
+
+    memoized = response_cache.memoize_responses(handler)
+    assert [memoized(event('GET', '/users/1'), None)['statusCode'] for _ in range(4)] == [404, 500, 200, 200]
+    assert statuses == [404]
+
+def test_response_cache_is_thread_safe():
+    handler = lambda event, context: {'statusCode': 200, 'headers': {}, 'body': event['path']}
+    memoized = response_cache.memoize_responses(handler, max_responses=8)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        bodies = list(executor.map(lambda number: memoized(event('GET', f"/users/{number % 20}", {'userId': str(number % 20)}), None)['body'], range(2000)))
+    assert bodies == [f"/users/{number % 20}" for number in range(2000)]
+    assert len(memoized.responses) == 8
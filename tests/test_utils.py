@@ -0,0 +1,41 @@
+import pytest
+import utils
+
+class FlakyModel:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'content': 'ok'}
+
+class APIStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(utils.time, 'sleep', lambda seconds: None)
+
+@pytest.mark.parametrize('error', [TypeError('bad argument'), KeyError('content'), APIStatusError(400), APIStatusError(401)])
+def test_non_retryable_error_is_raised_after_one_call(error):
+    model = FlakyModel([error])
+    with pytest.raises(type(error)):
+        utils.invoke_with_retry(model, 'prompt')
+    assert model.calls == 1
+
+@pytest.mark.parametrize('error', [APIStatusError(429), APIStatusError(529), APIStatusError(503), ConnectionError('reset'), TimeoutError()])
+def test_transient_errors_are_retried(error):
+    model = FlakyModel([error, error])
+    assert utils.invoke_with_retry(model, 'prompt') == {'content': 'ok'}
+    assert model.calls == 3
+
+def test_gives_up_after_the_retries():
+    model = FlakyModel([APIStatusError(500)] * 3)
+    with pytest.raises(APIStatusError):
+        utils.invoke_with_retry(model, 'prompt', retries=2)
+    assert model.calls == 3
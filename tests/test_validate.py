@@ -0,0 +1,46 @@
+import implement
+import state
+from fake_llm import FakeChatModel, FakeMessage
+from conftest import OPENAPI_PATH, EXAMPLE_HANDLER_PATH
+
+BROKEN_HANDLER = '''```python
+def handler(event, context):
+    return None
+```'''
+
+class FlakyHandlerModel(FakeChatModel):
+    # The first handler written for get_plans returns nothing, the regenerated one is valid
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if "function 'get_plans'" in prompt and len([entry for entry in self.prompts if "function 'get_plans'" in entry]) == 1:
+            self.record_call(prompt)
+            return FakeMessage(BROKEN_HANDLER)
+        return super().invoke(prompt, **kwargs)
+
+def test_failed_llm_handler_is_regenerated_with_the_error(tmp_path, serverless_config):
+    llm = FlakyHandlerModel()
+    failures = implement.generate_handlers(serverless_config, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'),
+        llm=llm, use_cache=False, engine='llm', validate=True)
+    assert failures == {}
+    retries = [prompt for prompt in llm.prompts if 'failed validation before deployment' in prompt]
+    assert len(retries) == 1
+    assert "function 'get_plans'" in retries[0] and 'handler returned NoneType' in retries[0]
+    assert 'plans processed successfully' in (tmp_path / 'handlers' / 'get_plans.py').read_text()
+
+def test_template_handler_failures_are_not_retried(tmp_path, serverless_config, monkeypatch):
+    monkeypatch.setattr(implement, 'validate_handlers', lambda config, spec, handlers_dir, only: {'get_plans': 'raised KeyError()'})
+    failures = implement.generate_handlers(serverless_config, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'), validate=True)
+    assert failures == {'get_plans': 'failed validation: raised KeyError()'}
+
+def test_validation_keeps_state_in_memory(tmp_path, serverless_config, monkeypatch):
+    database = tmp_path / 'state.db'
+    monkeypatch.setenv('MOCKTHIS_STATE', f'sqlite:{database}')
+    monkeypatch.setattr(state, 'STATE_BACKEND', f'sqlite:{database}')
+    failures = implement.generate_handlers(serverless_config, OPENAPI_PATH, EXAMPLE_HANDLER_PATH, str(tmp_path / 'handlers'),
+        validate=True, stateful=True)
+    assert failures == {}
+    assert not database.exists()
@@ -1,4 +1,8 @@
 import re
+import json
+import time
+import random
+import telemetry
 
 def to_snake_case(string):
     # Step 1: Replace any non-alphanumeric characters with underscores
@@ -14,4 +18,72 @@ def to_snake_case(string):
     s4 = re.sub(r'_+', '_', s3)
     
     # Step 5: Remove leading and trailing underscores
-    return s4.strip('_')
\ No newline at end of file
+    return s4.strip('_')
+
+def estimate_tokens(text):
+    # Rough token count for prompt budgeting, about four characters per token
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    # Anthropic surfaces rate limits as 429 and overload as 529
+    status_code = getattr(error, 'status_code', None)
+    if status_code in (429, 529):
+        return True
+    return 'RateLimit' in type(error).__name__ or 'Overloaded' in type(error).__name__
+
+
+def is_transient_error(error):
+    # Worth retrying: rate limits, overload and server errors, and network failures. Anything else
+    # (auth, validation, bugs in the calling code) fails the same way on every attempt
+    if is_rate_limit_error(error) or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code >= 500 or status_code == 408
+    name = type(error).__name__
+    return any(marker in name for marker in ('Timeout', 'Connection', 'InternalServer', 'ServiceUnavailable'))
+
+
+def retry_after_seconds(error):
+    # Honor the Retry-After header when the API client exposes the response
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def record_usage(span, prompt, response):
+    # Token counts reported by the API when available, estimated from the text otherwise
+    usage = getattr(response, 'usage_metadata', None) or {}
+    content = getattr(response, 'content', None)
+    if content is None:
+        content = json.dumps(response, default=str)
+    span.set('llm.prompt_tokens', usage.get('input_tokens') or estimate_tokens(prompt))
+    span.set('llm.completion_tokens', usage.get('output_tokens') or estimate_tokens(str(content)))
+
+
+def invoke_with_retry(runnable, prompt, retries=5, base_delay=1.0, max_delay=60.0, operation=None, **kwargs):
+    # Invoke a model, backing off exponentially (with jitter) on rate limits and transient errors;
+    # other errors are raised on the first attempt
+    attempt = 0
+    with telemetry.span('llm.invoke', operation=operation) as span:
+        while True:
+            try:
+                response = runnable.invoke(prompt, **kwargs)
+                record_usage(span, prompt, response)
+                return response
+            except Exception as error:
+                if not is_transient_error(error):
+                    raise
+                attempt += 1
+                span.set('llm.retries', attempt)
+                if attempt > retries:
+                    raise
+                delay = retry_after_seconds(error) if is_rate_limit_error(error) else None
+                if delay is None:
+                    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+                    delay += random.uniform(0, delay / 2)
+                time.sleep(delay)
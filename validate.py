@@ -0,0 +1,168 @@
+# python validate.py --config deploy/api.yml --openapi input/openapi.yml --workers 4
+import os
+import sys
+import json
+import signal
+import inspect
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
+import synth
+from local import LambdaContext, build_event
+from openapi import load_yaml, load_openapi
+from template import collect_parameters, deref
+
+# Seconds a single smoke invocation may take before the handler is considered hung
+SMOKE_TIMEOUT = 5
+# Modules the Lambda Python runtime provides even when they are not installed locally
+RUNTIME_MODULES = {'boto3', 'botocore'}
+
+def parameter_value(parameter: Dict[str, Any], openapi_spec: Dict[str, Any], seed: int = 0) -> str:
+    value = synth.generate(parameter.get('schema') or {'type': 'string'}, openapi_spec, seed=seed)
+    return str(value if value is not None else 'example')
+
+def request_body(openapi_spec: Dict[str, Any], operation: Dict[str, Any], seed: int = 0) -> Optional[str]:
+    content = (deref(operation.get('requestBody') or {}, openapi_spec) or {}).get('content') or {}
+    for media_type in sorted(content, key=lambda media_type: 'json' not in media_type):
+        schema = (content[media_type] or {}).get('schema')
+        if schema is not None:
+            return json.dumps(synth.generate(schema, openapi_spec, seed=seed))
+    return None
+
+def smoke_requests(openapi_spec: Dict[str, Any], http_events: List[Dict[str, Any]], seed: int = 0) -> List[Tuple[str, str, Dict[str, str], bytes, Dict[str, str], str]]:
+    # One synthetic request per declared http event, with the required parameters and a body:
+    # (method, target, headers, body, path parameters, resource)
+    requests = []
+    for http_event in http_events:
+        method = str(http_event.get('method', 'get')).lower()
+        path = '/' + str(http_event.get('path', '')).lstrip('/')
+        operation = openapi_spec.get('paths', {}).get(path, {}).get(method, {})
+
+        path_parameters, query = {}, []
+        for parameter in collect_parameters(openapi_spec, path, method):
+            if parameter.get('in') == 'path':
+                path_parameters[parameter['name']] = parameter_value(parameter, openapi_spec, seed)
+            elif parameter.get('in') == 'query' and parameter.get('required'):
+                query.append(f"{quote(parameter['name'])}={quote(parameter_value(parameter, openapi_spec, seed))}")
+
+        target = path
+        for name, value in path_parameters.items():
+            target = target.replace(f'{{{name}}}', quote(value, safe='')).replace(f'{{{name}+}}', quote(value))
+        if query:
+            target += '?' + '&'.join(query)
+        body = request_body(openapi_spec, operation, seed)
+        headers = {'Content-Type': 'application/json'} if body else {}
+        http_method = 'GET' if method == 'any' else method.upper()
+        requests.append((http_method, target, headers, (body or '').encode(), path_parameters, path))
+    return requests
+
+def smoke_events(openapi_spec: Dict[str, Any], http_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [build_event(*request) for request in smoke_requests(openapi_spec, http_events)]
+
+def check_response(response: Any) -> Optional[str]:
+    if not isinstance(response, dict):
+        return f"handler returned {type(response).__name__}, expected a dict"
+    status_code = response.get('statusCode')
+    if not isinstance(status_code, int):
+        return f"statusCode is {status_code!r}, expected an int"
+    if status_code >= 500:
+        return f"handler responded with status {status_code}"
+    if not isinstance(response.get('body'), (str, type(None))):
+        return f"body is {type(response.get('body')).__name__}, expected a string"
+    if not isinstance(response.get('headers'), (dict, type(None))):
+        return "headers must be a dict"
+    return None
+
+def use_memory_state():
+    # Pool initializer: smoke requests and seed_items write to the handlers' tables, which are kept in
+    # the worker's memory rather than in the store MOCKTHIS_STATE points the mocks at
+    os.environ['MOCKTHIS_STATE'] = 'memory'
+    state = sys.modules.get('state')
+    if state is not None:
+        # Inherited from a forked parent that already imported it
+        state.STATE_BACKEND = 'memory'
+        state._tables.clear()
+
+def handle_timeout(signum, frame):
+    raise TimeoutError(f"invocation took longer than {SMOKE_TIMEOUT}s")
+
+def validate_handler(task: Tuple[str, str, str, List[Dict[str, Any]]]) -> Tuple[str, Optional[str]]:
+    # Runs in a worker process: compile, import, check the signature, then invoke once per event
+    function_name, file_path, base_dir, events = task
+    try:
+        with open(file_path, 'r') as file:
+            source = file.read()
+        compile(source, file_path, 'exec')
+    except (OSError, SyntaxError, ValueError) as error:
+        return function_name, f"does not compile: {error}"
+
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    try:
+        module_spec = importlib.util.spec_from_file_location(f"validate_{function_name}", file_path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    except ModuleNotFoundError as error:
+        if error.name and error.name.split('.')[0] in RUNTIME_MODULES:
+            return function_name, None
+        return function_name, f"import failed: {error!r}"
+    except Exception as error:
+        return function_name, f"import failed: {error!r}"
+
+    handler = getattr(module, 'handler', None)
+    if not callable(handler):
+        return function_name, "does not define handler(event, context)"
+    try:
+        inspect.signature(handler).bind(None, None)
+    except TypeError:
+        return function_name, "handler must accept (event, context)"
+    except ValueError:
+        pass
+
+    for event in events:
+        previous = signal.signal(signal.SIGALRM, handle_timeout)
+        signal.alarm(SMOKE_TIMEOUT)
+        try:
+            error = check_response(handler(event, LambdaContext(function_name)))
+        except Exception as exception:
+            error = f"raised {exception!r}"
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+        if error:
+            return function_name, f"{event['httpMethod']} {event['path']}: {error}"
+    return function_name, None
+
+def validate_handlers(serverless_config: Dict[str, Any], openapi_spec: Dict[str, Any], handlers_dir: str, only: Optional[List[str]] = None, workers: Optional[int] = None) -> Dict[str, str]:
+    # Returns {function name: reason} for every handler that failed validation
+    base_dir = os.path.dirname(os.path.abspath(handlers_dir))
+    tasks = []
+    for function_name, function_config in (serverless_config.get('functions') or {}).items():
+        if only is not None and function_name not in only:
+            continue
+        http_events = [event['http'] for event in function_config.get('events', []) if isinstance(event, dict) and isinstance(event.get('http'), dict)]
+        file_path = os.path.join(handlers_dir, f"{function_name}.py")
+        tasks.append((function_name, file_path, base_dir, smoke_events(openapi_spec, http_events)))
+    if not tasks:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=min(len(tasks), workers or os.cpu_count() or 1), initializer=use_memory_state) as executor:
+        results = executor.map(validate_handler, tasks, chunksize=max(1, len(tasks) // 32))
+        return {function_name: error for function_name, error in results if error}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile, import and smoke-invoke the generated handlers")
+    parser.add_argument('--config', default='deploy/api.yml', help="Path to the generated serverless configuration")
+    parser.add_argument('--openapi', default='input/openapi.yml', help="Path to the OpenAPI spec")
+    parser.add_argument('--handlers', default='deploy/handlers', help="Directory of the generated handlers")
+    parser.add_argument('--workers', type=int, help="Number of worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+
+    failures = validate_handlers(load_yaml(args.config) or {}, load_openapi(args.openapi), args.handlers, workers=args.workers)
+    for function_name, error in sorted(failures.items()):
+        print(f"❌ {function_name}: {error}")
+    if failures:
+        sys.exit(1)
+    print("All handlers passed validation. ✅")